@@ -42,6 +42,12 @@ class AudioService {
             
             this.socket.on('connect', () => {
                 console.log('✅ Connected to Python WebSocket server');
+                // Ask for audio as raw binary attachments instead of base64 text
+                this.socket.emit('tts_capabilities', { audio: true, binary: true });
+            });
+            
+            this.socket.on('tts_capabilities', (data) => {
+                console.log('🎵 TTS audio transport:', data.transport);
             });
             
             this.socket.on('disconnect', () => {
@@ -62,13 +68,24 @@ class AudioService {
     }
 
     async handleTTSAudio(data) {
-        console.log('🎵 Received TTS audio data:', data.type);
+        // Chunks arrive many times a second; only log the first one
+        if (data.type !== 'audio_chunk' || data.seq === 0) {
+            console.log('🎵 Received TTS audio data:', data.type);
+        }
         
         switch (data.type) {
             case 'audio_data':
                 await this.playAudioData(data);
                 break;
                 
+            case 'audio_chunk':
+                this.forwardAudioChunk(data);
+                break;
+                
+            case 'audio_end':
+                this.forwardAudioEnd(data);
+                break;
+                
             case 'stop_audio':
                 this.stopAudio();
                 break;
@@ -87,8 +104,7 @@ class AudioService {
             
             console.log('🎵 Playing TTS audio...');
             
-            // Decode base64 audio data
-            const audioBuffer = Buffer.from(data.audio, 'base64');
+            const audioBuffer = this.toBuffer(data.audio);
             
             // Save to temporary file
             const audioFile = path.join(this.tempDir, `tts-${Date.now()}.mp3`);
@@ -98,6 +114,7 @@ class AudioService {
             if (global.mainWindow) {
                 global.mainWindow.webContents.send('play-tts-audio', {
                     filePath: audioFile,
+                    utteranceId: data.utterance_id,
                     text: data.text || ''
                 });
                 
@@ -114,6 +131,44 @@ class AudioService {
         }
     }
 
+    forwardAudioChunk(data) {
+        // Streamed speech: the renderer appends chunks as they arrive and starts on the first
+        if (!global.mainWindow) {
+            console.error('❌ Main window not available for audio playback');
+            return;
+        }
+        
+        if (data.seq === 0) {
+            this.isPlaying = true;
+            this.currentAudio = null;
+            console.log('✅ Streamed audio playback started');
+        }
+        
+        global.mainWindow.webContents.send('tts-audio-chunk', {
+            utteranceId: data.utterance_id,
+            seq: data.seq,
+            audio: this.toBuffer(data.audio),
+            text: data.text || ''
+        });
+    }
+
+    toBuffer(audio) {
+        // Binary attachments arrive as Buffer/ArrayBuffer; older servers send base64 text
+        if (typeof audio === 'string') {
+            return Buffer.from(audio, 'base64');
+        }
+        return Buffer.isBuffer(audio) ? audio : Buffer.from(audio);
+    }
+
+    forwardAudioEnd(data) {
+        if (global.mainWindow) {
+            global.mainWindow.webContents.send('tts-audio-end', {
+                utteranceId: data.utterance_id,
+                chunks: data.chunks
+            });
+        }
+    }
+
     stopAudio() {
         try {
             if (this.isPlaying && global.mainWindow) {
@@ -127,10 +182,23 @@ class AudioService {
         }
     }
 
+    sendPlaybackEvent(type, utteranceId, details) {
+        // Lets the Python TTS service track playback instead of guessing its length
+        if (this.socket && this.socket.connected && utteranceId) {
+            this.socket.emit(type, { utterance_id: utteranceId, ...details });
+        }
+    }
+
     setupIPCHandlers() {
+        // Handle audio start from renderer
+        ipcMain.handle('tts-audio-started', async (event, utteranceId, duration) => {
+            this.sendPlaybackEvent('playback_started', utteranceId, { duration });
+        });
+        
         // Handle audio completion from renderer
-        ipcMain.handle('tts-audio-complete', async () => {
+        ipcMain.handle('tts-audio-complete', async (event, utteranceId) => {
             console.log('✅ TTS audio playback completed');
+            this.sendPlaybackEvent('playback_finished', utteranceId, { status: 'ended' });
             this.isPlaying = false;
             this.currentAudio = null;
             
@@ -146,8 +214,9 @@ class AudioService {
         });
         
         // Handle audio error from renderer
-        ipcMain.handle('tts-audio-error', async (event, error) => {
+        ipcMain.handle('tts-audio-error', async (event, error, utteranceId) => {
             console.error('❌ TTS audio playback error:', error);
+            this.sendPlaybackEvent('playback_finished', utteranceId, { status: 'error', error });
             this.isPlaying = false;
             this.currentAudio = null;
         });
@@ -1,5 +1,4 @@
 import os
-import pyautogui
 import datetime
 import sys
 if sys.platform == "win32":
@@ -11,44 +10,31 @@ import subprocess
 import re
 import webbrowser
 import urllib.parse
-from google import genai
-from pydantic import BaseModel
-from typing import Literal, Optional
-import cv2
-import macros
 import json
+from .registry import action, action_names, lazy_module
+from . import jobs
 
-import clip 
+def _disable_failsafe(pyautogui_module):
+    # Disable pyautogui failsafe for media keys
+    pyautogui_module.FAILSAFE = False
 
+# Heavy dependencies are imported the first time an action touches them
+pyautogui = lazy_module("pyautogui", on_import=_disable_failsafe)
+cv2 = lazy_module("cv2")
+clip = lazy_module("clip")
+# macros turns the failsafe back on when it loads, so switch it off again
+macros = lazy_module("macros", on_import=lambda module: _disable_failsafe(module.pyautogui))
+
+@action("clip", description="Save the last few seconds of gameplay as a clip", modules=("clip",))
 def clip_screen():
     print("Saving clip") 
     clip.save_clip()
 
-# Disable pyautogui failsafe for media keys
-pyautogui.FAILSAFE = False
-
 def action_list():
     """List available actions."""
-    return [
-        "screenshot",
-        "clip",
-        "play_music",
-        "open_app",
-        "close_app",
-        "media_play",
-        "media_pause",
-        "media_next",
-        "media_previous",
-        "afk",
-        "type_chat",
-        "spam_chat",
-        "quit_game",
-        "take_picture",
-        "open_website",
-        "search_web",
-        "play_demo"
-    ]
+    return action_names()
 
+@action("screenshot", description="Take a screenshot", modules=("pyautogui",))
 def screenshot():
     """Take a screenshot and save it to the folder."""
 
@@ -73,6 +59,7 @@ def screenshot():
     print(f"Screenshot saved to {screenshot_path}")
     
 
+@action("take_picture", description="Take a picture with the webcam", modules=("cv2",), resource="camera", timeout=20)
 def take_picture():
     """Takes a picture using the default webcam."""
     # Initialize the camera
@@ -84,8 +71,13 @@ def take_picture():
 
     # Allow the camera to warm up and adjust exposure
     # We read a few frames to give the sensor time to adjust
-    for _ in range(30):
+    for i in range(30):
+        if jobs.cancelled():
+            cap.release()
+            return "Okay, no picture."
         cap.read()
+        if i % 10 == 9:
+            jobs.report_progress((i + 1) / 31, "Warming up the camera")
 
     # Capture a single frame
     ret, frame = cap.read()
@@ -107,6 +99,7 @@ def take_picture():
     # Release the camera
     cap.release()
 
+@action("play_demo", description="Play the demo video fullscreen", modules=("cv2",), timeout=600)
 def play_demo():
     """Plays a demo video in fullscreen."""
     # !!! IMPORTANT !!!
@@ -126,12 +119,19 @@ def play_demo():
     cv2.namedWindow('Demo', cv2.WND_PROP_FULLSCREEN)
     cv2.setWindowProperty('Demo', cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
 
-    while cap.isOpened():
+    total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0
+    frame_index = 0
+
+    # Stops early on "pilot stop that" or when the job times out
+    while cap.isOpened() and not jobs.cancelled():
         ret, frame = cap.read()
         if not ret:
             break
         
         cv2.imshow('Demo', frame)
+        frame_index += 1
+        if total_frames and frame_index % 40 == 0: # roughly once a second
+            jobs.report_progress(frame_index / total_frames)
         
         # Press 'q' to exit fullscreen
         if cv2.waitKey(25) & 0xFF == ord('q'):
@@ -142,27 +142,30 @@ def play_demo():
     print("✅ Demo finished.")
     return
 
+# Known websites for open_website (anything else is tried as <name>.com)
+WEBSITES = {
+    "youtube": "https://www.youtube.com",
+    "reddit": "https://www.reddit.com",
+    "instagram": "https://www.instagram.com",
+    "google": "https://www.google.com",
+    "github": "https://github.com",
+    "chatgpt": "https://chat.openai.com",
+    "gpt": "https://chat.openai.com",
+    "gemini": "https://gemini.google.com",
+    "amazon": "https://www.amazon.com",
+    "netflix": "https://www.netflix.com",
+    "twitter": "https://www.x.com",
+    "x": "https://www.x.com",
+    "facebook": "https://www.facebook.com",
+    "wikipedia": "https://www.wikipedia.org",
+}
+
+@action("open_website", params={"website_name": "The name of the website to open"}, description="Open a website")
 def open_website(website_name: str):
     """Opens a website in the default browser."""
     website_name = website_name.lower().replace(" ", "")
-    sites = {
-        "youtube": "https://www.youtube.com",
-        "reddit": "https://www.reddit.com",
-        "instagram": "https://www.instagram.com",
-        "google": "https://www.google.com",
-        "github": "https://github.com",
-        "chatgpt": "https://chat.openai.com",
-        "gpt": "https://chat.openai.com",
-        "gemini": "https://gemini.google.com",
-        "amazon": "https://www.amazon.com",
-        "netflix": "https://www.netflix.com",
-        "twitter": "https://www.x.com",
-        "x": "https://www.x.com",
-        "facebook": "https://www.facebook.com",
-        "wikipedia": "https://www.wikipedia.org",
-    }
     
-    url = sites.get(website_name)
+    url = WEBSITES.get(website_name)
 
     if not url:
         if '.' not in website_name:
@@ -177,6 +180,7 @@ def open_website(website_name: str):
         print(f"❌ Failed to open website {website_name}: {e}")
         return f"Sorry, I couldn't open that website."
 
+@action("search_web", params={"search_query": "The query to search on the web"}, description="Search the web")
 def search_web(query: str):
     """Performs a web search using the default browser."""
     try:
@@ -320,6 +324,13 @@ def _launch_steam_game(game_name: str):
     
     return f"Could not find Steam game: {game_name}"
 
+URI_SCHEMES = {
+    "spotify": "spotify:",
+    "discord": "discord://",
+    "steam": "steam://"
+}
+
+@action("open_app", params={"app_name": "Application to open or close"}, description="Open an application or Steam game")
 def open_app(app_name):
     """Open an application by its name using a multi-pronged, platform-aware approach."""
     print(f"Attempting to open application: '{app_name}'")
@@ -331,15 +342,10 @@ def open_app(app_name):
         return steam_result
 
     # Method 1: URI Schemes (cross-platform)
-    uri_schemes = {
-        "spotify": "spotify:",
-        "discord": "discord://",
-        "steam": "steam://"
-    }
-    if app_lower in uri_schemes:
+    if app_lower in URI_SCHEMES:
         try:
-            webbrowser.open(uri_schemes[app_lower])
-            print(f"✅ Opened {app_name} via {uri_schemes[app_lower]} protocol")
+            webbrowser.open(URI_SCHEMES[app_lower])
+            print(f"✅ Opened {app_name} via {URI_SCHEMES[app_lower]} protocol")
             return
         except Exception as e:
             print(f"⚠️ {app_name} protocol failed: {e}")
@@ -355,27 +361,28 @@ def open_app(app_name):
         print(f"❌ Unsupported platform: {sys.platform}")
         return f"Sorry, opening apps is not supported on {sys.platform}."
 
+WINDOWS_APPS = {
+    "file explorer": "explorer.exe",
+    "explorer": "explorer.exe",
+    "task manager": "Taskmgr.exe",
+    "calculator": "calc.exe",
+    "notepad": "notepad.exe",
+    "paint": "mspaint.exe",
+    "command prompt": "cmd.exe",
+    "cmd": "cmd.exe",
+    "powershell": "powershell.exe",
+    "registry editor": "regedit.exe",
+    "regedit": "regedit.exe",
+    "control panel": "control.exe",
+}
+
 def _open_app_windows(app_name, app_lower):
     """Windows-specific app opening logic."""
     # Method 2: Check for common system tools with specific commands
-    system_apps = {
-        "file explorer": "explorer.exe",
-        "explorer": "explorer.exe",
-        "task manager": "Taskmgr.exe",
-        "calculator": "calc.exe",
-        "notepad": "notepad.exe",
-        "paint": "mspaint.exe",
-        "command prompt": "cmd.exe",
-        "cmd": "cmd.exe",
-        "powershell": "powershell.exe",
-        "registry editor": "regedit.exe",
-        "regedit": "regedit.exe",
-        "control panel": "control.exe",
-    }
-    if app_lower in system_apps:
+    if app_lower in WINDOWS_APPS:
         try:
-            subprocess.Popen(system_apps[app_lower], shell=True)
-            print(f"✅ Launched system tool '{app_name}' via command '{system_apps[app_lower]}'.")
+            subprocess.Popen(WINDOWS_APPS[app_lower], shell=True)
+            print(f"✅ Launched system tool '{app_name}' via command '{WINDOWS_APPS[app_lower]}'.")
             return
         except Exception as e:
             print(f"⚠️ Failed to launch system tool '{app_name}': {e}")
@@ -431,6 +438,27 @@ def _open_app_windows(app_name, app_lower):
     print(f"❌ All Windows methods failed. Could not open application '{app_name}'.")
     return f"Sorry, I couldn't find an application named {app_name} to open."
 
+MACOS_APPS = {
+    "finder": "Finder",
+    "safari": "Safari",
+    "terminal": "Terminal",
+    "activity monitor": "Activity Monitor",
+    "calculator": "Calculator",
+    "textedit": "TextEdit",
+    "preview": "Preview",
+    "system preferences": "System Preferences",
+    "app store": "App Store",
+    "mail": "Mail",
+    "calendar": "Calendar",
+    "contacts": "Contacts",
+    "notes": "Notes",
+    "reminders": "Reminders",
+    "maps": "Maps",
+    "photos": "Photos",
+    "facetime": "FaceTime",
+    "messages": "Messages",
+}
+
 def _open_app_macos(app_name, app_lower):
     """macOS-specific app opening logic."""
     # Method 1: Try opening via 'open' command with .app extension
@@ -442,31 +470,10 @@ def _open_app_macos(app_name, app_lower):
         print(f"ℹ️ 'open -a' failed for '{app_name}': {e}")
 
     # Method 2: Common system applications
-    system_apps = {
-        "finder": "Finder",
-        "safari": "Safari",
-        "terminal": "Terminal",
-        "activity monitor": "Activity Monitor",
-        "calculator": "Calculator",
-        "textedit": "TextEdit",
-        "preview": "Preview",
-        "system preferences": "System Preferences",
-        "app store": "App Store",
-        "mail": "Mail",
-        "calendar": "Calendar",
-        "contacts": "Contacts",
-        "notes": "Notes",
-        "reminders": "Reminders",
-        "maps": "Maps",
-        "photos": "Photos",
-        "facetime": "FaceTime",
-        "messages": "Messages",
-    }
-    
-    if app_lower in system_apps:
+    if app_lower in MACOS_APPS:
         try:
-            subprocess.Popen(['open', '-a', system_apps[app_lower]])
-            print(f"✅ Opened system app '{app_name}' via '{system_apps[app_lower]}'.")
+            subprocess.Popen(['open', '-a', MACOS_APPS[app_lower]])
+            print(f"✅ Opened system app '{app_name}' via '{MACOS_APPS[app_lower]}'.")
             return
         except Exception as e:
             print(f"⚠️ Failed to open system app '{app_name}': {e}")
@@ -491,6 +498,33 @@ def _open_app_macos(app_name, app_lower):
     print(f"❌ All macOS methods failed. Could not open application '{app_name}'.")
     return f"Sorry, I couldn't find an application named {app_name} to open."
 
+LINUX_APPS = {
+    "firefox": "firefox",
+    "chrome": "google-chrome",
+    "google chrome": "google-chrome",
+    "chromium": "chromium-browser",
+    "file manager": "nautilus",
+    "files": "nautilus",
+    "nautilus": "nautilus",
+    "terminal": "gnome-terminal",
+    "calculator": "gnome-calculator",
+    "text editor": "gedit",
+    "gedit": "gedit",
+    "code": "code",
+    "vscode": "code",
+    "visual studio code": "code",
+    "gimp": "gimp",
+    "libreoffice": "libreoffice",
+    "writer": "libreoffice --writer",
+    "calc": "libreoffice --calc",
+    "impress": "libreoffice --impress",
+    "thunderbird": "thunderbird",
+    "vlc": "vlc",
+    "system monitor": "gnome-system-monitor",
+    "settings": "gnome-control-center",
+    "software": "gnome-software",
+}
+
 def _open_app_linux(app_name, app_lower):
     """Linux-specific app opening logic."""
     # Method 1: Try direct command execution
@@ -504,38 +538,12 @@ def _open_app_linux(app_name, app_lower):
         print(f"ℹ️ Direct launch failed for '{app_name}': {e}")
 
     # Method 2: Common Linux applications and their command names
-    linux_apps = {
-        "firefox": "firefox",
-        "chrome": "google-chrome",
-        "google chrome": "google-chrome",
-        "chromium": "chromium-browser",
-        "file manager": "nautilus",
-        "files": "nautilus",
-        "nautilus": "nautilus",
-        "terminal": "gnome-terminal",
-        "calculator": "gnome-calculator",
-        "text editor": "gedit",
-        "gedit": "gedit",
-        "code": "code",
-        "vscode": "code",
-        "visual studio code": "code",
-        "gimp": "gimp",
-        "libreoffice": "libreoffice",
-        "writer": "libreoffice --writer",
-        "calc": "libreoffice --calc",
-        "impress": "libreoffice --impress",
-        "thunderbird": "thunderbird",
-        "vlc": "vlc",
-        "system monitor": "gnome-system-monitor",
-        "settings": "gnome-control-center",
-        "software": "gnome-software",
-    }
     
-    if app_lower in linux_apps:
+    if app_lower in LINUX_APPS:
         try:
-            cmd = linux_apps[app_lower].split()
+            cmd = LINUX_APPS[app_lower].split()
             subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            print(f"✅ Launched Linux app '{app_name}' via command '{linux_apps[app_lower]}'.")
+            print(f"✅ Launched Linux app '{app_name}' via command '{LINUX_APPS[app_lower]}'.")
             return
         except Exception as e:
             print(f"⚠️ Failed to launch Linux app '{app_name}': {e}")
@@ -587,6 +595,7 @@ def _open_app_linux(app_name, app_lower):
     print(f"❌ All Linux methods failed. Could not open application '{app_name}'.")
     return f"Sorry, I couldn't find an application named {app_name} to open."
 
+@action("close_app", params={"app_name": "Application to open or close"}, description="Close an application")
 def close_app(app_name):
     """Close an application by its name using platform-specific methods."""
     print(f"Attempting to close application: '{app_name}'")
@@ -603,47 +612,48 @@ def close_app(app_name):
         print(f"❌ Unsupported platform: {sys.platform}")
         return f"Sorry, closing apps is not supported on {sys.platform}."
 
+WINDOWS_PROCESSES = {
+    # Browsers
+    "chrome": "chrome.exe",
+    "google chrome": "chrome.exe",
+    "firefox": "firefox.exe",
+    "mozilla firefox": "firefox.exe",
+    "edge": "msedge.exe",
+    "microsoft edge": "msedge.exe",
+    # Dev tools
+    "vscode": "Code.exe",
+    "visual studio code": "Code.exe",
+    "visual studio": "devenv.exe",
+    # Office
+    "word": "WINWORD.EXE",
+    "excel": "EXCEL.EXE",
+    "powerpoint": "POWERPNT.EXE",
+    "outlook": "OUTLOOK.EXE",
+    # Communication
+    "discord": "Discord.exe",
+    "slack": "slack.exe",
+    "teams": "ms-teams.exe",
+    "microsoft teams": "ms-teams.exe",
+    # Entertainment
+    "spotify": "Spotify.exe",
+    "steam": "steam.exe",
+    # System tools
+    "file explorer": "explorer.exe",
+    "explorer": "explorer.exe",
+    "task manager": "Taskmgr.exe",
+    "notepad": "notepad.exe",
+    "paint": "mspaint.exe",
+    "command prompt": "cmd.exe",
+    "powershell": "powershell.exe",
+    "calculator": "CalculatorApp.exe", 
+    "snipping tool": "SnippingTool.exe",
+}
+
 def _close_app_windows(app_name, app_lower):
     """Windows-specific app closing logic."""
     # Dictionary mapping friendly names to process executable names
-    app_to_process = {
-        # Browsers
-        "chrome": "chrome.exe",
-        "google chrome": "chrome.exe",
-        "firefox": "firefox.exe",
-        "mozilla firefox": "firefox.exe",
-        "edge": "msedge.exe",
-        "microsoft edge": "msedge.exe",
-        # Dev tools
-        "vscode": "Code.exe",
-        "visual studio code": "Code.exe",
-        "visual studio": "devenv.exe",
-        # Office
-        "word": "WINWORD.EXE",
-        "excel": "EXCEL.EXE",
-        "powerpoint": "POWERPNT.EXE",
-        "outlook": "OUTLOOK.EXE",
-        # Communication
-        "discord": "Discord.exe",
-        "slack": "slack.exe",
-        "teams": "ms-teams.exe",
-        "microsoft teams": "ms-teams.exe",
-        # Entertainment
-        "spotify": "Spotify.exe",
-        "steam": "steam.exe",
-        # System tools
-        "file explorer": "explorer.exe",
-        "explorer": "explorer.exe",
-        "task manager": "Taskmgr.exe",
-        "notepad": "notepad.exe",
-        "paint": "mspaint.exe",
-        "command prompt": "cmd.exe",
-        "powershell": "powershell.exe",
-        "calculator": "CalculatorApp.exe", 
-        "snipping tool": "SnippingTool.exe",
-    }
     
-    process_name = app_to_process.get(app_lower)
+    process_name = WINDOWS_PROCESSES.get(app_lower)
     
     if not process_name:
         # If not in our list, guess the process name by removing spaces and adding .exe
@@ -669,39 +679,40 @@ def _close_app_windows(app_name, app_lower):
         print(f"❌ An unexpected error occurred while trying to close '{app_name}': {e}")
         return f"An unexpected error occurred while trying to close {app_name}."
 
+MACOS_BUNDLES = {
+    "safari": "Safari",
+    "chrome": "Google Chrome",
+    "google chrome": "Google Chrome",
+    "firefox": "Firefox",
+    "finder": "Finder",
+    "terminal": "Terminal",
+    "activity monitor": "Activity Monitor",
+    "calculator": "Calculator",
+    "textedit": "TextEdit",
+    "preview": "Preview",
+    "system preferences": "System Preferences",
+    "app store": "App Store",
+    "mail": "Mail",
+    "calendar": "Calendar",
+    "contacts": "Contacts",
+    "notes": "Notes",
+    "reminders": "Reminders",
+    "maps": "Maps",
+    "photos": "Photos",
+    "facetime": "FaceTime",
+    "messages": "Messages",
+    "vscode": "Visual Studio Code",
+    "visual studio code": "Visual Studio Code",
+    "discord": "Discord",
+    "slack": "Slack",
+    "spotify": "Spotify",
+}
+
 def _close_app_macos(app_name, app_lower):
     """macOS-specific app closing logic."""
     # Dictionary mapping friendly names to app bundle names
-    app_to_bundle = {
-        "safari": "Safari",
-        "chrome": "Google Chrome",
-        "google chrome": "Google Chrome",
-        "firefox": "Firefox",
-        "finder": "Finder",
-        "terminal": "Terminal",
-        "activity monitor": "Activity Monitor",
-        "calculator": "Calculator",
-        "textedit": "TextEdit",
-        "preview": "Preview",
-        "system preferences": "System Preferences",
-        "app store": "App Store",
-        "mail": "Mail",
-        "calendar": "Calendar",
-        "contacts": "Contacts",
-        "notes": "Notes",
-        "reminders": "Reminders",
-        "maps": "Maps",
-        "photos": "Photos",
-        "facetime": "FaceTime",
-        "messages": "Messages",
-        "vscode": "Visual Studio Code",
-        "visual studio code": "Visual Studio Code",
-        "discord": "Discord",
-        "slack": "Slack",
-        "spotify": "Spotify",
-    }
     
-    bundle_name = app_to_bundle.get(app_lower, app_name)
+    bundle_name = MACOS_BUNDLES.get(app_lower, app_name)
     
     try:
         # Use AppleScript to quit the application gracefully
@@ -733,40 +744,41 @@ def _close_app_macos(app_name, app_lower):
         print(f"❌ Failed to close '{app_name}': {e}")
         return f"Sorry, I couldn't close {app_name}."
 
+LINUX_PROCESSES = {
+    "firefox": "firefox",
+    "chrome": "chrome",
+    "google chrome": "chrome",
+    "chromium": "chromium",
+    "file manager": "nautilus",
+    "files": "nautilus",
+    "nautilus": "nautilus",
+    "terminal": "gnome-terminal",
+    "calculator": "gnome-calculator",
+    "text editor": "gedit",
+    "gedit": "gedit",
+    "code": "code",
+    "vscode": "code",
+    "visual studio code": "code",
+    "gimp": "gimp",
+    "libreoffice": "libreoffice",
+    "writer": "libreoffice",
+    "calc": "libreoffice",
+    "impress": "libreoffice",
+    "thunderbird": "thunderbird",
+    "vlc": "vlc",
+    "system monitor": "gnome-system-monitor",
+    "settings": "gnome-control-center",
+    "software": "gnome-software",
+    "discord": "discord",
+    "slack": "slack",
+    "spotify": "spotify",
+}
+
 def _close_app_linux(app_name, app_lower):
     """Linux-specific app closing logic."""
     # Dictionary mapping friendly names to process names
-    app_to_process = {
-        "firefox": "firefox",
-        "chrome": "chrome",
-        "google chrome": "chrome",
-        "chromium": "chromium",
-        "file manager": "nautilus",
-        "files": "nautilus",
-        "nautilus": "nautilus",
-        "terminal": "gnome-terminal",
-        "calculator": "gnome-calculator",
-        "text editor": "gedit",
-        "gedit": "gedit",
-        "code": "code",
-        "vscode": "code",
-        "visual studio code": "code",
-        "gimp": "gimp",
-        "libreoffice": "libreoffice",
-        "writer": "libreoffice",
-        "calc": "libreoffice",
-        "impress": "libreoffice",
-        "thunderbird": "thunderbird",
-        "vlc": "vlc",
-        "system monitor": "gnome-system-monitor",
-        "settings": "gnome-control-center",
-        "software": "gnome-software",
-        "discord": "discord",
-        "slack": "slack",
-        "spotify": "spotify",
-    }
     
-    process_name = app_to_process.get(app_lower)
+    process_name = LINUX_PROCESSES.get(app_lower)
     
     if not process_name:
         # Try various name variations
@@ -813,6 +825,12 @@ def _close_app_linux(app_name, app_lower):
     print(f"ℹ️ No running process found for '{app_name}' or unable to terminate it.")
     return f"{app_name} wasn't running, so I couldn't close it."
 
+def known_app_names():
+    """Every app name the open/close tables know, on any platform"""
+    return (set(URI_SCHEMES) | set(WINDOWS_APPS) | set(MACOS_APPS) | set(LINUX_APPS)
+            | set(WINDOWS_PROCESSES) | set(MACOS_BUNDLES) | set(LINUX_PROCESSES))
+
+@action("media_play", description="Resume media playback", modules=("pyautogui",), resource="keyboard")
 def media_play():
     """Presses the play/pause media key to play media."""
     try:
@@ -821,6 +839,7 @@ def media_play():
     except Exception as e:
         return f"Failed to play media: {e}"
 
+@action("media_pause", description="Pause media playback", modules=("pyautogui",), resource="keyboard")
 def media_pause():
     """Presses the play/pause media key to pause media."""
     try:
@@ -829,6 +848,7 @@ def media_pause():
     except Exception as e:
         return f"Failed to pause media: {e}"
 
+@action("media_next", description="Skip to the next track", modules=("pyautogui",), resource="keyboard")
 def media_next():
     """Presses the next track media key."""
     try:
@@ -837,6 +857,7 @@ def media_next():
     except Exception as e:
         return f"Failed to skip track: {e}"
 
+@action("media_previous", description="Go back to the previous track", modules=("pyautogui",), resource="keyboard")
 def media_previous():
     """Presses the previous track media key."""
     try:
@@ -845,24 +866,54 @@ def media_previous():
     except Exception as e:
         return f"Failed to go to previous track: {e}"
 
+@action("stop_that", description="Stop the action Pilot is running (e.g. the demo or chat spam)", inline=True)
+def stop_that():
+    """Cancel the most recent running action."""
+    stopped = jobs.scheduler.cancel()
+    if not stopped:
+        return "There's nothing to stop."
+    print(f"🛑 Cancelling {stopped[0].id} ({stopped[0].intent})")
+    return None
+
+@action("stop_everything", description="Stop every action Pilot is running", inline=True)
+def stop_everything():
+    """Cancel every running or queued action."""
+    stopped = jobs.scheduler.cancel_all()
+    if not stopped:
+        return "There's nothing to stop."
+    print(f"🛑 Cancelling {', '.join(job.id for job in stopped)}")
+    return None
+
+@action("afk", description="Keep the player moving so games don't kick them for being AFK", modules=("macros",), resource="keyboard")
 def afk(duration_minutes: int = 30, movement_interval: int = 30):
     """Start AFK macro to prevent being kicked from games."""
     macros.afk(duration_minutes, movement_interval)
     return 
 
+@action("stop_afk", description="Stop the AFK macro", modules=("macros",), resource="keyboard")
 def stop_afk():
     """Stop AFK macro."""
     macros.stop_afk()
     return 
 
+@action("type_chat", params={"text_message": "Message text for video game chat"}, description="Type a message in game chat", modules=("macros",), resource="keyboard")
 def type_chat(message: str, delay: float = 0.05):
     """Type a message in game chat."""
     macros.type_chat(message, delay)
     return 
 
+@action("spam_chat", params={"text_message": "Message text for video game chat"}, description="Spam a message in game chat", modules=("macros",), resource="keyboard", timeout=60)
 def spam_chat(message: str, count: int = 5, interval: float = 1.0):
     """Spam a message multiple times in chat."""
-    macros.spam_chat(message, count, interval)
+    # Sent one at a time here rather than with macros.spam_chat so it can be cancelled
+    print(f"Spamming '{message}' {count} times")
+    for i in range(count):
+        if jobs.cancelled():
+            break
+        macros.macro_manager.type_in_chat(message) # all chat, as macros.spam_chat does
+        jobs.report_progress((i + 1) / count, f"Sent {i + 1}/{count}")
+        if i < count - 1 and jobs.wait(interval):
+            break
     return 
 
 def add_chat_message(message: str):
@@ -880,6 +931,12 @@ def type_ai_message(context: str = "general", delay: float = 0.05, team_chat: bo
     message = macros.type_ai_message(context, delay, team_chat)
     return 
 
+@action("move_around", description="Move the player around for a minute", modules=("macros",), resource="keyboard")
+def move_around():
+    """Run the AFK macro briefly with frequent movement."""
+    return afk(duration_minutes=1, movement_interval=1)
+
+@action("list_steam_games", description="List the installed Steam games")
 def list_steam_games():
     """List all installed Steam games."""
     steam_games = _find_steam_games()
@@ -0,0 +1,173 @@
+"""
+Runs the actions of a MultipleActionsModel as a dependency graph.
+
+Actions start in execution order as soon as everything they wait for has
+finished, on a shared worker pool, so "open discord, open spotify and take
+a screenshot" takes about as long as the slowest of the three. An action
+waits for:
+
+    - the actions listed for it in depends_on (explicit ordering)
+    - the action before it that uses the same resource (two macros typing
+      into the game at once would interleave)
+
+execution_order only decides which of the actions that are ready starts first.
+"""
+import os
+import time
+import concurrent.futures
+
+from . import registry
+import tracing
+
+MAX_PARALLEL_ACTIONS = int(os.getenv("PILOT_MAX_PARALLEL_ACTIONS", "4"))
+
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_PARALLEL_ACTIONS, thread_name_prefix="action")
+
+
+def _execution_order(count, execution_order):
+    """Valid, de-duplicated indices from execution_order, then any it left out"""
+    order = []
+    for index in execution_order or []:
+        if isinstance(index, int) and 0 <= index < count and index not in order:
+            order.append(index)
+    order += [index for index in range(count) if index not in order]
+    return order
+
+def _break_cycle(remaining, deps, position):
+    """Find a cycle among the remaining actions and drop one of its edges"""
+    # Every remaining action still waits on another remaining one, so
+    # following those edges from any of them must come back around
+    index = min(remaining, key=position.get)
+    path = []
+    while index not in path:
+        path.append(index)
+        index = min((dep for dep in deps[index] if dep in remaining), key=position.get)
+    cycle = path[path.index(index):]
+
+    # Drop the edge out of the action that was meant to start first
+    first = min(cycle, key=position.get)
+    dep = cycle[(cycle.index(first) + 1) % len(cycle)]
+    deps[first].discard(dep)
+    tracing.mark("dependency_cycle", action=first, dropped_dependency=dep, cycle=sorted(cycle))
+    return first, dep
+
+def build_graph(actions_list, execution_order=None, depends_on=None):
+    """
+    Work out which actions each action has to wait for.
+
+    Every depends_on edge is kept, whatever the execution order says; an
+    edge is only dropped to break a real cycle, and that is recorded on the
+    current trace. Actions sharing a resource run one at a time, in
+    execution order as far as the dependencies allow.
+
+    Args:
+        actions_list (list): Action dicts with an "intent" key
+        execution_order (list): 0-based indices, the order to start ready actions in
+        depends_on (list): For each action, indices of actions that must finish first
+
+    Returns:
+        tuple: (order, deps) where deps maps each index to the set of indices it waits for
+    """
+    order = _execution_order(len(actions_list), execution_order)
+    position = {index: pos for pos, index in enumerate(order)}
+    deps = {index: set() for index in order}
+
+    for index, wanted in enumerate((depends_on or [])[:len(actions_list)]):
+        for dep in wanted or []:
+            if dep in position and dep != index:
+                deps[index].add(dep)
+
+    # Topological order of the explicit edges, preferring execution order
+    # among actions that are free to go
+    sorted_order = []
+    remaining = set(order)
+    while remaining:
+        ready = [index for index in order if index in remaining and not deps[index] & remaining]
+        if not ready:
+            _break_cycle(remaining, deps, position)
+            continue
+        sorted_order.append(ready[0])
+        remaining.discard(ready[0])
+
+    last_user = {}
+    for index in sorted_order:
+        spec = registry.ACTIONS.get(actions_list[index].get("intent"))
+        resource = spec.resource if spec else None
+        if resource:
+            if resource in last_user:
+                deps[index].add(last_user[resource])
+            last_user[resource] = index
+
+    return order, deps
+
+
+def _run_one(run, index, action):
+    started = time.monotonic()
+    try:
+        feedback = run(action.get("intent"), action)
+        status, error = "done", None
+    except Exception as e:
+        print(f"❌ Action {index} ({action.get('intent')}) failed: {e}")
+        feedback, status, error = None, "error", str(e)
+    return {
+        "index": index,
+        "intent": action.get("intent"),
+        "status": status,
+        "feedback": feedback,
+        "error": error,
+        "elapsed": time.monotonic() - started,
+    }
+
+def run_graph(actions_list, execution_order=None, depends_on=None,
+              run=registry.dispatch, on_start=None, on_result=None):
+    """
+    Run the actions, concurrently where the graph allows, and wait for all of them.
+
+    Actions whose dependencies failed are skipped. on_start(index, action) and
+    on_result(result) are called from the caller's thread as actions start
+    and finish.
+
+    Returns:
+        list: One result dict per action, in the original order
+    """
+    order, deps = build_graph(actions_list, execution_order, depends_on)
+    waiting = {index: set(wanted) for index, wanted in deps.items()}
+    results = [None] * len(actions_list)
+    pending = {}
+
+    def finish(result):
+        results[result["index"]] = result
+        for index in order:
+            waiting[index].discard(result["index"])
+        if on_result:
+            on_result(result)
+
+    def start_ready():
+        for index in order:
+            if results[index] is not None or index in pending.values() or waiting[index]:
+                continue
+            failed = [dep for dep in deps[index] if results[dep]["status"] != "done"]
+            if failed:
+                finish({
+                    "index": index,
+                    "intent": actions_list[index].get("intent"),
+                    "status": "skipped",
+                    "feedback": None,
+                    "error": f"depends on action {failed[0]}, which did not finish",
+                    "elapsed": 0.0,
+                })
+                # Its own dependents may now be ready to skip as well
+                return start_ready()
+            if on_start:
+                on_start(index, actions_list[index])
+            pending[_pool.submit(_run_one, run, index, actions_list[index])] = index
+
+    start_ready()
+    while pending:
+        done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            del pending[future]
+            finish(future.result())
+        start_ready()
+
+    return results
@@ -0,0 +1,133 @@
+import os
+import json
+import copy
+import time
+import threading
+from collections import OrderedDict
+
+
+class IntentCache:
+    """
+    LRU + TTL cache of LLM intent resolutions.
+
+    Keys are normalized utterances. Concurrent lookups of the same key while
+    the LLM call is in flight wait for that call instead of starting their
+    own. Entries can optionally be persisted to a JSON file so the cache
+    survives restarts.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=24 * 60 * 60, path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+
+        # key -> {"value", "stored_at", "latency"}; stored_at is wall time so it survives restarts
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+        self.latency_saved = 0.0
+
+        if self.path:
+            self._load()
+
+    def get_or_compute(self, key, compute, should_cache=lambda value: True):
+        """
+        Return the cached value for `key`, or call compute() once to fill it.
+
+        Args:
+            key (str): Normalized utterance
+            compute: Zero-argument callable doing the LLM call
+            should_cache: Predicate deciding whether a result is worth keeping
+                (errors shouldn't be cached)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.time() - entry["stored_at"] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.latency_saved += entry["latency"]
+                return copy.deepcopy(entry["value"])
+            if entry:
+                del self._entries[key]
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                inflight = self._inflight[key] = {"done": threading.Event(), "value": None}
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.merged += 1
+
+        if not owner:
+            inflight["done"].wait()
+            return copy.deepcopy(inflight["value"])
+
+        started = time.monotonic()
+        value = None
+        try:
+            value = compute()
+            return value
+        finally:
+            latency = time.monotonic() - started
+            with self._lock:
+                inflight["value"] = value
+                del self._inflight[key]
+                if value is not None and should_cache(value):
+                    self._entries[key] = {"value": copy.deepcopy(value), "stored_at": time.time(), "latency": latency}
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    if self.path:
+                        self._save()
+            inflight["done"].set()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self.path:
+                self._save()
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.merged
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "merged_inflight": self.merged,
+            "hit_rate": round((self.hits + self.merged) / lookups, 3) if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+        }
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Could not load intent cache from {self.path}: {e}")
+            return
+
+        now = time.time()
+        for key, entry in data.items():
+            if now - entry.get("stored_at", 0) < self.ttl_seconds:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        # Write then rename so a crash never leaves a half-written cache file
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Could not save intent cache to {self.path}: {e}")
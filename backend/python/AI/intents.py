@@ -0,0 +1,180 @@
+import re
+import difflib
+from . import actions
+
+TRIGGER_WORD = "pilot"
+MIN_CONFIDENCE = 0.85 # below this the command goes to Gemini instead
+UNKNOWN_APP_CONFIDENCE = 0.5 # open/close of a name not in the app tables ("start recording")
+
+# Politeness and hesitation words that carry no meaning at the edges of a command
+LEADING_FILLERS = ("hey", "yo", "okay", "ok", "uh", "um", "please", "can you", "could you",
+                   "would you", "will you", "i want you to", "go ahead and")
+TRAILING_FILLERS = ("please", "for me", "now", "thanks", "thank you")
+
+# Joined commands ("open discord and spotify") are left to Gemini
+MULTI_ACTION = re.compile(r"\b(?:and|then|also)\b|,")
+
+_NOUN = r"(?: (?:the|my|this|some))?"
+_MEDIA = _NOUN + r"(?: (?:music|song|track|media|video|spotify|it|that))?"
+
+# (intent, pattern, description) in priority order. Named groups become slots.
+RULES = [
+    ("media_pause", r"^pause" + _MEDIA + r"$", "Pausing."),
+    ("media_pause", r"^stop" + _NOUN + r" (?:music|song|track)$", "Pausing."),
+    ("media_play", r"^(?:play|resume|unpause|continue)" + _MEDIA + r"$", "Resuming."),
+    ("media_next", r"^(?:play |go to )?(?:the )?(?:next|skip)(?: (?:the |this )?(?:song|track|one))?$", "Skipping ahead."),
+    ("media_previous", r"^(?:play |go to )?(?:the )?(?:previous|last)(?: (?:song|track|one))?$", "Going back a track."),
+    ("media_previous", r"^go back(?: a| one)?(?: song| track)?$", "Going back a track."),
+    ("screenshot", r"^(?:take |grab |get )?(?:a |me a )?screen ?shot(?: .*)?$", "Screenshot taken."),
+    ("clip", r"^clip(?: (?:that|it|this))?(?: .*)?$", "Clipping that."),
+    ("clip", r"^(?:save|make) (?:a |the )?clip$", "Clipping that."),
+    ("take_picture", r"^(?:take|snap|grab) (?:a |me a )?(?:picture|photo|pic|selfie)(?: .*)?$", "Say cheese!"),
+    ("play_demo", r"^(?:play|show|start|run)(?: the)? demo(?: video)?$", "Starting the demo."),
+    ("list_steam_games", r"^(?:list|show)(?: me)?(?: all)?(?: of)?(?: my)?(?: steam)? games$", "Here are your Steam games."),
+    ("list_steam_games", r"^what games do i have$", "Here are your Steam games."),
+    ("stop_everything", r"^(?:stop|cancel|abort) (?:everything|all(?: of (?:it|that))?|all actions)$", "Stopping everything."),
+    ("stop_that", r"^(?:stop|cancel|abort|quit)(?: (?:that|it|this|the demo|the spam))?$", "Stopping that."),
+    ("stop_afk", r"^(?:stop|end|cancel|exit)(?: the)? afk(?: mode| macro)?$", "Welcome back."),
+    ("stop_afk", r"^i'?m back$", "Welcome back."),
+    ("afk", r"^(?:go |start )?afk(?: mode)?$", "Going AFK, I'll keep you moving."),
+    ("move_around", r"^(?:move|walk) around$", "Moving around for a minute."),
+    ("spam_chat", r"^spam (?P<text_message>.+?)(?: in(?: the)? chat)?$", "Spamming chat."),
+    ("type_chat", r"^(?:type|say|send|write) (?P<text_message>.+?) in(?: the)? chat$", "Typing it in chat."),
+    ("type_chat", r"^(?:type|write) (?P<text_message>.+)$", "Typing it in chat."),
+    ("search_web", r"^(?:search|google|look up)(?: for| up)? (?P<search_query>.+)$", "Searching for {search_query}."),
+    ("open_website", r"^(?:open|go to|visit) (?P<website_name>[\w\-]+\.(?:com|org|net|io|gg|tv|ca|co))$", "Opening {website_name}."),
+    ("open_app", r"^(?:open|launch|start|run|load up|fire up) (?:up )?(?P<app_name>.+)$", "Opening {app_name}."),
+    ("close_app", r"^(?:close|quit|exit|kill|shut down) (?P<app_name>.+)$", "Closing {app_name}."),
+]
+_COMPILED = [(intent, re.compile(pattern), description) for intent, pattern, description in RULES]
+
+# Canonical forms tried with fuzzy matching when no rule matches directly,
+# to absorb speech-to-text slips like "screen shop" or "pause the musik"
+CANONICAL_PHRASES = [
+    "pause", "pause the music", "play", "resume", "resume the music", "next song", "skip",
+    "previous song", "screenshot", "take a screenshot", "clip that", "take a picture",
+    "play the demo", "list my steam games", "go afk", "stop afk", "move around", "stop that",
+    "cancel that",
+]
+VERBS = ["open", "launch", "start", "close", "quit", "search", "google", "type", "spam", "visit"]
+
+
+def normalize_utterance(text, trigger_word=TRIGGER_WORD, keep_commas=False):
+    """
+    Lowercase, drop punctuation, the trigger word and filler words at the edges.
+    With keep_commas, commas inside the command survive as " , " tokens.
+    """
+    text = (text or "").lower()
+    if keep_commas:
+        text = re.sub(r"[^\w\s'.\-,]", " ", text).replace(",", " , ")
+    else:
+        text = re.sub(r"[^\w\s'.\-]", " ", text)
+    text = re.sub(r"(?<!\w)[.\-]|[.\-](?!\w)", " ", text) # keep dots inside "example.com"
+    words = text.split()
+
+    if words and words[0].strip("'") in (trigger_word, trigger_word + "s"):
+        words = words[1:]
+    text = " ".join(w for w in words if w not in ("uh", "um", "uhh", "umm"))
+
+    changed = True
+    while changed:
+        changed = False
+        if text.startswith(",") or text.endswith(","):
+            text = text.strip(" ,") # "pilot, pause" or "pause, please"
+            changed = True
+        for filler in LEADING_FILLERS:
+            if text == filler or text.startswith(filler + " "):
+                text = text[len(filler):].strip()
+                changed = True
+        for filler in TRAILING_FILLERS:
+            if text.endswith(" " + filler):
+                text = text[:-len(filler) - 1].strip()
+                changed = True
+    return text
+
+
+def _apply_rules(text):
+    for intent, pattern, description in _COMPILED:
+        match = pattern.match(text)
+        if match:
+            return intent, {k: v.strip() for k, v in match.groupdict().items() if v}, description
+    return None
+
+
+def _build_response(intent, slots, description, confidence):
+    if slots.get("app_name"):
+        slots["app_name"] = re.sub(r"^(?:the|my) | app$", "", slots["app_name"]).strip()
+
+    # "open youtube" is a website, not an app
+    if intent == "open_app" and slots.get("app_name", "").replace(" ", "") in actions.WEBSITES:
+        intent = "open_website"
+        slots = {"website_name": slots["app_name"]}
+        description = "Opening {website_name}."
+
+    # The open/close rules take any words, so only trust app names Pilot knows
+    if intent in ("open_app", "close_app") and slots.get("app_name") not in actions.known_app_names():
+        confidence = min(confidence, UNKNOWN_APP_CONFIDENCE)
+
+    response = {
+        "intent": intent,
+        "description": description.format(**slots),
+        "app_name": None,
+        "text_message": None,
+        "website_name": None,
+        "search_query": None,
+        "source": "local",
+        "confidence": round(confidence, 3),
+    }
+    response.update(slots)
+    return response
+
+
+def is_multi_action(text):
+    """True for joined commands like "open discord and spotify" or "open discord, spotify" """
+    return bool(MULTI_ACTION.search(normalize_utterance(text, keep_commas=True)))
+
+
+def _accept(response, min_confidence):
+    return response if response["confidence"] >= min_confidence else None
+
+
+def match_intent(text, min_confidence=MIN_CONFIDENCE):
+    """
+    Resolve common commands locally without calling Gemini.
+
+    Args:
+        text (str): The recognized utterance, with or without the trigger word
+        min_confidence (float): Minimum fuzzy-match score to accept
+
+    Returns:
+        dict: An ActionModel-shaped response with "source" and "confidence"
+        keys, or None if the command should go to the LLM
+    """
+    command = normalize_utterance(text)
+    if not command or is_multi_action(text):
+        return None
+
+    result = _apply_rules(command)
+    if result:
+        return _accept(_build_response(*result, confidence=1.0), min_confidence)
+
+    # Fuzzy: whole short commands against canonical phrases
+    if len(command.split()) <= 4:
+        close = difflib.get_close_matches(command, CANONICAL_PHRASES, n=1, cutoff=min_confidence)
+        if close:
+            confidence = difflib.SequenceMatcher(None, command, close[0]).ratio()
+            result = _apply_rules(close[0])
+            if result:
+                return _accept(_build_response(*result, confidence=confidence), min_confidence)
+
+    # Fuzzy: a misheard leading verb ("lunch spotify")
+    first, _, rest = command.partition(" ")
+    if rest:
+        close = difflib.get_close_matches(first, VERBS, n=1, cutoff=min_confidence)
+        if close and close[0] != first:
+            confidence = difflib.SequenceMatcher(None, first, close[0]).ratio()
+            result = _apply_rules(f"{close[0]} {rest}")
+            if result:
+                return _accept(_build_response(*result, confidence=confidence), min_confidence)
+
+    return None
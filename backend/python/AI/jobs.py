@@ -0,0 +1,289 @@
+"""
+Runs actions as background jobs so a long one (the demo video, chat spam,
+the webcam warm-up) doesn't stop Pilot from listening.
+
+Each job gets an ID, a timeout from its @action declaration and a place in
+the concurrency limits: at most MAX_RUNNING_JOBS at once, and one at a time
+per registry resource. Threads can't be killed, so cancelling and timing
+out are cooperative: long actions poll cancelled() (or sleep with wait())
+and return early.
+
+Lifecycle events go out on the 'pilot_event' channel as job_queued,
+job_started, job_progress, job_cancelling and job_finished.
+"""
+import os
+import time
+import threading
+import itertools
+import collections
+
+from . import registry
+import tracing
+import metrics
+
+DEFAULT_ACTION_TIMEOUT = float(os.getenv("PILOT_ACTION_TIMEOUT", "30")) # seconds, unless the action sets its own
+MAX_RUNNING_JOBS = int(os.getenv("PILOT_MAX_RUNNING_JOBS", "4"))
+JOB_HISTORY = 50 # finished jobs kept for /jobs
+
+ACTION_SECONDS = metrics.histogram("pilot_action_seconds", "Action run time, by intent and final status", ["intent", "status"])
+
+_local = threading.local()
+
+
+def current_job():
+    """The job the calling thread is running, if any"""
+    return getattr(_local, "job", None)
+
+def cancelled():
+    """True once the current job has been cancelled or has run out of time"""
+    job = current_job()
+    return bool(job and job.cancel_event.is_set())
+
+def wait(seconds):
+    """Sleep for up to `seconds`, waking early on cancellation; returns cancelled()"""
+    job = current_job()
+    if job is None:
+        time.sleep(seconds)
+        return False
+    return job.cancel_event.wait(seconds)
+
+def report_progress(fraction, text=None):
+    """Tell the overlay how far the current job has got (0.0 - 1.0)"""
+    job = current_job()
+    if job:
+        job.progress = round(min(1.0, max(0.0, fraction)), 3)
+        job.scheduler._emit("progress", job, text=text)
+
+
+class Job:
+    def __init__(self, scheduler, job_id, intent, context, timeout):
+        self.scheduler = scheduler
+        self.id = job_id
+        self.intent = intent
+        self.context = context
+        self.timeout = timeout
+        self.status = "queued" # queued, running, done, failed, cancelled, timed_out
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.feedback = None
+        self.error = None
+        self.progress = 0.0
+        self.cancel_reason = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+        # The utterance this job belongs to, carried onto the job's thread
+        self.trace = tracing.current()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "intent": self.intent,
+            "status": self.status,
+            "progress": self.progress,
+            "timeout": self.timeout,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "feedback": self.feedback,
+            "error": self.error,
+        }
+
+
+class JobScheduler:
+    def __init__(self, max_running=MAX_RUNNING_JOBS, history=JOB_HISTORY):
+        self.socketio = None
+        self._slots = threading.BoundedSemaphore(max_running)
+        self.max_running = max_running
+        self._resource_locks = collections.defaultdict(threading.Lock)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._active = collections.OrderedDict() # job id -> Job, oldest first
+        self._finished = collections.deque(maxlen=history)
+        self.counts = collections.Counter()
+
+    def set_socketio(self, socketio):
+        """Set the WebSocket reference for job events"""
+        self.socketio = socketio
+
+    def _emit(self, event, job, **extra):
+        if self.socketio:
+            payload = {'type': f'job_{event}', 'job': job.to_dict(), 'timestamp': time.time()}
+            payload.update({key: value for key, value in extra.items() if value is not None})
+            if tracing.ATTACH_TO_EVENTS and job.trace:
+                payload['trace_id'] = job.trace.id
+            self.socketio.emit('pilot_event', payload)
+
+    def _new_job(self, intent, context):
+        spec = registry.ACTIONS.get(intent)
+        timeout = spec.timeout if spec and spec.timeout else DEFAULT_ACTION_TIMEOUT
+        with self._lock:
+            job = Job(self, f"job-{next(self._ids)}", intent, context, timeout)
+            self._active[job.id] = job
+        self._emit("queued", job)
+        return job
+
+    def submit(self, intent, context, on_done=None):
+        """
+        Run an action in the background.
+
+        Args:
+            intent (str): The action to run
+            context (dict): Slot values for it
+            on_done (callable): Called with the Job once it has finished
+
+        Returns:
+            Job: The queued job (inline actions have already finished)
+        """
+        job = self._new_job(intent, context)
+        spec = registry.ACTIONS.get(intent)
+        if spec and spec.inline:
+            self._execute(job, on_done)
+        else:
+            threading.Thread(target=self._execute, args=(job, on_done), name=job.id, daemon=True).start()
+        return job
+
+    def run(self, intent, context):
+        """Run an action as a job on the calling thread and return the finished Job"""
+        job = self._new_job(intent, context)
+        self._execute(job)
+        return job
+
+    def _acquire(self, job, lock):
+        # Poll so a job cancelled while queued gives up its place
+        while not lock.acquire(timeout=0.1):
+            if job.cancel_event.is_set():
+                return False
+        return True
+
+    def _execute(self, job, on_done=None):
+        with tracing.activate(job.trace):
+            self._execute_job(job, on_done)
+
+    def _execute_job(self, job, on_done):
+        spec = registry.ACTIONS.get(job.intent)
+        held = []
+        timer = None
+        try:
+            if not (spec and spec.inline):
+                if spec and spec.resource:
+                    if not self._acquire(job, self._resource_locks[spec.resource]):
+                        return
+                    held.append(self._resource_locks[spec.resource])
+                if not self._acquire(job, self._slots):
+                    return
+                held.append(self._slots)
+
+            job.status = "running"
+            job.started = time.time()
+            tracing.record("action_queue", time.monotonic() - (job.started - job.created), time.monotonic(),
+                           intent=job.intent, job_id=job.id)
+            timer = threading.Timer(job.timeout, self._time_out, args=(job,))
+            timer.daemon = True
+            timer.start()
+            self._emit("started", job)
+
+            _local.job = job
+            try:
+                with tracing.span("action_dispatch", intent=job.intent, job_id=job.id):
+                    job.feedback = registry.dispatch(job.intent, job.context)
+            except Exception as e:
+                print(f"❌ Job {job.id} ({job.intent}) failed: {e}")
+                job.error = str(e)
+            finally:
+                _local.job = None
+
+        finally:
+            if timer:
+                timer.cancel()
+            for lock in reversed(held):
+                lock.release()
+            self._finish(job)
+            if on_done:
+                on_done(job)
+
+    def _finish(self, job):
+        if job.cancel_reason == "timeout":
+            job.status = "timed_out"
+        elif job.cancel_event.is_set():
+            job.status = "cancelled"
+        elif job.error:
+            job.status = "failed"
+        else:
+            job.status = "done"
+            job.progress = 1.0
+        job.finished = time.time()
+        if job.started:
+            ACTION_SECONDS.observe(job.finished - job.started, intent=job.intent, status=job.status)
+        if job.status in ("failed", "timed_out"):
+            metrics.errors.inc(stage="action")
+
+        with self._lock:
+            self._active.pop(job.id, None)
+            self._finished.append(job)
+            self.counts[job.status] += 1
+        job.done_event.set()
+        self._emit("finished", job)
+        print(f"Job {job.id} ({job.intent}) {job.status}")
+
+    def _time_out(self, job):
+        if not job.cancel_event.is_set():
+            print(f"⏱️ Job {job.id} ({job.intent}) ran past {job.timeout:g}s, stopping it")
+            job.cancel_reason = "timeout"
+            job.cancel_event.set()
+            self._emit("cancelling", job, reason="timeout")
+
+    def cancel(self, job_id=None):
+        """
+        Cancel a job by ID, or the most recently started one.
+
+        Returns:
+            list: The jobs that were asked to stop
+        """
+        with self._lock:
+            candidates = [job for job in self._active.values()
+                          if job is not current_job() and not job.cancel_event.is_set()]
+        if job_id is not None:
+            candidates = [job for job in candidates if job.id == job_id]
+        else:
+            # Prefer a running job over one still waiting for a slot
+            running = [job for job in candidates if job.status == "running"]
+            candidates = (running or candidates)[-1:]
+        return [self._cancel(job) for job in candidates]
+
+    def cancel_all(self):
+        with self._lock:
+            candidates = [job for job in self._active.values() if job is not current_job()]
+        return [self._cancel(job) for job in candidates if not job.cancel_event.is_set()]
+
+    def _cancel(self, job):
+        job.cancel_reason = job.cancel_reason or "user"
+        job.cancel_event.set()
+        self._emit("cancelling", job, reason=job.cancel_reason)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            if job_id in self._active:
+                return self._active[job_id]
+            return next((job for job in self._finished if job.id == job_id), None)
+
+    def jobs(self):
+        """Active jobs, then recently finished ones (newest first)"""
+        with self._lock:
+            return [job.to_dict() for job in self._active.values()] + \
+                   [job.to_dict() for job in reversed(self._finished)]
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._active.values() if job.status == "running")
+            return {
+                "running": running,
+                "queued": len(self._active) - running,
+                "max_running": self.max_running,
+                "finished": dict(self.counts),
+            }
+
+
+# Shared by pilot_do and the server
+scheduler = JobScheduler()
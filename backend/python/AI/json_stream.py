@@ -0,0 +1,73 @@
+import json
+
+
+class IncrementalJSONParser:
+    """
+    Pulls completed fields out of a JSON object while it is still streaming.
+
+    Feed text chunks as they arrive; feed() returns the (key, value) pairs of
+    the first JSON object that became complete with that chunk. The object
+    may be wrapped in an array, as with a list[ActionModel] response schema.
+    Nested values are returned once they are fully closed.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._object_depth = None # depth inside the first object once it opens
+        self._field_start = None
+        self._in_string = False
+        self._escaped = False
+        self.done = False
+        self.fields = {}
+
+    def feed(self, text):
+        if self.done or not text:
+            return []
+
+        self._buffer += text
+        completed = []
+
+        while self._pos < len(self._buffer):
+            char = self._buffer[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if char == "{" and self._object_depth is None:
+                    self._object_depth = self._depth
+                    self._field_start = self._pos + 1
+            elif char in "}]":
+                if self._depth == self._object_depth:
+                    self._complete_field(self._pos, completed)
+                    self.done = True
+                    self._pos += 1
+                    break
+                self._depth -= 1
+            elif char == "," and self._depth == self._object_depth:
+                self._complete_field(self._pos, completed)
+                self._field_start = self._pos + 1
+
+            self._pos += 1
+
+        return completed
+
+    def _complete_field(self, end, completed):
+        segment = self._buffer[self._field_start:end].strip()
+        if not segment:
+            return
+        try:
+            (key, value), = json.loads("{" + segment + "}").items()
+        except (ValueError, TypeError):
+            return
+        self.fields[key] = value
+        completed.append((key, value))
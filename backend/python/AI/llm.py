@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import random
+import threading
+import concurrent.futures
+import requests
+from dotenv import load_dotenv
+import metrics
+
+GEMINI_MODEL = "gemini-1.5-flash-latest"
+LLM_BACKEND = os.getenv("PILOT_LLM_BACKEND", "gemini") # "gemini" or "stub"
+LLM_STUB_URL = os.getenv("PILOT_LLM_STUB_URL", "http://127.0.0.1:8765")
+LLM_DEADLINE_SECONDS = float(os.getenv("PILOT_LLM_DEADLINE", "8")) # whole call, retries included
+LLM_MAX_ATTEMPTS = int(os.getenv("PILOT_LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_SECONDS = 0.25 # first backoff; doubles per attempt, with full jitter
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("PILOT_LLM_HEDGE_AFTER", "0")) # 0 disables hedging
+
+
+class LLMTimeout(Exception):
+    pass
+
+
+class LLMBackend:
+    """
+    A text-generation service returning JSON for a response schema.
+
+    Subclasses implement generate() for a whole response and stream() for
+    text chunks; `timeout` is the time left for this attempt, in seconds.
+    """
+
+    name = "base"
+
+    def generate(self, prompt, schema, timeout):
+        raise NotImplementedError
+
+    def stream(self, prompt, schema, timeout):
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through one long-lived genai.Client (connection pool reused)"""
+
+    name = "gemini"
+
+    def __init__(self, api_key=None, model=GEMINI_MODEL):
+        from google import genai
+        from google.genai import types
+
+        self._types = types
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        self.model = model
+        self.client = genai.Client(api_key=api_key)
+
+    def _config(self, schema, timeout):
+        return self._types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=schema,
+            http_options=self._types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+        )
+
+    def generate(self, prompt, schema, timeout):
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._config(schema, timeout),
+        )
+        return response.text
+
+    def stream(self, prompt, schema, timeout):
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+            config=self._config(schema, timeout),
+        ):
+            yield chunk.text or ""
+
+
+class StubBackend(LLMBackend):
+    """Talks to AI/llm_stub_server.py, which returns scripted ActionModel JSON"""
+
+    name = "stub"
+
+    def __init__(self, url=LLM_STUB_URL):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+
+    def generate(self, prompt, schema, timeout):
+        response = self.session.post(f"{self.url}/generate", json={"prompt": prompt}, timeout=timeout)
+        response.raise_for_status()
+        return response.text
+
+    def stream(self, prompt, schema, timeout):
+        with self.session.post(f"{self.url}/stream", json={"prompt": prompt},
+                               timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                yield chunk
+
+
+_backend = None
+_backend_lock = threading.Lock()
+# Shared by hedged requests so each call doesn't spin up its own threads
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+LLM_SECONDS = metrics.histogram("pilot_llm_seconds", "Whole LLM call time, retries included", ["mode", "outcome"])
+
+stats = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "timeouts": 0, "errors": 0}
+
+
+def get_backend():
+    """Create the configured backend once and reuse it for every call"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                load_dotenv()
+                if LLM_BACKEND == "stub":
+                    _backend = StubBackend()
+                elif LLM_BACKEND == "gemini":
+                    _backend = GeminiBackend()
+                else:
+                    raise ValueError(f"Unknown LLM backend '{LLM_BACKEND}'")
+                print(f"LLM backend: {_backend.name}")
+    return _backend
+
+def set_backend(backend):
+    """Swap the backend (e.g. for a stub in offline tests)"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+def _backoff(attempt):
+    # Full jitter keeps retries from many callers from lining up
+    return random.uniform(0, LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+
+def _attempt(prompt, schema, deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise LLMTimeout("LLM deadline exceeded")
+    stats["attempts"] += 1
+    return get_backend().generate(prompt, schema, remaining)
+
+def _hedged_attempt(prompt, schema, deadline, hedge_after):
+    """Start a second identical request if the first is slow; first success wins"""
+    futures = [_executor.submit(_attempt, prompt, schema, deadline)]
+    done, _ = concurrent.futures.wait(futures, timeout=hedge_after)
+    if not done:
+        stats["hedges"] += 1
+        futures.append(_executor.submit(_attempt, prompt, schema, deadline))
+
+    error = None
+    remaining = max(0, deadline - time.monotonic())
+    for future in concurrent.futures.as_completed(futures, timeout=remaining):
+        try:
+            return future.result()
+        except Exception as e:
+            error = e
+    raise error
+
+def generate(prompt, schema, deadline_seconds=LLM_DEADLINE_SECONDS,
+             max_attempts=LLM_MAX_ATTEMPTS, hedge_after=LLM_HEDGE_AFTER_SECONDS):
+    """
+    Generate a JSON response with a deadline and bounded, jittered retries.
+
+    Args:
+        prompt (str): The prompt
+        schema: Response schema (pydantic model or list of one)
+        deadline_seconds (float): Budget for the whole call, retries included
+        max_attempts (int): Attempts before giving up
+        hedge_after (float): Seconds before sending a duplicate request; 0 disables
+
+    Returns:
+        str: Response JSON text
+    """
+    stats["calls"] += 1
+    started = time.monotonic()
+    deadline = started + deadline_seconds
+    last_error = None
+
+    for attempt in range(max_attempts):
+        try:
+            if hedge_after:
+                text = _hedged_attempt(prompt, schema, deadline, hedge_after)
+            else:
+                text = _attempt(prompt, schema, deadline)
+            LLM_SECONDS.observe(time.monotonic() - started, mode="generate", outcome="ok")
+            return text
+        except (LLMTimeout, concurrent.futures.TimeoutError) as e:
+            last_error = e
+            break
+        except Exception as e:
+            last_error = e
+            stats["errors"] += 1
+            metrics.errors.inc(stage="llm")
+            print(f"LLM attempt {attempt + 1}/{max_attempts} failed: {e}")
+
+        delay = _backoff(attempt)
+        if attempt + 1 >= max_attempts or time.monotonic() + delay >= deadline:
+            break
+        stats["retries"] += 1
+        time.sleep(delay)
+
+    if isinstance(last_error, (LLMTimeout, concurrent.futures.TimeoutError)) or time.monotonic() >= deadline:
+        stats["timeouts"] += 1
+        LLM_SECONDS.observe(time.monotonic() - started, mode="generate", outcome="timeout")
+        raise LLMTimeout(f"LLM call did not finish within {deadline_seconds}s")
+    LLM_SECONDS.observe(time.monotonic() - started, mode="generate", outcome="error")
+    raise last_error
+
+def generate_stream(prompt, schema, deadline_seconds=LLM_DEADLINE_SECONDS,
+                    max_attempts=LLM_MAX_ATTEMPTS):
+    """
+    Stream response text chunks under the same deadline and retry policy.
+
+    Only failures before the first chunk are retried; once text has been
+    handed to the caller a failure is raised, since it may have acted on it.
+    """
+    stats["calls"] += 1
+    started = time.monotonic()
+    deadline = started + deadline_seconds
+
+    for attempt in range(max_attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        stats["attempts"] += 1
+        started_output = False
+        try:
+            for chunk in get_backend().stream(prompt, schema, remaining):
+                if time.monotonic() > deadline:
+                    stats["timeouts"] += 1
+                    raise LLMTimeout(f"LLM stream did not finish within {deadline_seconds}s")
+                started_output = True
+                yield chunk
+            LLM_SECONDS.observe(time.monotonic() - started, mode="stream", outcome="ok")
+            return
+        except LLMTimeout:
+            LLM_SECONDS.observe(time.monotonic() - started, mode="stream", outcome="timeout")
+            raise
+        except Exception as e:
+            stats["errors"] += 1
+            metrics.errors.inc(stage="llm")
+            if not started_output:
+                print(f"LLM stream attempt {attempt + 1}/{max_attempts} failed: {e}")
+            if started_output or attempt + 1 >= max_attempts:
+                LLM_SECONDS.observe(time.monotonic() - started, mode="stream", outcome="error")
+                raise
+
+        delay = _backoff(attempt)
+        if time.monotonic() + delay >= deadline:
+            break
+        stats["retries"] += 1
+        time.sleep(delay)
+
+    stats["timeouts"] += 1
+    LLM_SECONDS.observe(time.monotonic() - started, mode="stream", outcome="timeout")
+    raise LLMTimeout(f"LLM stream did not start within {deadline_seconds}s")
@@ -0,0 +1,192 @@
+"""
+Local stand-in for Gemini.
+
+Serves scripted ActionModel JSON with configurable latency so LLM
+throughput and tail latency can be measured offline.
+
+    POST /generate  {"prompt": ...} -> JSON list with one action
+    POST /stream    {"prompt": ...} -> the same JSON, sent in timed chunks
+
+Script file (all keys optional):
+
+    {
+        "latency_ms": 300, "jitter_ms": 100, "error_rate": 0.05,
+        "chunk_size": 16, "chunk_delay_ms": 20,
+        "responses": [{"match": "spotify", "response": [{"intent": "open_app", "app_name": "spotify", "description": "On it."}]}],
+        "default": [{"intent": "media_pause", "description": "Paused."}]
+    }
+
+Run a server:
+    python -m AI.llm_stub_server --port 8765 --latency-ms 300
+Run a load test against an in-process server:
+    python -m AI.llm_stub_server --bench 200 --concurrency 8 --latency-ms 300 --jitter-ms 200 --hedge-after 0.5
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import concurrent.futures
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SCRIPT = {
+    "latency_ms": 200,
+    "jitter_ms": 0,
+    "error_rate": 0.0,
+    "chunk_size": 16,
+    "chunk_delay_ms": 10,
+    "responses": [],
+    "default": [{"intent": "media_pause", "app_name": None, "text_message": None,
+                 "website_name": None, "search_query": None, "description": "Paused."}],
+}
+
+
+def make_handler(script):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass # keep load tests quiet
+
+        def _pick_response(self, prompt):
+            prompt = prompt.lower()
+            for entry in script["responses"]:
+                if entry["match"].lower() in prompt:
+                    return entry["response"]
+            return script["default"]
+
+        def _read_prompt(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            return body.get("prompt", "")
+
+        def _delay(self):
+            latency = script["latency_ms"] + random.uniform(-1, 1) * script["jitter_ms"]
+            time.sleep(max(0, latency) / 1000)
+
+        def do_POST(self):
+            prompt = self._read_prompt()
+            self._delay()
+
+            if random.random() < script["error_rate"]:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            payload = json.dumps(self._pick_response(prompt))
+
+            if self.path == "/generate":
+                data = payload.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            elif self.path == "/stream":
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                size = script["chunk_size"]
+                for i in range(0, len(payload), size):
+                    data = payload[i:i + size].encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(script["chunk_delay_ms"] / 1000)
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+    return StubHandler
+
+
+def start_server(script=None, host="127.0.0.1", port=0):
+    """Start the stub in a background thread; returns (server, url)"""
+    merged = dict(DEFAULT_SCRIPT, **(script or {}))
+    server = ThreadingHTTPServer((host, port), make_handler(merged))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))]
+
+
+def run_load_test(url, requests_count, concurrency, hedge_after=0.0, deadline=8.0):
+    """Push `requests_count` calls through the real retry/deadline policy and report latency"""
+    from . import llm
+
+    llm.set_backend(llm.StubBackend(url))
+
+    def one_call(i):
+        started = time.monotonic()
+        try:
+            llm.generate(f"The user said: 'request {i}'", None, deadline_seconds=deadline, hedge_after=hedge_after)
+            return time.monotonic() - started, None
+        except Exception as e:
+            return time.monotonic() - started, type(e).__name__
+
+    started = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_call, range(requests_count)))
+    wall = time.monotonic() - started
+
+    latencies = [latency * 1000 for latency, error in results if error is None]
+    errors = {}
+    for _, error in results:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+
+    return {
+        "requests": requests_count,
+        "concurrency": concurrency,
+        "hedge_after": hedge_after,
+        "throughput_rps": round(requests_count / wall, 2),
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_p99_ms": percentile(latencies, 99),
+        "errors": errors,
+        "policy": dict(llm.stats),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scripted Gemini stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--script", help="JSON script file")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--bench", type=int, help="Run this many requests against an in-process server and exit")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hedge-after", type=float, default=0.0)
+    args = parser.parse_args()
+
+    script = {}
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    for key in ("latency_ms", "jitter_ms", "error_rate"):
+        if getattr(args, key) is not None:
+            script[key] = getattr(args, key)
+
+    if args.bench:
+        server, url = start_server(script)
+        print(json.dumps(run_load_test(url, args.bench, args.concurrency, args.hedge_after), indent=2))
+        server.shutdown()
+    else:
+        server, url = start_server(script, args.host, args.port)
+        print(f"LLM stub listening on {url} (set PILOT_LLM_BACKEND=stub PILOT_LLM_STUB_URL={url})")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
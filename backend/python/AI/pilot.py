@@ -1,48 +1,74 @@
 import os
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
-import re
-import pyautogui
-import webbrowser
 import enum
 from . import actions
+from . import intents
+from .intent_cache import IntentCache
+from .json_stream import IncrementalJSONParser
+from . import llm
+from . import registry
+from . import executor
+from . import jobs
 from typing import Optional, List
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict, create_model
 import json
 import ast
-from tts_client import speak
+from tts_client import speak, URGENT, LOW
+import tracing
+import metrics
 import threading
+import time
 
 
 
-class ActionModel(BaseModel):
-    intent: str = Field(..., description="The specific action to perform")
-    description: str = Field(..., description="The response to the user that you are going to say back to them, you can have a little fun with this one")
-    app_name: Optional[str] = Field(None, description="Application to open or close (for open_app or close_app intents)")
-    text_message: Optional[str] = Field(None, description="Message text (for send_discord and video game chat intents)")
-    website_name: Optional[str] = Field(None, description="The name of the website to open (for open_website intent)")
-    search_query: Optional[str] = Field(None, description="The query to search on the web (for search_web intent)")
+# Gemini resolutions of repeated commands ("pilot open spotify") are reused.
+# Set PILOT_INTENT_CACHE_FILE to keep them across restarts.
+intent_cache = IntentCache(
+    max_entries=int(os.getenv("PILOT_INTENT_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("PILOT_INTENT_CACHE_TTL", str(24 * 60 * 60))),
+    path=os.getenv("PILOT_INTENT_CACHE_FILE") or None,
+)
 
-    class Config:
+# Stream Gemini's answer and start the action as soon as its fields are in
+STREAMING = os.getenv("PILOT_LLM_STREAMING", "1") == "1"
+
+# Timings of the most recent LLM call, in seconds
+last_llm_timing = {}
+
+# Where pilot_event messages go; set by the server (None outside it)
+_socketio = None
+
+def set_socketio(socketio):
+    """Set the WebSocket reference for pilot events"""
+    global _socketio
+    _socketio = socketio
+
+COMMANDS = metrics.counter("pilot_commands_total", "Actions started, by intent and how the intent was resolved", ["intent", "source"])
+
+
+def _build_action_model():
+    """ActionModel generated from the action registry: intent enum plus every declared slot"""
+    Intent = enum.Enum("Intent", [(name, name) for name in registry.action_names()], type=str)
+
+    fields = {"intent": (Intent, Field(..., description="The specific action to perform"))}
+    for slot, description in registry.slot_descriptions().items():
+        fields[slot] = (Optional[str], Field(None, description=description))
+    # Last, so a streamed response can be acted on before the reply is complete
+    fields["description"] = (str, Field(..., description="The response to the user that you are going to say back to them, you can have a little fun with this one"))
+
+    return create_model(
+        "ActionModel",
         #: Enforce JSON schema output with ordered properties
-        model_config = {
-            "json_schema_extra": {
-                "propertyOrdering": [
-                    "intent",
-                    "description",
-                    "app_name",
-                    "text_message",
-                    "website_name",
-                    "search_query"
-                ]
-            }
-        }
+        __config__=ConfigDict(json_schema_extra={"propertyOrdering": list(fields)}),
+        **fields
+    )
+
+ActionModel = _build_action_model()
 
 class MultipleActionsModel(BaseModel):
     actions: List[ActionModel] = Field(..., description="List of actions to perform")
     overall_description: str = Field(..., description="Overall response to the user describing what actions will be performed")
-    execution_order: Optional[List[int]] = Field(None, description="Order in which actions should be executed (0-based indices)")
+    execution_order: Optional[List[int]] = Field(None, description="Order in which actions should be started (0-based indices)")
+    depends_on: Optional[List[List[int]]] = Field(None, description="For each action, the indices of actions that must finish before it starts (e.g. open an app before typing in it); an empty list if it can run straight away")
 
     class Config:
         model_config = {
@@ -50,7 +76,8 @@ class MultipleActionsModel(BaseModel):
                 "propertyOrdering": [
                     "actions",
                     "overall_description", 
-                    "execution_order"
+                    "execution_order",
+                    "depends_on"
                 ]
             }
         }
@@ -78,22 +105,16 @@ def pilot_query(prompt, multiple_actions=False):
         else:
             schema = list[ActionModel]
         
-        # Generate structured output
-        response = client.models.generate_content(
-            model="gemini-1.5-flash-latest",
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type="application/json",
-                response_schema=schema
-            ),
-        )
+        # Generate structured output (deadline and retries are handled by llm)
+        with tracing.span("llm", streaming=False):
+            response_text = llm.generate(prompt, schema)
 
         # Parse the response
         if multiple_actions:
-            data = json.loads(response.text.strip())
+            data = json.loads(response_text.strip())
             return data
         else:
-            data = json.loads(response.text.strip())[0]
+            data = json.loads(response_text.strip())[0]
             print(data, type(data))
             return ast.literal_eval(data) if isinstance(data, str) else data
 
@@ -101,6 +122,63 @@ def pilot_query(prompt, multiple_actions=False):
         return f"Error: {e}"
 
 
+def _action_ready(fields):
+    """True once the intent and every slot it needs have been parsed"""
+    intent = fields.get("intent")
+    return bool(intent) and all(slot in fields for slot in registry.required_slots(intent))
+
+def pilot_query_stream(prompt, on_action, on_description):
+    """
+    Streaming version of pilot_query for a single action.
+
+    on_action(fields) is called as soon as the intent and its slots are
+    parsed, and on_description(text) as soon as the description is, both
+    before the response has finished streaming.
+
+    Returns:
+        dict: The complete action, or an error string like pilot_query
+    """
+    started = time.monotonic()
+    timing = {"first_action": None}
+    parser = IncrementalJSONParser()
+    fields = {}
+    action_sent = False
+
+    try:
+        for chunk in llm.generate_stream(prompt, list[ActionModel]):
+            for key, value in parser.feed(chunk):
+                fields[key] = value
+
+                if not action_sent and _action_ready(fields):
+                    action_sent = True
+                    timing["first_action"] = time.monotonic() - started
+                    tracing.mark("llm_first_action", intent=fields.get("intent"))
+                    on_action(dict(fields))
+
+                if key == "description" and value:
+                    on_description(value)
+
+        if not fields.get("intent"):
+            return "Error: no intent in streamed response"
+
+        # Optional slots may never appear; dispatch with what we have
+        if not action_sent:
+            timing["first_action"] = time.monotonic() - started
+            on_action(dict(fields))
+
+        return fields
+
+    except Exception as e:
+        return f"Error: {e}"
+
+    finally:
+        timing["total"] = time.monotonic() - started
+        tracing.record("llm", started, started + timing["total"], streaming=True)
+        last_llm_timing.clear()
+        last_llm_timing.update(timing)
+        print(f"LLM timing: first action {timing['first_action']}, total {timing['total']:.3f}s")
+
+
 # def handle_pilot_command(prompt):
 #     if "clip" in prompt:
 #         return "[Mock] Clipping last 30 seconds..."
@@ -112,11 +190,13 @@ def pilot_query(prompt, multiple_actions=False):
 #         return pilot_query(prompt)
 
 
-def extract_response(user_prompt, multiple_actions=False):
-    # Get available actions dynamically
-    available_actions = actions.action_list()
-    print(available_actions)
-    actions_str = ", ".join(available_actions)
+MULTI_ACTION_RULES = """- Return one action per request. Actions run at the same time unless `depends_on` says one must wait for another.
+        - Only add a dependency when the order matters (e.g. open the game before typing in its chat)."""
+
+def build_prompt(user_prompt, multiple_actions=False):
+    # Get available actions dynamically from the action registry
+    available_actions = registry.prompt_listing()
+    actions_str = "; ".join(available_actions)
     
     prompt = (
         f"""
@@ -133,151 +213,300 @@ def extract_response(user_prompt, multiple_actions=False):
         - For web: use `open_website` with `website_name` or `search_web` with `search_query`.
         - The 'description' field is your spoken response to the user. Keep it brief.
         - Be mindful of speech-to-text errors (e.g., "modify" might be "spotify").
+        {MULTI_ACTION_RULES if multiple_actions else ""}
         
         Choose the best intent and respond.
         """
     )
-    response_dict = pilot_query(prompt) 
+    return prompt
+
+def _cache_key(user_prompt, multiple_actions=False):
+    # Keyed on the normalized utterance so "Pilot, open Spotify." and
+    # "pilot open spotify please" share an entry
+    return f"{'multi' if multiple_actions else 'single'}:{intents.normalize_utterance(user_prompt)}"
+
+def extract_response(user_prompt, multiple_actions=False):
+    # Common commands are resolved locally, skipping the Gemini round-trip
+    local_response = intents.match_intent(user_prompt)
+    if local_response:
+        print(f"Local intent match: {local_response['intent']} (confidence {local_response['confidence']})")
+        tracing.mark("local_intent_match", intent=local_response["intent"])
+        return local_response
+
+    prompt = build_prompt(user_prompt, multiple_actions)
+    # Errors are never cached
+    response_dict = intent_cache.get_or_compute(
+        _cache_key(user_prompt, multiple_actions),
+        lambda: pilot_query(prompt, multiple_actions),
+        should_cache=lambda value: isinstance(value, dict)
+    )
     return response_dict
 
-def execute_action(intent, context):
-    if intent == "clip":
-        actions.clip_screen()
-        return
-    elif intent == "screenshot":
-        actions.screenshot()
-        return
-    elif intent == "open_app":
-        return actions.open_app(context.get("app_name"))
-    elif intent == "close_app":
-        return actions.close_app(context.get("app_name"))
-    elif intent == "media_play":
-        return actions.media_play()
-    elif intent == "media_pause":
-        return actions.media_pause()
-    elif intent == "media_next":
-        return actions.media_next()
-    elif intent == "media_previous":
-        return actions.media_previous()
-    elif intent == "take_picture":
-        return actions.take_picture()
-    elif intent == "play_demo":
-        return actions.play_demo()
-    elif intent == "open_website":
-        return actions.open_website(context.get("website_name"))
-    elif intent == "search_web":
-        return actions.search_web(context.get("search_query"))
-    elif intent == "list_steam_games":
-        return actions.list_steam_games()
-    elif intent == "afk":
-        return actions.afk()
-    elif intent == "stop_afk":
-        return actions.stop_afk()
-    elif intent == "type_chat":
-        return actions.type_chat(context.get("text_message"))
-    elif intent == "spam_chat":
-        return actions.spam_chat(context.get("text_message"))
-    elif intent == "move_around":
-        return actions.afk(duration_minutes=1, movement_interval=1)
+def extract_response_streaming(user_prompt, on_action, on_description):
+    """
+    Like extract_response, but calls on_action(fields) and on_description(text)
+    as early as possible: while Gemini is still streaming, or straight away
+    for local matches and cache hits. Each callback is called at most once.
+    """
+    called = {"action": False, "description": False}
+
+    def action_callback(fields):
+        called["action"] = True
+        on_action(fields)
+
+    def description_callback(text):
+        called["description"] = True
+        on_description(text)
+
+    response = intents.match_intent(user_prompt)
+    if response:
+        print(f"Local intent match: {response['intent']} (confidence {response['confidence']})")
+        tracing.mark("local_intent_match", intent=response["intent"])
     else:
-        print("Unknown or unsupported command.")
-        return "Sorry, I don't know how to do that."
+        prompt = build_prompt(user_prompt)
+        response = intent_cache.get_or_compute(
+            _cache_key(user_prompt),
+            lambda: pilot_query_stream(prompt, action_callback, description_callback),
+            should_cache=lambda value: isinstance(value, dict)
+        )
+
+    # Local match, cache hit or merged request: nothing has been dispatched yet
+    if isinstance(response, dict):
+        if not called["action"] and response.get("intent"):
+            action_callback(response)
+        if not called["description"] and response.get("description"):
+            description_callback(response["description"])
+
+    return response
+
+def execute_action(intent, context):
+    """Run the registered action for `intent` and return its spoken feedback, if any"""
+    return registry.dispatch(intent, context)
+
+def _run_job(intent, context):
+    """Run one action of a graph as a job (timeout, cancellation) on the graph's worker"""
+    job = jobs.scheduler.run(intent, context)
+    if job.status != "done":
+        raise RuntimeError(job.error or job.status)
+    return job.feedback
 
-def execute_multiple_actions(actions_data):
+def execute_multiple_actions(actions_data, on_start=None, on_result=None):
     """
-    Execute multiple actions in the specified order
+    Execute multiple actions, in parallel where nothing orders them
+
+    Returns:
+        list: One result dict per action (see executor.run_graph)
     """
     if not actions_data or "actions" not in actions_data:
         print("No actions to execute")
-        return
+        return []
     
     actions_list = actions_data["actions"]
-    execution_order = actions_data.get("execution_order")
-    
-    # If no specific order is provided, execute in the order they appear
-    if execution_order is None:
-        execution_order = list(range(len(actions_list)))
-    
-    print(f"Executing {len(actions_list)} actions in order: {execution_order}")
+    print(f"Executing {len(actions_list)} actions, order {actions_data.get('execution_order')}, "
+          f"dependencies {actions_data.get('depends_on')}")
     
-    for i, action in enumerate(actions_list):
-        print(f"Executing action {i+1}/{len(actions_list)}: {action['intent']}")
-        execute_action(action['intent'], action)
+    return executor.run_graph(
+        actions_list,
+        actions_data.get("execution_order"),
+        actions_data.get("depends_on"),
+        run=tracing.bind(_run_job),
+        on_start=on_start,
+        on_result=on_result
+    )
+
+def static_feedback_phrases():
+    """
+    Every fixed sentence Pilot can speak: the local intent replies plus the
+    constant strings actions return. Used to pre-warm the TTS cache.
+
+    Returns:
+        list: Unique phrases, in source order
+    """
+    phrases = [description for _, _, description in intents.RULES if "{" not in description]
+
+    # Constant `return "..."` statements in the action functions
+    with open(actions.__file__, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Return) and isinstance(node.value, ast.Constant) \
+                and isinstance(node.value.value, str) and node.value.value.strip():
+            phrases.append(node.value.value)
+
+    return list(dict.fromkeys(phrases))
 
 
 # Example usage
 if __name__ == "__main__":
 
-    load_dotenv()  # Loads variables from .env into environment
-    api_key = os.getenv("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+    llm.get_backend()  # Loads .env and creates the configured client
 
     while True:
         user_input = input("You: ")
         # Use multiple actions by default for more flexibility
         response = extract_response(user_input, multiple_actions=True)
         print(f"Response: {response}")
-        execute_action(response.get("intent"), response)
+        if isinstance(response, dict) and "actions" in response:
+            execute_multiple_actions(response)
+        elif isinstance(response, dict):
+            execute_action(response.get("intent"), response)
 
 
 
-def pilot_do(prompt, multiple_actions=True):
-    print(f"Pilot: {prompt}")
-    
-    # Import socketio here to avoid circular imports
-    try:
-        from server import socketio
-        import time
-    except ImportError:
-        socketio = None
-        import time
-    
-    response = extract_response(prompt)
-    
-    if not isinstance(response, dict):
-        print(f"Error processing command: {response}")
-        # Optionally, speak the error
-        threading.Thread(target=speak, args=(f"Sorry, I had an issue: {response}",), daemon=True).start()
-        return
-    
-    # Send pilot response to WebSocket
-    if socketio and response and response.get("description"):
-        socketio.emit('pilot_event', {
+def _announce(socketio, description, intent):
+    """Show Pilot's reply in the overlay and speak it (non-blocking)"""
+    if socketio:
+        socketio.emit('pilot_event', tracing.annotate({
             'type': 'pilot_response',
-            'text': response["description"],
+            'text': description,
             'timestamp': time.time(),
             'source': 'pilot',
-            'intent': response.get("intent", "unknown")
-        })
+            'intent': intent or "unknown"
+        }))
 
-    # Speak the description of what Pilot is about to do (non-blocking)
-    if response and response.get("description"):
-        threading.Thread(target=speak, args=(response["description"],), daemon=True).start()
-    
+    # Chatter: dropped if the queue is too far behind to say it in time
+    speak(description, priority=LOW)
+
+def _run_action(socketio, response):
+    """Start the action as a background job; its feedback is reported and spoken when it finishes"""
+    COMMANDS.inc(intent=response.get("intent", "unknown"), source=response.get("source", "llm"))
     # Send action start event
-    if socketio and response:
-        socketio.emit('pilot_event', {
+    if socketio:
+        socketio.emit('pilot_event', tracing.annotate({
             'type': 'action_start',
             'text': f"Executing: {response.get('intent', 'unknown')}",
             'timestamp': time.time(),
             'intent': response.get("intent", "unknown")
-        })
+        }))
     
-    # Execute the action and get the result feedback
-    # This now runs immediately, while the description is being spoken.
-    feedback = execute_action(response.get("intent"), response)
-
-    # Send action result to WebSocket
-    if socketio and feedback:
-        socketio.emit('pilot_event', {
-            'type': 'action_result',
-            'text': feedback,
-            'timestamp': time.time(),
-            'source': 'system'
-        })
+    def on_done(job):
+        feedback = job.feedback
+        text = feedback or (f"{job.intent} {job.status}: {job.error}" if job.error else None)
+
+        # Send action result to WebSocket
+        if socketio and text:
+            socketio.emit('pilot_event', tracing.annotate({
+                'type': 'action_result',
+                'text': text,
+                'timestamp': time.time(),
+                'source': 'system',
+                'job_id': job.id,
+                'status': job.status
+            }))
+
+        # Speak the feedback from the action's execution (queued, non-blocking)
+        if feedback:
+            speak(feedback)
+
+    # Runs off the listening thread, so Pilot keeps hearing commands meanwhile
+    return jobs.scheduler.submit(response.get("intent"), response, on_done)
 
-    # Speak the feedback from the action's execution (non-blocking)
-    if feedback:
-        threading.Thread(target=speak, args=(feedback,), daemon=True).start()
+def _run_multiple(socketio, prompt):
+    """Resolve a joined command into several actions and run them as a graph"""
+    response = extract_response(prompt, multiple_actions=True)
+
+    if not isinstance(response, dict):
+        print(f"Error processing command: {response}")
+        metrics.errors.inc(stage="intent")
+        speak(f"Sorry, I had an issue: {response}", priority=URGENT)
+        return
+
+    # Gemini may still answer a single action
+    if "actions" not in response:
+        if response.get("description"):
+            _announce(socketio, response["description"], response.get("intent"))
+        _run_action(socketio, response)
+        return
+
+    if response.get("overall_description"):
+        _announce(socketio, response["overall_description"], "multiple_actions")
+
+    def on_start(index, action):
+        COMMANDS.inc(intent=action.get("intent", "unknown"), source="llm")
+        if socketio:
+            socketio.emit('pilot_event', tracing.annotate({
+                'type': 'action_start',
+                'text': f"Executing: {action.get('intent', 'unknown')}",
+                'timestamp': time.time(),
+                'intent': action.get("intent", "unknown"),
+                'index': index
+            }))
+
+    def on_result(result):
+        # Each action reports as soon as it finishes, not when the whole batch does
+        text = result["feedback"] or (f"{result['intent']} {result['status']}: {result['error']}" if result["error"] else None)
+        if socketio:
+            socketio.emit('pilot_event', tracing.annotate({
+                'type': 'action_result',
+                'text': text or f"{result['intent']} done",
+                'timestamp': time.time(),
+                'source': 'system',
+                'intent': result["intent"],
+                'index': result["index"],
+                'status': result["status"],
+                'elapsed': round(result["elapsed"], 3)
+            }))
+        if result["feedback"]:
+            speak(result["feedback"])
+
+    # The graph waits on its actions, so keep it off the listening thread
+    threading.Thread(target=tracing.bind(execute_multiple_actions), args=(response, on_start, on_result), daemon=True).start()
+
+def pilot_do(prompt, multiple_actions=True):
+    print(f"Pilot: {prompt}")
+    
+    socketio = _socketio
+    
+    # "open discord and spotify": several actions, run side by side
+    if multiple_actions and intents.is_multi_action(prompt):
+        _run_multiple(socketio, prompt)
+        return
+    
+    if not STREAMING:
+        response = extract_response(prompt)
+        
+        if not isinstance(response, dict):
+            print(f"Error processing command: {response}")
+            metrics.errors.inc(stage="intent")
+            # Optionally, speak the error
+            speak(f"Sorry, I had an issue: {response}", priority=URGENT)
+            return
+        
+        # Speak the description of what Pilot is about to do
+        if response.get("description"):
+            _announce(socketio, response["description"], response.get("intent"))
+        
+        # This runs immediately, while the description is being spoken.
+        _run_action(socketio, response)
+        return
+    
+    # Streaming: the action starts as soon as its fields are parsed and the
+    # description goes to TTS as soon as it is complete, in whichever order
+    dispatched = []
+    intent_seen = {}
+    started = time.monotonic()
+
+    def on_action(fields):
+        intent_seen["intent"] = fields.get("intent")
+        print(f"Dispatching {fields.get('intent')} after {time.monotonic() - started:.3f}s")
+        dispatched.append(_run_action(socketio, fields))
+
+    def on_description(description):
+        _announce(socketio, description, intent_seen.get("intent"))
+
+    # Only filled in if this command actually went to Gemini
+    last_llm_timing.clear()
+    response = extract_response_streaming(prompt, on_action, on_description)
+
+    if not isinstance(response, dict):
+        print(f"Error processing command: {response}")
+        metrics.errors.inc(stage="intent")
+        if not dispatched:
+            speak(f"Sorry, I had an issue: {response}", priority=URGENT)
 
-client = None
\ No newline at end of file
+    if socketio and last_llm_timing:
+        socketio.emit('pilot_event', tracing.annotate({
+            'type': 'llm_timing',
+            'time_to_first_action': last_llm_timing.get("first_action"),
+            'total': last_llm_timing.get("total"),
+            'timestamp': time.time()
+        }))
@@ -0,0 +1,122 @@
+import importlib
+import threading
+import time
+
+# intent name -> ActionSpec, in registration order
+ACTIONS = {}
+
+
+class ActionSpec:
+    def __init__(self, name, func, params, description, modules, resource=None, timeout=None, inline=False):
+        self.name = name
+        self.func = func
+        # slot name -> description; values are passed to func positionally in this order
+        self.params = params
+        self.description = description
+        self.modules = modules
+        # Actions sharing a resource (e.g. "keyboard") never run at the same time
+        self.resource = resource
+        # Seconds before a background job running this action is told to stop
+        self.timeout = timeout
+        # Run on the caller's thread instead of as a background job
+        self.inline = inline
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access.
+
+    Lets action modules keep writing `cv2.VideoCapture(...)` without paying
+    for the import at startup.
+    """
+
+    def __init__(self, name, on_import=None):
+        self._name = name
+        self._on_import = on_import
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.monotonic()
+                    module = importlib.import_module(self._name)
+                    if self._on_import:
+                        self._on_import(module)
+                    self._module = module
+                    print(f"Imported {self._name} on first use ({time.monotonic() - started:.2f}s)")
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+
+_lazy_modules = {}
+
+def lazy_module(name, on_import=None):
+    """Return the shared LazyModule for `name`"""
+    if name not in _lazy_modules:
+        _lazy_modules[name] = LazyModule(name, on_import)
+    return _lazy_modules[name]
+
+
+def action(name, params=None, description="", modules=(), resource=None, timeout=None, inline=False):
+    """
+    Register a function as a Pilot action.
+
+    Args:
+        name (str): Intent name the LLM and local matcher use
+        params (dict): Slot name -> description, passed to the function in order
+        description (str): What the action does, shown in the LLM prompt
+        modules (tuple): Heavy modules the action needs, imported on first dispatch
+        resource (str): Device the action drives, if it can't share it with another action
+        timeout (float): Seconds the action may run as a job (default PILOT_ACTION_TIMEOUT)
+        inline (bool): Skip the job queue; for quick actions that manage other jobs
+    """
+    def decorator(func):
+        ACTIONS[name] = ActionSpec(name, func, dict(params or {}), description or (func.__doc__ or "").strip(),
+                                   tuple(modules), resource, timeout, inline)
+        return func
+    return decorator
+
+
+def action_names():
+    return list(ACTIONS)
+
+def required_slots(intent):
+    spec = ACTIONS.get(intent)
+    return list(spec.params) if spec else []
+
+def slot_descriptions():
+    """Slot name -> description, noting which intents use it (for the response schema)"""
+    slots = {}
+    users = {}
+    for spec in ACTIONS.values():
+        for slot, description in spec.params.items():
+            slots.setdefault(slot, description)
+            users.setdefault(slot, []).append(spec.name)
+    return {
+        slot: f"{slots[slot]} (for {' or '.join(users[slot])} intent{'s' if len(users[slot]) > 1 else ''})"
+        for slot in slots
+    }
+
+def prompt_listing():
+    """One line per action for the LLM prompt, e.g. 'open_app(app_name): Open an application'"""
+    lines = []
+    for spec in ACTIONS.values():
+        signature = f"{spec.name}({', '.join(spec.params)})" if spec.params else spec.name
+        lines.append(f"{signature}: {spec.description}" if spec.description else signature)
+    return lines
+
+def dispatch(intent, context):
+    """Run the action for `intent` with slot values from `context`; returns its feedback"""
+    spec = ACTIONS.get(intent)
+    if spec is None:
+        print("Unknown or unsupported command.")
+        return "Sorry, I don't know how to do that."
+
+    for module in spec.modules:
+        lazy_module(module)._load()
+
+    return spec.func(*[context.get(slot) for slot in spec.params])
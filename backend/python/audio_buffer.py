@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+
+INT16_SCALE = 1.0 / 32768.0
+
+
+class AudioRingBuffer:
+    """
+    Preallocated float32 ring buffer for microphone audio.
+
+    Samples are addressed by their absolute position since the buffer was
+    created. Every sample is stored twice (at i and i + capacity), so any
+    window up to `capacity` samples long is one contiguous slice and can be
+    handed to VAD or Whisper as a zero-copy view.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self._data = np.zeros(self.capacity * 2, dtype=np.float32)
+        self._write_pos = 0
+        self._cond = threading.Condition()
+
+    @property
+    def write_pos(self):
+        return self._write_pos
+
+    def write_int16(self, samples):
+        """Convert int16 samples into the buffer in place (no temporary arrays)"""
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        start = self._write_pos % self.capacity
+        first = min(n, self.capacity - start)
+
+        for offset in (0, self.capacity):
+            dst = self._data[start + offset:start + offset + first]
+            np.multiply(samples[:first], INT16_SCALE, out=dst, casting='unsafe')
+        if first < n:
+            # Wrapped: the tail lands at the front of both copies
+            rest = n - first
+            for offset in (0, self.capacity):
+                dst = self._data[offset:offset + rest]
+                np.multiply(samples[first:], INT16_SCALE, out=dst, casting='unsafe')
+
+        with self._cond:
+            self._write_pos += n
+            self._cond.notify_all()
+
+    def oldest(self):
+        """Absolute position of the oldest sample still held in the buffer"""
+        return max(0, self._write_pos - self.capacity)
+
+    def view(self, start, end):
+        """
+        Zero-copy view of samples [start, end).
+
+        The view stays valid until the writer laps it, i.e. until another
+        `capacity - (write_pos - start)` samples have been written.
+        """
+        if end - start > self.capacity:
+            raise ValueError("Requested window is larger than the ring buffer")
+        if start < self.oldest() or end > self._write_pos:
+            raise IndexError("Requested window is not in the ring buffer")
+
+        offset = start % self.capacity
+        return self._data[offset:offset + (end - start)]
+
+    def wait_for(self, pos, timeout=None):
+        """Block until `pos` samples have been written; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._write_pos >= pos, timeout=timeout)
+
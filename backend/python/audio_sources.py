@@ -0,0 +1,154 @@
+import threading
+import time
+import wave
+import numpy as np
+
+SAMPLERATE = 16000
+BLOCKSIZE = 512
+
+
+class AudioSource:
+    """
+    Something that produces 16 kHz mono int16 audio in fixed-size blocks.
+
+    start(write) begins delivering blocks by calling write(int16_array) from
+    the source's own thread; stop() ends delivery. Finite sources set
+    `finished` once everything has been delivered.
+    """
+
+    def __init__(self, samplerate=SAMPLERATE, blocksize=BLOCKSIZE):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.finished = threading.Event()
+
+    def start(self, write):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class MicrophoneSource(AudioSource):
+    """Live input from the default microphone via sounddevice"""
+
+    def __init__(self, samplerate=SAMPLERATE, blocksize=BLOCKSIZE):
+        super().__init__(samplerate, blocksize)
+        self.stream = None
+
+    def start(self, write):
+        import sounddevice as sd
+
+        def callback(indata, frames, time, status):
+            if status:
+                print(status)
+            write(np.frombuffer(indata, dtype=np.int16))
+
+        self.stream = sd.RawInputStream(
+            samplerate=self.samplerate,
+            blocksize=self.blocksize,
+            dtype='int16',
+            channels=1,
+            callback=callback
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            try:
+                self.stream.stop()
+                self.stream.close()
+            except Exception as e:
+                print(f"Error closing audio stream: {e}")
+            self.stream = None
+
+
+class MemorySource(AudioSource):
+    """
+    Replays int16 samples from memory.
+
+    Args:
+        samples: int16 numpy array (16 kHz mono)
+        speed (float): 1.0 delivers blocks in real time, 2.0 twice as fast,
+            0 as fast as possible
+        trailing_silence (float): seconds of silence appended so VAD sees
+            the end of the last utterance
+    """
+
+    def __init__(self, samples, speed=1.0, trailing_silence=1.0,
+                 samplerate=SAMPLERATE, blocksize=BLOCKSIZE):
+        super().__init__(samplerate, blocksize)
+        silence = np.zeros(int(trailing_silence * samplerate), dtype=np.int16)
+        self.samples = np.concatenate([np.asarray(samples, dtype=np.int16), silence])
+        self.speed = speed
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def duration(self):
+        return len(self.samples) / self.samplerate
+
+    def start(self, write):
+        self._stop.clear()
+        self.finished.clear()
+        self._thread = threading.Thread(target=self._run, args=(write,), name="audio-replay", daemon=True)
+        self._thread.start()
+
+    def _run(self, write):
+        block_seconds = self.blocksize / self.samplerate
+        started = time.monotonic()
+
+        for i, offset in enumerate(range(0, len(self.samples), self.blocksize)):
+            if self._stop.is_set():
+                break
+
+            block = self.samples[offset:offset + self.blocksize]
+            if len(block) < self.blocksize:
+                block = np.pad(block, (0, self.blocksize - len(block)))
+            write(block)
+
+            if self.speed:
+                # Pace against the start time so sleep jitter doesn't accumulate
+                delay = started + (i + 1) * block_seconds / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+        self.finished.set()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+
+class FileSource(MemorySource):
+    """Replays a WAV file, or headerless 16 kHz mono int16 PCM (.raw/.pcm)"""
+
+    def __init__(self, path, speed=1.0, trailing_silence=1.0,
+                 samplerate=SAMPLERATE, blocksize=BLOCKSIZE):
+        self.path = str(path)
+        super().__init__(load_pcm(self.path, samplerate), speed, trailing_silence, samplerate, blocksize)
+
+
+def load_pcm(path, samplerate=SAMPLERATE):
+    """Load a WAV or raw PCM file as 16 kHz mono int16 samples"""
+    path = str(path)
+    if not path.lower().endswith(".wav"):
+        return np.fromfile(path, dtype=np.int16)
+
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit samples, got {wav.getsampwidth() * 8}-bit")
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+
+    if rate != samplerate:
+        # Linear resampling is plenty for speech benchmarks
+        positions = np.arange(0, len(samples), rate / samplerate)
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.int16)
+
+    return samples
@@ -116,7 +116,8 @@ class MacroManager:
         self.afk_running = True
         self.afk_thread = threading.Thread(
             target=self._afk_loop, 
-            args=(duration_minutes, movement_interval)
+            args=(duration_minutes, movement_interval),
+            name="afk-macro"
         )
         self.afk_thread.daemon = True
         self.afk_thread.start()
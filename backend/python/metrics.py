@@ -0,0 +1,211 @@
+"""
+Prometheus-style metrics for the Flask server's /metrics endpoint.
+
+A small in-process implementation of counters, gauges and histograms
+rendered in the text exposition format, so no client library is needed.
+Stages observe latencies where they happen. Stats that subsystems already
+keep (intent cache, STT engine, jobs) are read at scrape time through
+collectors registered by the server.
+"""
+import os
+import sys
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers a 20ms VAD block up to a slow LLM call
+DEFAULT_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_metrics = [] # in registration order
+_collectors = []
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per-bucket counts (not cumulative), then +Inf, then sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def _render_value(self, key, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(counts[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _register(metric):
+    with _lock:
+        for existing in _metrics:
+            if existing.name == metric.name:
+                return existing # a module imported twice gets the same metric
+        _metrics.append(metric)
+    return metric
+
+def counter(name, help, labels=()):
+    return _register(Counter(name, help, labels))
+
+def gauge(name, help, labels=()):
+    return _register(Gauge(name, help, labels))
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, help, labels, buckets))
+
+def _collector_key(collect):
+    # Source file rather than module, so server.py run as __main__ and imported
+    # as "server" still counts as the same collector
+    code = getattr(collect, "__code__", None)
+    return (getattr(collect, "__qualname__", repr(collect)), code.co_filename if code else None)
+
+def register_collector(collect):
+    """
+    Add a function called on every scrape.
+
+    It returns a list of (name, type, help, samples) where samples is a
+    list of (labels dict, value). Errors are logged and skipped, so one
+    broken subsystem doesn't take out the whole endpoint. Registering the
+    same function again replaces it.
+    """
+    key = _collector_key(collect)
+    with _lock:
+        for i, existing in enumerate(_collectors):
+            if _collector_key(existing) == key:
+                _collectors[i] = collect
+                return
+        _collectors.append(collect)
+
+
+def process_rss_bytes():
+    """Current resident set size of this process, or None if unavailable"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # peak, not current
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        metrics = list(_metrics)
+    for metric in metrics:
+        lines.extend(metric.render())
+
+    for collect in list(_collectors):
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+            continue
+        for name, type, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {type}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# Shared by every stage; labelled by where the error happened
+errors = counter("pilot_errors_total", "Errors by pipeline stage", ["stage"])
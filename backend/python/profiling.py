@@ -0,0 +1,212 @@
+"""
+On-demand CPU and memory profiling for the running server.
+
+    sample_stacks()  samples every thread's Python stack for a few seconds
+                     and returns collapsed stacks ("thread;outer;inner N"),
+                     the input format of flamegraph.pl and speedscope
+    MemoryTracker    starts tracemalloc, keeps a baseline snapshot and
+                     diffs later snapshots against it
+
+Nothing runs until an endpoint is called: the sampler lives on the
+requesting thread for the length of the profile, and tracemalloc is only
+started on request and stopped again afterwards. The server only exposes
+the endpoints with PILOT_PROFILING=1.
+"""
+import os
+import sys
+import time
+import threading
+import tracemalloc
+import collections
+
+ENABLED = os.getenv("PILOT_PROFILING", "0") == "1"
+MAX_PROFILE_SECONDS = 60
+DEFAULT_INTERVAL = 0.01 # seconds between stack samples
+
+_profile_lock = threading.Lock() # one CPU profile at a time
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_name(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _collapse(frame, thread_name):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.append(thread_name)
+    return ";".join(reversed(names))
+
+def _thread_cpu_seconds(native_id):
+    """CPU time used by one thread so far (Linux only; None elsewhere)"""
+    try:
+        with open(f"/proc/self/task/{native_id}/stat", "r") as f:
+            # Fields after the parenthesised thread name; utime and stime are 14th and 15th
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def _threads():
+    return {thread.ident: thread for thread in threading.enumerate()}
+
+
+def sample_stacks(seconds=5.0, interval=DEFAULT_INTERVAL, cpu_only=False):
+    """
+    Sample all threads' stacks.
+
+    Args:
+        seconds (float): How long to sample for (capped at MAX_PROFILE_SECONDS)
+        interval (float): Seconds between samples
+        cpu_only (bool): Only count a sample when the thread used CPU since the
+            last one, so threads blocked in sleep() or a queue drop out (Linux)
+
+    Returns:
+        dict: "stacks" (collapsed stack -> samples), "threads" (name -> samples
+        and CPU seconds used during the profile), "samples", "seconds"
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusy("A CPU profile is already running")
+
+    try:
+        seconds = max(0.1, min(float(seconds), MAX_PROFILE_SECONDS))
+        interval = max(0.001, float(interval))
+        me = threading.get_ident()
+        stacks = collections.Counter()
+        per_thread = collections.Counter()
+        threads = _threads()
+        cpu_start = {ident: _thread_cpu_seconds(t.native_id) for ident, t in threads.items()}
+        cpu_last = dict(cpu_start)
+        samples = 0
+
+        started = time.monotonic()
+        while time.monotonic() - started < seconds:
+            frames = sys._current_frames()
+            if len(frames) != len(threads):
+                threads = _threads()
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                thread = threads.get(ident)
+                name = thread.name if thread else f"thread-{ident}"
+                if cpu_only and thread is not None:
+                    cpu = _thread_cpu_seconds(thread.native_id)
+                    busy = cpu is None or cpu != cpu_last.get(ident)
+                    cpu_last[ident] = cpu
+                    if not busy:
+                        continue
+                stacks[_collapse(frame, name)] += 1
+                per_thread[name] += 1
+            del frames # don't keep other threads' frames alive
+            samples += 1
+            time.sleep(interval)
+        elapsed = time.monotonic() - started
+
+        cpu_used = {}
+        for ident, thread in _threads().items():
+            before, after = cpu_start.get(ident), _thread_cpu_seconds(thread.native_id)
+            if before is not None and after is not None:
+                cpu_used[thread.name] = round(after - before, 3)
+
+        return {
+            "seconds": round(elapsed, 3),
+            "samples": samples,
+            "interval": interval,
+            "cpu_only": cpu_only,
+            "threads": {
+                name: {"samples": per_thread.get(name, 0), "cpu_seconds": cpu_used.get(name)}
+                for name in sorted(set(per_thread) | set(cpu_used))
+            },
+            "stacks": dict(stacks.most_common()),
+        }
+    finally:
+        _profile_lock.release()
+
+def collapsed(profile):
+    """Profile stacks in collapsed-stack text, one "stack count" per line"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+def _snapshot():
+    # Baseline and later snapshots must be filtered alike, or the excluded
+    # frames show up as large negative deltas
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+
+
+class MemoryTracker:
+    """tracemalloc snapshots diffed against a baseline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.baseline = None
+        self.baseline_time = None
+
+    def running(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=10):
+        """Start tracing (if needed) and take the baseline snapshot"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self.baseline = _snapshot()
+            self.baseline_time = time.time()
+            current, peak = tracemalloc.get_traced_memory()
+            return {"tracing": True, "frames": tracemalloc.get_traceback_limit(), "traced_bytes": current, "peak_bytes": peak}
+
+    def diff(self, limit=20, group_by="lineno", rebase=False):
+        """
+        Top allocation changes since the baseline.
+
+        Args:
+            limit (int): Number of entries to return
+            group_by (str): "lineno", "filename" or "traceback"
+            rebase (bool): Make this snapshot the new baseline
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing() or self.baseline is None:
+                raise RuntimeError("Memory tracing is not running; start it first")
+
+            snapshot = _snapshot()
+            stats = snapshot.compare_to(self.baseline, group_by)
+            current, peak = tracemalloc.get_traced_memory()
+            result = {
+                "since": self.baseline_time,
+                "seconds": round(time.time() - self.baseline_time, 1),
+                "traced_bytes": current,
+                "peak_bytes": peak,
+                "size_diff_bytes": sum(stat.size_diff for stat in stats),
+                "top": [
+                    {
+                        "where": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                        "size_bytes": stat.size,
+                        "size_diff_bytes": stat.size_diff,
+                        "count": stat.count,
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in stats[:max(1, int(limit))]
+                ],
+            }
+            if rebase:
+                self.baseline = snapshot
+                self.baseline_time = time.time()
+            return result
+
+    def stop(self):
+        """Stop tracing and free the snapshots (tracemalloc slows allocation while on)"""
+        with self._lock:
+            self.baseline = None
+            self.baseline_time = None
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            return {"tracing": False}
+
+
+memory = MemoryTracker()
@@ -1,14 +1,19 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response
 from flask_socketio import SocketIO, emit
+import os
 import threading
 import time
-from speech_to_text import speech_to_text_loop
-from AI.pilot import pilot_do
+from speech_to_text import get_engine
+from AI.pilot import pilot_do, intent_cache, static_feedback_phrases
+from AI import pilot
+from AI.jobs import scheduler
 from tts_service import tts
+from tts_scheduler import speech
 
-import os
-from dotenv import load_dotenv
-from google import genai
+from AI import llm
+import tracing
+import metrics
+import profiling
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'pilot_secret_key'
@@ -17,61 +22,161 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Global variables to track the STT loop
 stt_thread = None
 stt_running = False
+# One-time setup in initialize_pilot() has run (it is called on every start and test)
+pilot_initialized = False
+
+# Synthesize every fixed feedback phrase into the TTS cache at startup
+TTS_PREWARM = os.getenv("PILOT_TTS_PREWARM", "0") == "1"
 
 def initialize_pilot():
-    """Initialize Pilot AI with API key"""
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY not found in environment variables")
-    
-    # Initialize the client in pilot module
-    import AI.pilot as pilot_module
-    pilot_module.client = genai.Client(api_key=api_key)
+    """Initialize Pilot AI (the LLM client is created once and reused)"""
+    global pilot_initialized
+    llm.get_backend()
     
     # Set WebSocket reference for TTS service
     tts.set_socketio(socketio)
+    
+    # Command and job lifecycle events go to the overlay too
+    pilot.set_socketio(socketio)
+    scheduler.set_socketio(socketio)
+    
+    if pilot_initialized:
+        return
+    pilot_initialized = True
+    
+    # Hearing the wake word cuts Pilot off so it doesn't talk over the next command,
+    # and opens the ElevenLabs connection while the user is still speaking
+    get_engine().add_wake_listener(speech.barge_in)
+    get_engine().add_wake_listener(tts.warm_connection)
+    
+    if TTS_PREWARM and tts.cache:
+        # Runs behind startup; phrases spoken before it gets to them are cached anyway
+        threading.Thread(target=tts.prewarm, args=(static_feedback_phrases(),),
+                         name="tts-prewarm", daemon=True).start()
 
 def stt_worker():
     """Worker function that runs the STT loop forever"""
     global stt_running
     print("Starting STT worker thread...")
     
+    # The engine keeps its models and microphone stream warm between commands
+    engine = get_engine()
+    
     while stt_running:
         try:
             # Get text from speech-to-text
-            recognized_text = speech_to_text_loop()
-            
-            if recognized_text:
-                print(f"Recognized: {recognized_text}")
-                
-                # Check if this contains the trigger word "pilot"
-                if "pilot" in recognized_text.lower():
-                    # Send "active" event when pilot is triggered
-                    socketio.emit('pilot_event', {'type': 'active'})
+            for transcript in engine.transcripts():
+                if not stt_running:
+                    break
                 
-                # Send "message" event for all recognized text
-                socketio.emit('pilot_event', {'type': 'message', 'text': recognized_text})
-                
-                # Feed the text into pilot_do
-                pilot_do(recognized_text)
+                recognized_text = transcript["command"]
+                print(f"Recognized: {recognized_text}")
                 
-                # Send "hidden" event when action is complete
-                socketio.emit('pilot_event', {'type': 'hidden'})
+                # Everything done for this utterance, on any thread, lands in its trace
+                with tracing.activate(tracing.get(transcript.get("trace_id"))):
+                    # Check if this contains the trigger word "pilot"
+                    if "pilot" in recognized_text.lower():
+                        # Send "active" event when pilot is triggered
+                        socketio.emit('pilot_event', tracing.annotate({'type': 'active'}))
+                    
+                    # Send "message" event for all recognized text
+                    socketio.emit('pilot_event', tracing.annotate({'type': 'message', 'text': recognized_text}))
+                    
+                    # Feed the text into pilot_do; actions run as background
+                    # jobs, so this returns once they have been started
+                    pilot_do(recognized_text)
+                    
+                    # Send "hidden" event once the command has been handled
+                    socketio.emit('pilot_event', tracing.annotate({'type': 'hidden'}))
+            
+            if stt_running:
+                time.sleep(1)  # Engine failed to start, retry shortly
                 
         except Exception as e:
             print(f"Error in STT worker: {e}")
+            metrics.errors.inc(stage="stt_worker")
             time.sleep(1)  # Brief pause before retrying
 
 
+def collect_pilot_metrics():
+    """Scrape-time view of the stats each subsystem already keeps"""
+    stt = get_engine().stats()
+    cache = intent_cache.stats()
+    jobs = scheduler.stats()
+    tts_cache = tts.cache.stats() if tts.cache else None
+    families = [
+        ("pilot_intent_cache_hits_total", "counter", "Intent cache lookups answered from the cache",
+         [({"kind": "hit"}, cache["hits"]), ({"kind": "merged_inflight"}, cache["merged_inflight"])]),
+        ("pilot_intent_cache_misses_total", "counter", "Intent cache lookups that went to the LLM",
+         [({}, cache["misses"])]),
+        ("pilot_intent_cache_entries", "gauge", "Entries in the intent cache", [({}, cache["entries"])]),
+        ("pilot_vad_blocks_total", "counter", "Audio blocks seen by the VAD thread", [({}, stt["vad_blocks"])]),
+        ("pilot_vad_blocks_skipped_total", "counter", "Blocks the energy gate kept from VAD",
+         [({}, stt["vad_blocks_skipped"])]),
+        ("pilot_stt_dropped_utterances_total", "counter", "Utterances dropped before transcription",
+         [({}, stt["dropped_utterances"])]),
+        ("pilot_stt_buffer_overruns_total", "counter", "Times VAD fell a whole ring buffer behind",
+         [({}, stt["buffer_overruns"])]),
+        ("pilot_stt_vad_lag_seconds", "gauge", "Audio captured but not yet seen by VAD",
+         [({}, stt["vad_lag_ms"] / 1000)]),
+        ("pilot_queue_depth", "gauge", "Items waiting in each pipeline queue", [
+            ({"queue": "utterance"}, stt["utterance_queue_depth"]),
+            ({"queue": "command"}, stt["command_queue_depth"]),
+            ({"queue": "jobs"}, jobs["queued"]),
+        ]),
+        ("pilot_jobs_running", "gauge", "Action jobs running now", [({}, jobs["running"])]),
+        ("pilot_llm_calls_total", "counter", "LLM policy counters", [({"kind": key}, value) for key, value in llm.stats.items()]),
+        ("pilot_thread_alive", "gauge", "1 if the thread is running", [
+            ({"thread": "stt_worker"}, bool(stt_thread and stt_thread.is_alive())),
+            ({"thread": "stt_vad"}, stt["vad_thread_alive"]),
+            ({"thread": "stt_transcribe"}, stt["transcribe_thread_alive"]),
+        ]),
+        ("pilot_process_resident_memory_bytes", "gauge", "Resident set size of the server process",
+         [({}, metrics.process_rss_bytes())]),
+    ]
+    if tts_cache:
+        families += [
+            ("pilot_tts_cache_hits_total", "counter", "Utterances played from the TTS cache",
+             [({"tier": "memory"}, tts_cache["memory_hits"]), ({"tier": "disk"}, tts_cache["disk_hits"])]),
+            ("pilot_tts_cache_misses_total", "counter", "Utterances that had to be synthesized",
+             [({}, tts_cache["misses"])]),
+            ("pilot_tts_cache_bytes", "gauge", "Audio held by each TTS cache tier",
+             [({"tier": "memory"}, tts_cache["memory_bytes"]), ({"tier": "disk"}, tts_cache["disk_bytes"])]),
+        ]
+    return families
+
+metrics.register_collector(collect_pilot_metrics)
+
+
 @socketio.on('connect')
 def handle_connect():
     print('Client connected to WebSocket')
+    # Base64 audio until the client negotiates otherwise
+    tts.register_client(request.sid)
     emit('pilot_event', {'type': 'connected', 'message': 'Connected to Pilot WebSocket'})
 
 @socketio.on('disconnect')
 def handle_disconnect():
     print('Client disconnected from WebSocket')
+    tts.unregister_client(request.sid)
+
+@socketio.on('tts_capabilities')
+def handle_tts_capabilities(data):
+    """Clients say whether they play TTS audio and whether it can come as binary"""
+    data = data or {}
+    transport = tts.register_client(request.sid, audio=data.get('audio', True), binary=data.get('binary', False))
+    print(f"Client {request.sid} TTS audio transport: {transport}")
+    emit('tts_capabilities', {'transport': transport})
+
+@socketio.on('playback_started')
+def handle_playback_started(data):
+    data = data or {}
+    tts.on_playback_started(data.get('utterance_id'), data.get('duration'))
+
+@socketio.on('playback_finished')
+def handle_playback_finished(data):
+    data = data or {}
+    tts.on_playback_finished(data.get('utterance_id'), data.get('status', 'ended'))
 
 
 @app.route('/')
@@ -93,7 +198,7 @@ def start_stt():
         initialize_pilot()
         
         stt_running = True
-        stt_thread = threading.Thread(target=stt_worker, daemon=True)
+        stt_thread = threading.Thread(target=stt_worker, name="stt-worker", daemon=True)
         stt_thread.start()
         
         return jsonify({"message": "STT started successfully"})
@@ -110,15 +215,107 @@ def stop_stt():
         return jsonify({"message": "STT is not running"}), 400
     
     stt_running = False
+    get_engine().stop()
     return jsonify({"message": "STT stop signal sent"})
 
 @app.route('/status')
 def status():
     return jsonify({
         "stt_running": stt_running,
-        "thread_alive": stt_thread.is_alive() if stt_thread else False
+        "thread_alive": stt_thread.is_alive() if stt_thread else False,
+        "stt": get_engine().stats(),
+        "intent_cache": intent_cache.stats(),
+        "llm": dict(llm.stats),
+        "jobs": scheduler.stats(),
+        "tts_cache": tts.cache.stats() if tts.cache else None,
+        "speech": speech.stats()
     })
 
+@app.route('/tts/queue')
+def tts_queue():
+    """Queued and recent sentences with their wait and synthesis times"""
+    limit = request.args.get('limit', default=20, type=int)
+    return jsonify({"items": speech.recent(limit), **speech.stats()})
+
+@app.route('/jobs')
+def list_jobs():
+    """Running and queued action jobs, then recently finished ones"""
+    return jsonify({"jobs": scheduler.jobs(), **scheduler.stats()})
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if scheduler.get(job_id) is None:
+        return jsonify({"error": f"Unknown job '{job_id}'"}), 404
+    
+    stopped = scheduler.cancel(job_id)
+    if not stopped:
+        return jsonify({"message": f"Job {job_id} is not running"}), 400
+    return jsonify({"message": f"Cancelling {job_id}", "job": stopped[0].to_dict()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/debug/profile/cpu')
+def profile_cpu():
+    """
+    Sample every thread's stack (?seconds=5&interval=0.01&cpu_only=1).
+    Returns collapsed stacks for flamegraph.pl/speedscope, or ?format=json.
+    """
+    if not profiling.ENABLED:
+        return jsonify({"error": "Profiling is off; start the server with PILOT_PROFILING=1"}), 404
+    
+    try:
+        profile = profiling.sample_stacks(
+            seconds=request.args.get('seconds', default=5.0, type=float),
+            interval=request.args.get('interval', default=profiling.DEFAULT_INTERVAL, type=float),
+            cpu_only=request.args.get('cpu_only', default='0') == '1'
+        )
+    except profiling.ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    
+    if request.args.get('format') == 'json':
+        return jsonify(profile)
+    return Response(profiling.collapsed(profile), mimetype='text/plain')
+
+@app.route('/debug/profile/memory', methods=['GET', 'POST', 'DELETE'])
+def profile_memory():
+    """
+    POST starts tracemalloc and takes a baseline snapshot (?frames=10),
+    GET diffs a new snapshot against it (?limit=20&group_by=lineno&rebase=1),
+    DELETE stops tracing.
+    """
+    if not profiling.ENABLED:
+        return jsonify({"error": "Profiling is off; start the server with PILOT_PROFILING=1"}), 404
+    
+    if request.method == 'POST':
+        return jsonify(profiling.memory.start(request.args.get('frames', default=10, type=int)))
+    if request.method == 'DELETE':
+        return jsonify(profiling.memory.stop())
+    
+    try:
+        return jsonify(profiling.memory.diff(
+            limit=request.args.get('limit', default=20, type=int),
+            group_by=request.args.get('group_by', default='lineno'),
+            rebase=request.args.get('rebase', default='0') == '1'
+        ))
+    except (RuntimeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/traces')
+def list_traces():
+    """Recent per-utterance latency traces, newest first (?limit=N)"""
+    limit = request.args.get('limit', default=20, type=int)
+    return jsonify({"traces": tracing.recent(limit)})
+
+@app.route('/traces/<trace_id>')
+def get_trace(trace_id):
+    trace = tracing.get(trace_id)
+    if trace is None:
+        return jsonify({"error": f"Unknown trace '{trace_id}'"}), 404
+    return jsonify(trace.to_dict())
+
 @app.route('/test_pilot', methods=['POST'])
 def test_pilot():
     """Test endpoint to manually trigger pilot_do with text"""
@@ -128,7 +325,9 @@ def test_pilot():
     
     try:
         initialize_pilot()
-        pilot_do(data['text'])
+        # Typed commands are traced from here instead of from end of speech
+        with tracing.activate(tracing.start(data['text'], source="test_pilot")):
+            pilot_do(data['text'])
         return jsonify({"message": f"Pilot processed: {data['text']}"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -141,6 +340,14 @@ if __name__ == '__main__':
     print("  POST /stop_stt  - Stop speech-to-text loop")
     print("  GET  /status    - Check STT status")
     print("  POST /test_pilot - Test pilot_do with manual text")
+    print("  GET  /jobs      - Running and recent action jobs")
+    print("  GET  /traces    - Recent per-utterance latency traces")
+    print("  GET  /tts/queue - Queued and recent speech with wait and synthesis times")
+    print("  GET  /metrics   - Prometheus metrics")
+    if profiling.ENABLED:
+        print("  GET  /debug/profile/cpu    - Sample thread stacks (collapsed)")
+        print("  POST|GET|DELETE /debug/profile/memory - tracemalloc baseline, diff, stop")
+    print("  POST /jobs/<id>/cancel - Cancel an action job")
     print("  WebSocket events: 'active', 'message', 'hidden'")
     
     # Auto-start STT on server startup (only if not already running)
@@ -148,7 +355,7 @@ if __name__ == '__main__':
         try:
             initialize_pilot()
             stt_running = True
-            stt_thread = threading.Thread(target=stt_worker, daemon=True)
+            stt_thread = threading.Thread(target=stt_worker, name="stt-worker", daemon=True)
             stt_thread.start()
             print("STT auto-started successfully!")
         except Exception as e:
@@ -1,120 +1,665 @@
-import torch
 import numpy as np
-import sounddevice as sd
 from faster_whisper import WhisperModel
 import queue
+import threading
+import time
+import re
+import difflib
+import os
+from audio_buffer import AudioRingBuffer
+from audio_sources import MicrophoneSource
+from vad import load_vad, resolve_runtime, whisper_device, VAD_RUNTIME
+import tracing
+import metrics
+
+TRANSCRIPTION_SECONDS = metrics.histogram(
+    "pilot_transcription_seconds", "Whisper decode time per utterance, by model tier", ["tier"])
+
+# --- Configuration ---
+MODEL_SIZE = None  # None uses the profile's model, or "tiny.en", "small.en", "base.en", "medium.en", "large-v2", etc.
+DECODING_PROFILE = os.getenv("PILOT_STT_PROFILE", "low_latency")
+CASCADE_MODEL_SIZE = os.getenv("PILOT_STT_CASCADE_MODEL", "base.en") # larger model for hard commands, "" to disable
+CASCADE_MIN_AVG_LOGPROB = -0.5 # re-decode with the larger model below this confidence
+INTENT_MATCH_RATIO = 0.8 # minimum intent-match confidence for the fast transcript to be trusted
+SAMPLERATE = 16000
+BLOCKSIZE = 512
+TRIGGER_WORD = "pilot"
+VAD_MIN_SILENCE_DURATION_MS = 500 # ms of silence to mark end of speech
+VAD_THRESHOLD = 0.5 # VAD confidence threshold
+MAX_UTTERANCE_SECONDS = 30 # longer speech is cut off and transcribed as is
+RING_HEADROOM_SECONDS = 10 # extra audio kept so a slow transcription isn't overwritten
+UTTERANCE_QUEUE_SIZE = 4 # finished utterances waiting for Whisper before we drop new ones
+WAKE_WINDOW_SECONDS = 2.0 # prefix decoded greedily to spot the trigger word
+WAKE_MAX_WORDS = 4 # the trigger must be among the first few words of the prefix
+WAKE_MATCH_RATIO = 0.8 # fuzzy match so "pilots" or "pylot" still count
+ENERGY_GATE_RATIO = 2.0 # blocks quieter than this multiple of the noise floor skip VAD
+ENERGY_GATE_MIN_RMS = 0.002 # never gate below this level (about -54 dBFS)
+ENERGY_GATE_MAX_RMS = 0.02 # never gate above this level, however noisy the room
+ENERGY_GATE_HANGOVER_BLOCKS = 8 # keep running VAD this many blocks after a loud one
+
+# Decoding profiles. A profile with a "fallback" decodes with its own options
+# first and only re-runs with the fallback options when the segments look
+# unreliable (low average log-probability or likely non-speech).
+DECODING_PROFILES = {
+    "low_latency": {
+        "model_size": "tiny.en",
+        "options": {"beam_size": 1, "condition_on_previous_text": False, "without_timestamps": True},
+        "fallback": {"beam_size": 5, "condition_on_previous_text": False},
+        "min_avg_logprob": -0.7,
+        "max_no_speech_prob": 0.5,
+    },
+    "balanced": {
+        "model_size": "tiny.en",
+        "options": {"beam_size": 5, "condition_on_previous_text": True},
+    },
+    "accurate": {
+        "model_size": "base.en",
+        "options": {"beam_size": 5, "best_of": 5, "condition_on_previous_text": True},
+    },
+}
+
+
+class EnergyGate:
+    """
+    Cheap RMS check in front of Silero VAD.
+
+    Tracks an adaptive noise floor (fast to fall, slow to rise) and reports
+    blocks that are clearly below it as silent, so VAD inference can be
+    skipped for them. A short hangover keeps VAD at full rate just after
+    any loud block.
+    """
+
+    def __init__(self, ratio=ENERGY_GATE_RATIO, min_rms=ENERGY_GATE_MIN_RMS,
+                 max_rms=ENERGY_GATE_MAX_RMS, hangover_blocks=ENERGY_GATE_HANGOVER_BLOCKS):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.max_rms = max_rms
+        self.hangover_blocks = hangover_blocks
+        self.noise_floor = min_rms
+        self._hangover = 0
+
+        self.blocks = 0
+        self.skipped = 0
+
+    def threshold(self):
+        return min(max(self.noise_floor * self.ratio, self.min_rms), self.max_rms)
+
+    def is_silent(self, block):
+        """True if VAD can be skipped for this block"""
+        self.blocks += 1
+        rms = float(np.sqrt(np.dot(block, block) / len(block)))
+
+        if rms >= self.threshold():
+            self._hangover = self.hangover_blocks
+            return False
+
+        # Quiet block: let the floor follow the room
+        alpha = 0.9 if rms < self.noise_floor else 0.995
+        self.noise_floor = alpha * self.noise_floor + (1 - alpha) * rms
+
+        if self._hangover > 0:
+            self._hangover -= 1
+            return False
+
+        self.skipped += 1
+        return True
+
+    def skip_fraction(self):
+        return self.skipped / self.blocks if self.blocks else 0.0
+
+
+class SpeechEngine:
+    """
+    Long-lived speech to text engine using faster-whisper and Silero VAD.
+
+    Models are loaded once in start() and the audio source stays open
+    between commands, so only the first command pays the model load time.
+
+    Capture and VAD run on one thread and hand finished utterances over a
+    bounded queue to a transcription thread, so a slow Whisper decode never
+    makes VAD fall behind real time.
+
+    Commands the fast model is unsure about, or whose text doesn't mention
+    any known action, are re-decoded by a larger cascade model that is only
+    loaded the first time it is needed.
+
+    An energy gate skips VAD inference on blocks that are clearly silent, so
+    an idle room costs almost no CPU.
+
+    Before the full decode, a cheap greedy pass over the first
+    WAKE_WINDOW_SECONDS checks for the trigger word. For long utterances the
+    check is queued while the user is still talking, so background chatter
+    is usually rejected before speech even ends. Utterances no longer than
+    the window are decoded once and the trigger is looked for in that text.
+    """
+
+    def __init__(self, model_size=MODEL_SIZE, trigger_word=TRIGGER_WORD, profile=DECODING_PROFILE,
+                 cascade_model_size=CASCADE_MODEL_SIZE, source=None, emit_all=False,
+                 vad_runtime=VAD_RUNTIME,
+                 max_utterance_seconds=MAX_UTTERANCE_SECONDS,
+                 utterance_queue_size=UTTERANCE_QUEUE_SIZE,
+                 wake_window_seconds=WAKE_WINDOW_SECONDS):
+        if profile not in DECODING_PROFILES:
+            raise ValueError(f"Unknown decoding profile '{profile}', expected one of {list(DECODING_PROFILES)}")
+        self.profile_name = profile
+        self.profile = DECODING_PROFILES[profile]
+        self.model_size = model_size or self.profile["model_size"]
+        self.trigger_word = trigger_word.lower()
+        self.max_utterance_samples = int(max_utterance_seconds * SAMPLERATE)
+        self.wake_window_samples = int(wake_window_seconds * SAMPLERATE)
+
+        self.whisper_model = None
+        self.cascade_model_size = cascade_model_size or None
+        self.cascade_model = None
+        self._intents = None
+        self._device = "cpu"
+        self._compute_type = "int8"
+        self.vad_iterator = None
+        # "onnx" runs without importing torch at all
+        self.vad_runtime = resolve_runtime(vad_runtime)
+        # Where audio comes from; the microphone unless a replay source is given
+        self.source = source
+        # Also publish transcripts without a command (used by the benchmark)
+        self.emit_all = emit_all
+        self._origin = 0
+
+        # The audio callback converts straight into this buffer; VAD and
+        # Whisper read views of it without copying
+        self.ring = AudioRingBuffer(self.max_utterance_samples + RING_HEADROOM_SECONDS * SAMPLERATE)
+        self._read_pos = 0
+
+        # (kind, start, end, ended_at) sample windows waiting for Whisper;
+        # kind is "wake" for a prefix check or "full" for a finished utterance
+        self.utterance_queue = queue.Queue(maxsize=utterance_queue_size)
+        # Transcript dicts for recognized commands
+        self.command_queue = queue.Queue()
+
+        # utterance start -> True/False once its wake check has run
+        self._wake_verdicts = {}
+        # Called (on the transcription thread) as soon as the wake word is heard
+        self._wake_listeners = []
+
+        self._lock = threading.Lock()
+        self._running = False
+        self._vad_thread = None
+        self._transcribe_thread = None
+
+        self.energy_gate = EnergyGate()
+
+        # Backpressure metrics
+        self.overruns = 0
+        self.dropped_utterances = 0
+        self.utterances_transcribed = 0
+        self.last_transcribe_seconds = 0.0
+        self.wake_checks = 0
+        self.wake_rejected = 0
+        self.fallback_decodes = 0
+        self.tier_counts = {}
+
+    def start(self):
+        """Load the models, start the audio source and the worker threads (idempotent)"""
+        with self._lock:
+            if self._running:
+                return True
+
+            self._device, self._compute_type = whisper_device(self.vad_runtime)
+
+            print("Loading models...")
+            if self.whisper_model is None:
+                self.whisper_model = WhisperModel(self.model_size, device=self._device, compute_type=self._compute_type)
+
+            if self.vad_iterator is None:
+                try:
+                    self.vad_iterator = load_vad(self.vad_runtime, threshold=VAD_THRESHOLD,
+                                                 min_silence_duration_ms=VAD_MIN_SILENCE_DURATION_MS)
+                except Exception as e:
+                    print(f"Error loading Silero VAD model ({self.vad_runtime}): {e}")
+                    if self.vad_runtime == "torch":
+                        print("Please ensure you have a working internet connection for the first run.")
+                    return False
+
+            print("Models loaded.")
+
+            if self.source is None:
+                self.source = MicrophoneSource(SAMPLERATE, BLOCKSIZE)
+
+            # Skip anything left over from a previous run
+            self._read_pos = self._origin = self.ring.write_pos
+            self.source.start(self.ring.write_int16)
+            self._running = True
+
+            self._vad_thread = threading.Thread(target=self._vad_loop, name="stt-vad", daemon=True)
+            self._transcribe_thread = threading.Thread(target=self._transcribe_loop, name="stt-transcribe", daemon=True)
+            self._vad_thread.start()
+            self._transcribe_thread.start()
+
+            print(f"Start speaking... say '{self.trigger_word}' to activate")
+            return True
+
+    def stop(self):
+        """Stop the audio source and worker threads, keeping the models loaded for a restart"""
+        with self._lock:
+            self._running = False
+            if self.source is not None:
+                self.source.stop()
+
+            for thread in (self._vad_thread, self._transcribe_thread):
+                if thread is not None and thread is not threading.current_thread():
+                    thread.join(timeout=2)
+            self._vad_thread = None
+            self._transcribe_thread = None
+
+            # Drop pending work; it refers to audio from this run
+            self._wake_verdicts.clear()
+            for q in (self.utterance_queue, self.command_queue):
+                while not q.empty():
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+
+    def add_wake_listener(self, callback):
+        """Call `callback()` whenever an utterance is found to start with the wake word"""
+        self._wake_listeners.append(callback)
+
+    def _notify_wake(self):
+        for callback in self._wake_listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Wake listener failed: {e}")
+
+    def is_running(self):
+        return self._running
+
+    def stats(self):
+        """Queue depths, drop counters and VAD lag, for spotting an overloaded box"""
+        return {
+            "running": self._running,
+            "vad_thread_alive": bool(self._vad_thread and self._vad_thread.is_alive()),
+            "transcribe_thread_alive": bool(self._transcribe_thread and self._transcribe_thread.is_alive()),
+            "vad_lag_ms": round((self.ring.write_pos - self._read_pos) * 1000 / SAMPLERATE, 1),
+            "utterance_queue_depth": self.utterance_queue.qsize(),
+            "utterance_queue_size": self.utterance_queue.maxsize,
+            "command_queue_depth": self.command_queue.qsize(),
+            "dropped_utterances": self.dropped_utterances,
+            "buffer_overruns": self.overruns,
+            "utterances_transcribed": self.utterances_transcribed,
+            "last_transcribe_ms": round(self.last_transcribe_seconds * 1000, 1),
+            "wake_checks": self.wake_checks,
+            "wake_rejected": self.wake_rejected,
+            "vad_blocks": self.energy_gate.blocks,
+            "vad_blocks_skipped": self.energy_gate.skipped,
+            "vad_skip_fraction": round(self.energy_gate.skip_fraction(), 3),
+            "noise_floor_rms": round(self.energy_gate.noise_floor, 5),
+            "profile": self.profile_name,
+            "vad_runtime": self.vad_runtime,
+            "fallback_decodes": self.fallback_decodes,
+            "cascade_loaded": self.cascade_model is not None,
+            "transcripts_by_tier": dict(self.tier_counts),
+        }
+
+    def _decode(self, audio, options, model=None):
+        """Run Whisper and return (text, average log-probability, worst no-speech probability)"""
+        model = model or self.whisper_model
+        segments, info = model.transcribe(
+            audio,
+            language="en",
+            initial_prompt="Pilot is the wake word.",
+            **options
+        )
+        segments = list(segments)
+        if not segments:
+            return "", float("-inf"), 1.0
+
+        text = "".join(segment.text for segment in segments)
+        avg_logprob = sum(segment.avg_logprob for segment in segments) / len(segments)
+        no_speech_prob = max(segment.no_speech_prob for segment in segments)
+        return text, avg_logprob, no_speech_prob
+
+    def _transcribe(self, audio):
+        """Decode with the active profile, retrying with its fallback options on a poor result"""
+        text, avg_logprob, no_speech_prob = self._decode(audio, self.profile["options"])
+
+        fallback = self.profile.get("fallback")
+        if fallback and (avg_logprob < self.profile["min_avg_logprob"]
+                         or no_speech_prob > self.profile["max_no_speech_prob"]):
+            print(f"Low confidence (logprob {avg_logprob:.2f}, no speech {no_speech_prob:.2f}), re-decoding with beam search")
+            self.fallback_decodes += 1
+            text, avg_logprob, no_speech_prob = self._decode(audio, fallback)
+
+        return text, avg_logprob
+
+    def _get_cascade_model(self):
+        """Load the larger cascade model on first use"""
+        if self.cascade_model is None:
+            print(f"Loading cascade model {self.cascade_model_size}...")
+            self.cascade_model = WhisperModel(self.cascade_model_size, device=self._device, compute_type=self._compute_type)
+        return self.cascade_model
+
+    def _get_intents(self):
+        """The local intent matcher, imported on first use"""
+        if self._intents is None:
+            try:
+                from AI import intents
+                self._intents = intents
+            except Exception as e:
+                print(f"Could not load the intent matcher: {e}")
+                self._intents = False
+        return self._intents
+
+    def _maps_to_intent(self, command):
+        """True if the command is one the local intent matcher resolves, or starts with one of its verbs"""
+        intents = self._get_intents()
+        if not intents:
+            return True # nothing to check against, trust the fast model
+
+        if intents.match_intent(command, min_confidence=INTENT_MATCH_RATIO):
+            return True
+
+        # Commands left to Gemini ("open discord and spotify") still start with a known verb
+        words = intents.normalize_utterance(command, self.trigger_word).split()
+        return bool(words and difflib.get_close_matches(words[0], intents.VERBS, n=1, cutoff=INTENT_MATCH_RATIO))
+
+    def _transcribe_cascade(self, audio, start=None, fast=None):
+        """
+        Decode with the fast model, escalating to the cascade model when needed.
+
+        Args:
+            audio (np.ndarray): The utterance, possibly a view into the ring buffer
+            start (int): Ring position of the utterance, to notice it being overwritten
+            fast (tuple): (text, avg_logprob) already decoded by the fast model, if any
+
+        Returns:
+            tuple: (text, tier) where tier names the model that produced the text;
+            text is None if the audio was overwritten before it could be re-decoded
+        """
+        text, avg_logprob = fast or self._transcribe(audio)
+        tier = self.model_size
+
+        if not self.cascade_model_size:
+            return text, tier
+
+        command = self._extract_command(text)
+        if avg_logprob >= CASCADE_MIN_AVG_LOGPROB and command and self._maps_to_intent(command):
+            return text, tier
+
+        # Loading the cascade model and decoding again can take long enough for
+        # the writer to lap a ring view, so decode a copy, made while still intact
+        audio = np.array(audio)
+        if start is not None and start < self.ring.oldest():
+            return None, tier
+
+        print(f"Fast transcript unreliable (logprob {avg_logprob:.2f}), re-decoding with {self.cascade_model_size}")
+        options = {"beam_size": 5, "condition_on_previous_text": False}
+        cascade_text, cascade_logprob, _ = self._decode(audio, options, model=self._get_cascade_model())
+        if cascade_text.strip():
+            return cascade_text, self.cascade_model_size
+        return text, tier
+
+    def _has_wake_word(self, audio):
+        """Greedy, short decode of the utterance prefix to look for the trigger word"""
+        segments, info = self.whisper_model.transcribe(
+            audio[:self.wake_window_samples],
+            language="en",
+            beam_size=1,
+            without_timestamps=True,
+            condition_on_previous_text=False,
+            max_new_tokens=WAKE_MAX_WORDS * 3,
+            initial_prompt="Pilot is the wake word."
+        )
+        self.wake_checks += 1
+        return self._wake_word_in("".join(segment.text for segment in segments))
+
+    def _wake_word_in(self, text):
+        """True if the trigger word is among the first few words of `text`"""
+        words = re.findall(r"[a-z']+", text.lower())[:WAKE_MAX_WORDS]
+        for word in words:
+            if difflib.SequenceMatcher(None, word, self.trigger_word).ratio() >= WAKE_MATCH_RATIO:
+                return True
+
+        print(f"No wake word in: {text.strip()}")
+        return False
+
+    def _extract_command(self, text):
+        """Return the text from the trigger word onwards, or None"""
+        start_index = text.lower().find(self.trigger_word)
+        if start_index == -1:
+            return None
+
+        command = text[start_index:]
+        if len(command.strip()) > len(self.trigger_word):
+            return command
+        return None
+
+    def _vad_loop(self):
+        """Capture thread: run VAD over each block and queue finished utterances"""
+        utterance_start = None
+        wake_queued = False
+        print("Listening for speech...")
+
+        while self._running:
+            block_start = self._read_pos
+            block_end = block_start + BLOCKSIZE
+            if not self.ring.wait_for(block_end, timeout=0.5):
+                continue
+
+            if block_start < self.ring.oldest():
+                # We fell more than a whole buffer behind; drop to live audio
+                print("Audio buffer overrun, skipping ahead")
+                self.overruns += 1
+                self._read_pos = self.ring.write_pos - self.ring.write_pos % BLOCKSIZE
+                utterance_start = None
+                self.vad_iterator.reset_states()
+                continue
+
+            self._read_pos = block_end
+            block = self.ring.view(block_start, block_end)
+
+            # Only skip VAD while it is idle; mid-utterance it needs every block to find the end
+            if utterance_start is None and not self.vad_iterator.triggered and self.energy_gate.is_silent(block):
+                continue
+
+            speech_dict = self.vad_iterator(block, return_seconds=True)
+
+            if speech_dict and "start" in speech_dict and utterance_start is None:
+                print("Speech started...")
+                utterance_start = block_start
+                wake_queued = False
+
+            if utterance_start is None:
+                continue
+
+            if not wake_queued and block_end - utterance_start >= self.wake_window_samples:
+                # Check the prefix for the wake word while the user keeps talking
+                try:
+                    self.utterance_queue.put_nowait(("wake", utterance_start, block_end, None))
+                except queue.Full:
+                    pass # the full decode will do the check instead
+                wake_queued = True
+
+            speech_ended = bool(speech_dict) and "end" in speech_dict
+            if not speech_ended and block_end - utterance_start >= self.max_utterance_samples:
+                print("Maximum utterance length reached.")
+                speech_ended = True
+
+            if speech_ended:
+                # Leave a True verdict for the transcription thread so it isn't checked twice
+                if self._wake_verdicts.get(utterance_start) is False:
+                    self._wake_verdicts.pop(utterance_start, None)
+                    self.wake_rejected += 1
+                    print("Speech ended without wake word, skipped transcription")
+                    self._publish(None, "", "wake", utterance_start, block_end, 0.0)
+                    utterance_start = None
+                    self.vad_iterator.reset_states()
+                    continue
+
+                try:
+                    self.utterance_queue.put_nowait(("full", utterance_start, block_end, time.monotonic()))
+                    print("Speech ended. Queued for transcription...")
+                except queue.Full:
+                    self.dropped_utterances += 1
+                    print(f"Transcription queue full, dropped utterance ({self.dropped_utterances} dropped)")
+                utterance_start = None
+                self.vad_iterator.reset_states()
+
+    def _transcribe_loop(self):
+        """Transcription thread: wake-check and decode queued utterances, publish commands"""
+        while self._running:
+            try:
+                kind, start, end, ended_at = self.utterance_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if start < self.ring.oldest():
+                # The writer lapped this utterance while it sat in the queue
+                self._wake_verdicts.pop(start, None)
+                if kind == "full":
+                    self.dropped_utterances += 1
+                    print("Utterance overwritten before transcription, dropped")
+                continue
+
+            audio = self.ring.view(start, end)
+
+            if kind == "wake":
+                self._wake_verdicts[start] = self._has_wake_word(audio)
+                if self._wake_verdicts[start]:
+                    self._notify_wake() # the user is still talking; this is the earliest signal
+                # Forget verdicts for utterances that were dropped or have left the buffer
+                for stale in [s for s in self._wake_verdicts if s < self.ring.oldest()]:
+                    self._wake_verdicts.pop(stale, None)
+                continue
+
+            decode_started = time.monotonic()
+            fast = None
+            verdict = self._wake_verdicts.pop(start, None)
+            if verdict is None:
+                if end - start <= self.wake_window_samples:
+                    # The prefix would be the whole utterance, so decode it once
+                    # and look for the trigger in that text
+                    fast = self._transcribe(audio)
+                    self.wake_checks += 1
+                    verdict = self._wake_word_in(fast[0])
+                else:
+                    verdict = self._has_wake_word(audio)
+                    decode_started = time.monotonic()
+                if verdict:
+                    self._notify_wake()
+            if not verdict:
+                self.wake_rejected += 1
+                self._publish(None, "", "wake", start, end, time.monotonic() - ended_at)
+                continue
+
+            text, tier = self._transcribe_cascade(audio, start=start, fast=fast)
+            if text is None:
+                self.dropped_utterances += 1
+                print("Utterance overwritten before the cascade decode, dropped")
+                continue
+            decode_ended = time.monotonic()
+            TRANSCRIPTION_SECONDS.observe(decode_ended - decode_started, tier=tier)
+            self.last_transcribe_seconds = decode_ended - ended_at
+            self.utterances_transcribed += 1
+            self.tier_counts[tier] = self.tier_counts.get(tier, 0) + 1
+            print(f"Recognized ({tier}): {text}")
+
+            command = self._extract_command(text)
+            if command:
+                print(f"Command found: {command}")
+
+            # The utterance's trace starts at VAD end-of-speech
+            trace = None
+            if command:
+                trace = tracing.start(command, started_at=ended_at, audio_seconds=round((end - start) / SAMPLERATE, 2))
+                trace.record("vad_end_of_speech", ended_at)
+                trace.record("transcription_queue", ended_at, decode_started)
+                trace.record("transcription", decode_started, decode_ended, tier=tier)
+            self._publish(command, text, tier, start, end, self.last_transcribe_seconds,
+                          decode_seconds=decode_ended - decode_started, trace=trace)
+
+    def _publish(self, command, text, tier, start, end, latency, decode_seconds=0.0, trace=None):
+        """Queue a transcript for next_transcript(); non-commands only when emit_all is set"""
+        if not command and not self.emit_all:
+            return
+        self.command_queue.put({
+            "command": command,
+            "text": text,
+            "tier": tier,
+            "latency": latency,
+            "decode_seconds": decode_seconds,
+            "audio_seconds": (end - start) / SAMPLERATE,
+            # Sample offsets relative to when the source was started
+            "start_sample": start - self._origin,
+            "end_sample": end - self._origin,
+            "trace_id": trace.id if trace else None,
+        })
+
+    def next_transcript(self, timeout=None):
+        """
+        Block until a command containing the trigger word is recognized.
+
+        Args:
+            timeout (float): Seconds to wait before giving up
+
+        Returns:
+            dict: command, full text, producing model tier, end-of-speech
+            latency and sample span, or None on timeout or when the engine
+            stops. With emit_all, transcripts without a command have
+            command=None.
+        """
+        if not self._running and not self.start():
+            return None
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._running:
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                return self.command_queue.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+        return None
+
+    def next_command(self, timeout=None):
+        """Like next_transcript() but returns only the command text"""
+        transcript = self.next_transcript(timeout=timeout)
+        return transcript["command"] if transcript else None
+
+    def transcripts(self, poll_interval=0.5):
+        """Yield next_transcript() dicts for recognized commands until stop() is called"""
+        if not self._running and not self.start():
+            return
+
+        while self._running:
+            transcript = self.next_transcript(timeout=poll_interval)
+            if transcript and transcript["command"]:
+                yield transcript
+
+    def commands(self, poll_interval=0.5):
+        """Yield recognized commands until stop() is called"""
+        for transcript in self.transcripts(poll_interval):
+            yield transcript["command"]
+
+
+_engine = None
+
+def get_engine():
+    """Return the shared SpeechEngine, creating it on first use"""
+    global _engine
+    if _engine is None:
+        _engine = SpeechEngine()
+    return _engine
 
 def speech_to_text_loop():
     """
     Real-time speech to text loop using faster-whisper and Silero VAD.
+
+    Kept for compatibility; uses the shared warm SpeechEngine.
     """
-    # --- Configuration ---
-    MODEL_SIZE = "tiny.en"  # or "small.en", "base.en", "medium.en", "large-v2", etc.
-    DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-    COMPUTE_TYPE = "float16" if torch.cuda.is_available() else "int8"
-    SAMPLERATE = 16000
-    CHANNELS = 1
-    BLOCKSIZE = 512
-    DTYPE = 'int16'
-    TRIGGER_WORD = "pilot"
-    VAD_MIN_SILENCE_DURATION_MS = 500 # ms of silence to mark end of speech
-    VAD_THRESHOLD = 0.5 # VAD confidence threshold
-    
-    # --- Model Loading ---
-    print("Loading models...")
-    whisper_model = WhisperModel(MODEL_SIZE, device=DEVICE, compute_type=COMPUTE_TYPE)
-    
-    try:
-        vad_model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad',
-                                          model='silero_vad',
-                                          force_reload=False)
-        VADIterator = utils[3]
-    except Exception as e:
-        print(f"Error loading Silero VAD model: {e}")
-        print("Please ensure you have a working internet connection for the first run.")
-        return
-
-    print("Models loaded.")
-
-    # --- Audio Input Stream ---
-    audio_queue = queue.Queue()
-
-    def callback(indata, frames, time, status):
-        if status:
-            print(status)
-        audio_queue.put(bytes(indata))
-
-    stream = sd.RawInputStream(
-        samplerate=SAMPLERATE,
-        blocksize=BLOCKSIZE,
-        dtype=DTYPE,
-        channels=CHANNELS,
-        callback=callback
-    )
-
-    vad_iterator = VADIterator(vad_model, threshold=VAD_THRESHOLD, min_silence_duration_ms=VAD_MIN_SILENCE_DURATION_MS)
-
-    # --- Processing Loop ---
-    with stream:
-        print(f"Start speaking... say '{TRIGGER_WORD}' to activate")
-        
-        while True:
-            speech_chunks = []
-            is_speaking = False
-            
-            print("Listening for speech...")
-            while True: # Inner loop for speech detection
-                audio_chunk_bytes = audio_queue.get()
-                audio_chunk_int16 = np.frombuffer(audio_chunk_bytes, dtype=np.int16)
-                audio_chunk_float32 = audio_chunk_int16.astype(np.float32) / 32768.0
-
-                speech_dict = vad_iterator(audio_chunk_float32, return_seconds=True)
-
-                if speech_dict:
-                    if "start" in speech_dict:
-                        if not is_speaking:
-                            print("Speech started...")
-                            is_speaking = True
-                        speech_chunks.append(audio_chunk_float32)
-
-                    if "end" in speech_dict and is_speaking:
-                        print("Speech ended. Transcribing...")
-                        is_speaking = False
-                        
-                        full_speech = np.concatenate(speech_chunks)
-                        speech_chunks = []
-
-                        segments, info = whisper_model.transcribe(
-                            full_speech,
-                            language="en",
-                            beam_size=5, # 1 for fastest
-                            condition_on_previous_text=True,
-                            initial_prompt="Pilot is the wake word."
-                        )
-                        
-                        text = "".join(segment.text for segment in segments)
-                        
-                        print(f"Recognized: {text}")
-
-                        if TRIGGER_WORD in text.lower():
-                            start_index = text.lower().find(TRIGGER_WORD)
-                            command = text[start_index:]
-                            
-                            if len(command.strip()) > len(TRIGGER_WORD):
-                                vad_iterator.reset_states()
-                                print(f"Command found: {command}")
-                                return command
-                        
-                        vad_iterator.reset_states()
-                        print("Listening for speech...")
-                        break # break inner loop to reset and listen again
-                else:
-                    # Keep collecting if speech started but not ended
-                    if is_speaking:
-                        speech_chunks.append(audio_chunk_float32)
+    return get_engine().next_command()
 
 # For testing if run directly
 if __name__ == '__main__':
     command = speech_to_text_loop()
     print(f"Returned command: {command}")
-        
\ No newline at end of file
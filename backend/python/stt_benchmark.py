@@ -0,0 +1,238 @@
+"""
+Offline STT benchmark.
+
+Replays a labelled corpus through the same VAD -> wake word -> Whisper
+pipeline the server uses and prints a JSON report that can be compared
+across commits.
+
+The corpus is a JSONL manifest, one utterance per line:
+
+    {"audio": "clips/open_spotify.wav", "text": "pilot open spotify"}
+
+Audio paths are relative to the manifest. WAV files of any rate are
+resampled to 16 kHz; .raw/.pcm files must already be 16 kHz mono int16.
+
+Usage:
+    python stt_benchmark.py corpus/manifest.jsonl --profile low_latency --output bench.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import time
+import numpy as np
+
+import speech_to_text
+from audio_sources import MemorySource, load_pcm, SAMPLERATE
+
+GAP_SECONDS = 1.5 # silence between corpus items so VAD ends each utterance
+DRAIN_SECONDS = 5.0 # how long to wait for the last transcripts after replay
+
+
+def load_manifest(path):
+    """Read the JSONL manifest into a list of {"audio", "text"} dicts with absolute paths"""
+    base = os.path.dirname(os.path.abspath(path))
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item["audio"] = os.path.join(base, item["audio"])
+            items.append(item)
+    return items
+
+
+def normalize_words(text):
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance between two transcripts"""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            cur = min(row[j] + 1, row[j - 1] + 1, prev + (ref_word != hyp_word))
+            prev, row[j] = row[j], cur
+    return row[len(hyp)], len(ref)
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def build_timeline(items):
+    """Concatenate the corpus with silence gaps; returns (samples, [(start, end), ...])"""
+    gap = np.zeros(int(GAP_SECONDS * SAMPLERATE), dtype=np.int16)
+    chunks, spans, pos = [gap], [], len(gap)
+    for item in items:
+        samples = load_pcm(item["audio"])
+        spans.append((pos, pos + len(samples)))
+        chunks.extend([samples, gap])
+        pos += len(samples) + len(gap)
+    return np.concatenate(chunks), spans
+
+
+def match_item(spans, transcript):
+    """Index of the corpus item that overlaps a transcript's sample span most"""
+    best, best_overlap = None, 0
+    for i, (start, end) in enumerate(spans):
+        overlap = min(end, transcript["end_sample"]) - max(start, transcript["start_sample"])
+        if overlap > best_overlap:
+            best, best_overlap = i, overlap
+    return best
+
+
+def run_benchmark(items, profile=speech_to_text.DECODING_PROFILE,
+                  cascade_model=speech_to_text.CASCADE_MODEL_SIZE, speed=1.0):
+    samples, spans = build_timeline(items)
+    source = MemorySource(samples, speed=speed)
+    engine = speech_to_text.SpeechEngine(profile=profile, cascade_model_size=cascade_model,
+                                         source=source, emit_all=True)
+
+    load_started = time.monotonic()
+    if not engine.start():
+        raise RuntimeError("Speech engine failed to start")
+    load_seconds = time.monotonic() - load_started
+
+    # Models are already loaded; measure only the replay
+    cpu_started = time.process_time()
+    wall_started = time.monotonic()
+
+    transcripts = []
+    idle_deadline = None
+    while True:
+        transcript = engine.next_transcript(timeout=0.5)
+        if transcript:
+            transcripts.append(transcript)
+            idle_deadline = None
+            continue
+        if not source.finished.is_set():
+            continue
+        if idle_deadline is None:
+            idle_deadline = time.monotonic() + DRAIN_SECONDS
+        elif time.monotonic() > idle_deadline and engine.utterance_queue.empty():
+            break
+
+    wall_seconds = time.monotonic() - wall_started
+    cpu_seconds = time.process_time() - cpu_started
+    stats = engine.stats()
+    engine.stop()
+
+    # Attach transcripts to corpus items
+    per_item = [{"audio": os.path.basename(item["audio"]), "reference": item["text"],
+                 "hypothesis": "", "command": None, "tier": None, "latency_ms": None,
+                 "transcribed": False, "wake_rejected": False}
+                for item in items]
+    for transcript in transcripts:
+        index = match_item(spans, transcript)
+        if index is None:
+            continue
+        entry = per_item[index]
+        if transcript["tier"] == "wake":
+            # Turned away by the wake check without being transcribed
+            entry["wake_rejected"] = True
+        else:
+            entry["transcribed"] = True
+        if transcript["text"]:
+            entry["hypothesis"] = (entry["hypothesis"] + " " + transcript["text"]).strip()
+            entry["latency_ms"] = round(transcript["latency"] * 1000, 1)
+        entry["command"] = entry["command"] or transcript["command"]
+        entry["tier"] = transcript["tier"]
+
+    errors = ref_words = 0
+    trigger_hits = trigger_expected = false_triggers = 0
+    wake_rejections = false_rejects = 0
+    for entry in per_item:
+        expected = engine.trigger_word in normalize_words(entry["reference"])
+        trigger_expected += expected
+        trigger_hits += expected and bool(entry["command"])
+        false_triggers += (not expected) and bool(entry["command"])
+
+        # A wake rejection is a gate decision, not a recognition error, so only
+        # transcribed items count towards the word error rate
+        rejected = entry["wake_rejected"] and not entry["transcribed"]
+        wake_rejections += rejected
+        false_rejects += rejected and expected
+        if not entry["transcribed"]:
+            entry["word_errors"] = None
+            continue
+        item_errors, item_words = word_errors(entry["reference"], entry["hypothesis"])
+        entry["word_errors"] = item_errors
+        errors += item_errors
+        ref_words += item_words
+
+    decoded = [t for t in transcripts if t["decode_seconds"]]
+    latencies = [t["latency"] * 1000 for t in decoded]
+    decode_seconds = sum(t["decode_seconds"] for t in decoded)
+    decoded_audio = sum(t["audio_seconds"] for t in decoded)
+    audio_seconds = len(samples) / SAMPLERATE
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "profile": profile,
+            "model": engine.model_size,
+            "cascade_model": cascade_model or None,
+            "speed": speed,
+        },
+        "summary": {
+            "items": len(items),
+            "audio_seconds": round(audio_seconds, 2),
+            "wall_seconds": round(wall_seconds, 2),
+            "model_load_seconds": round(load_seconds, 2),
+            "real_time_factor": round(decode_seconds / decoded_audio, 4) if decoded_audio else None,
+            "latency_p50_ms": percentile(latencies, 50),
+            "latency_p95_ms": percentile(latencies, 95),
+            "cpu_seconds": round(cpu_seconds, 2),
+            "cpu_per_audio_second": round(cpu_seconds / audio_seconds, 4) if audio_seconds else None,
+            "transcribed_items": sum(entry["transcribed"] for entry in per_item),
+            "word_error_rate": round(errors / ref_words, 4) if ref_words else None,
+            "trigger_recall": round(trigger_hits / trigger_expected, 4) if trigger_expected else None,
+            "false_triggers": false_triggers,
+            "wake_rejections": wake_rejections,
+            "false_rejects": false_rejects, # rejected by the wake check though the trigger was said
+        },
+        "engine": stats,
+        "items": per_item,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay a labelled corpus through the STT pipeline")
+    parser.add_argument("manifest", help="JSONL manifest of {audio, text} entries")
+    parser.add_argument("--profile", default=speech_to_text.DECODING_PROFILE,
+                        choices=list(speech_to_text.DECODING_PROFILES))
+    parser.add_argument("--cascade-model", default=speech_to_text.CASCADE_MODEL_SIZE,
+                        help="Cascade model size, or '' to disable")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed relative to real time (0 = as fast as possible, may overrun the buffer)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmark(load_manifest(args.manifest), args.profile, args.cascade_model, args.speed)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Report written to {args.output}")
+    else:
+        print(output)
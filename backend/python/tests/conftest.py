@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend runs from backend/python with flat imports (tracing, metrics, AI.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import time
+
+import tracing
+from AI import actions # noqa: F401  (registers the intents)
+from AI import executor
+
+
+def _runner(fail=()):
+    started = []
+
+    def run(intent, action):
+        started.append(action["name"])
+        if action["name"] in fail:
+            raise RuntimeError("boom")
+        return action["name"]
+    return run, started
+
+
+def _actions(*specs):
+    return [{"intent": intent, "name": name} for intent, name in specs]
+
+
+def test_dependency_on_a_later_action_is_kept():
+    actions_list = _actions(("open_app", "open"), ("media_pause", "pause"), ("screenshot", "shot"),
+                            ("type_chat", "type"), ("media_next", "next"))
+    depends_on = [[], [], [], [0], []]
+    _, deps = executor.build_graph(actions_list, [4, 3, 2, 1, 0], depends_on)
+    assert 0 in deps[3]
+
+    run, started = _runner(fail={"open"})
+    results = executor.run_graph(actions_list, [4, 3, 2, 1, 0], depends_on, run=run)
+    assert results[3]["status"] == "skipped"
+    assert "type" not in started
+
+
+def test_execution_order_breaks_ties_between_ready_actions():
+    actions_list = _actions(("screenshot", "a"), ("clip", "b"), ("list_steam_games", "c"))
+    run, _ = _runner()
+    submitted = []
+    executor.run_graph(actions_list, [2, 0, 1], run=run, on_start=lambda index, action: submitted.append(index))
+    assert submitted == [2, 0, 1]
+
+
+def test_shared_resource_follows_the_dependencies():
+    # type_chat waits on media_pause explicitly, though it comes first in execution order;
+    # chaining the keyboard users in execution order would deadlock
+    actions_list = _actions(("type_chat", "type"), ("media_pause", "pause"))
+    _, deps = executor.build_graph(actions_list, [0, 1], [[1], []])
+    assert deps == {0: {1}, 1: set()}
+
+
+def test_cycle_drops_one_edge_and_is_traced():
+    actions_list = _actions(("screenshot", "a"), ("clip", "b"), ("list_steam_games", "c"))
+    trace = tracing.start("cycle", started_at=time.monotonic())
+    with tracing.activate(trace):
+        _, deps = executor.build_graph(actions_list, [0, 1, 2], [[2], [0], [1]])
+    assert deps == {0: set(), 1: {0}, 2: {1}}
+    span = trace.to_dict()["spans"][0]
+    assert span["name"] == "dependency_cycle"
+    assert (span["action"], span["dropped_dependency"]) == (0, 2)
@@ -0,0 +1,24 @@
+from AI import intents
+
+
+def test_comma_separated_commands_go_to_the_llm():
+    text = "Pilot, open Discord, Spotify."
+    assert intents.is_multi_action(text)
+    assert intents.match_intent(text) is None
+
+
+def test_comma_after_trigger_word_is_not_a_second_action():
+    assert not intents.is_multi_action("Pilot, pause the music, please")
+    assert intents.match_intent("Pilot, pause the music, please")["intent"] == "media_pause"
+
+
+def test_unknown_app_names_are_left_to_the_llm():
+    for text in ("pilot start recording", "pilot start a timer for five minutes",
+                 "pilot run away from here", "pilot close this window"):
+        assert intents.match_intent(text) is None, text
+
+
+def test_known_app_names_resolve_locally():
+    response = intents.match_intent("pilot open spotify")
+    assert (response["intent"], response["app_name"], response["source"]) == ("open_app", "spotify", "local")
+    assert intents.match_intent("pilot close discord")["intent"] == "close_app"
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("requests")
+
+import tts_stub_server
+
+FAST = {"first_byte_ms": 0, "realtime_factor": 50, "connect_ms": 50}
+
+
+@pytest.fixture
+def stub():
+    server, url = tts_stub_server.start_server(FAST)
+    yield server, url
+    server.shutdown()
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_utterances_share_one_pooled_connection(stub, streaming):
+    server, url = stub
+    service = tts_stub_server.make_service(url, streaming)
+
+    tts_stub_server.measure(service, "first utterance")
+    tts_stub_server.measure(service, "second utterance")
+
+    assert server.stats == {"connections": 1, "requests": 2}
+
+
+def test_wake_word_warm_up_opens_the_connection_speech_then_uses(stub):
+    server, url = stub
+    service = tts_stub_server.make_service(url)
+
+    service.warm_connection().join()
+    assert server.stats["connections"] == 1
+
+    tts_stub_server.measure(service, "after the wake word")
+    assert server.stats == {"connections": 1, "requests": 2}
+    # Used just now, so another wake word doesn't warm it again
+    assert service.warm_connection() is None
@@ -0,0 +1,48 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("requests")
+os.environ.setdefault("ELEVENLABS_API_KEY", "test") # tts_service builds its shared instance on import
+
+from tts_cache import TTSCache
+from tts_service import TTSService
+from tts_stub_server import silent_mp3
+import tts_scheduler
+
+
+class _Socket:
+    def emit(self, *args, **kwargs):
+        pass
+
+
+def _service(phrases):
+    service = TTSService(api_key="test", cache=TTSCache(disk_bytes=0))
+    service.socketio = _Socket()
+    for text, seconds in phrases.items():
+        service.cache.put(service._cache_key(text), silent_mp3(seconds))
+    return service
+
+
+def test_late_stop_of_preempted_chatter_spares_the_urgent_item(monkeypatch):
+    monkeypatch.setattr("tts_service.PLAYBACK_GRACE_SECONDS", 0)
+    service = _service({"chatter": 1.0, "error": 0.3})
+    speech = tts_scheduler.SpeechScheduler(service)
+
+    chatter = speech.say("chatter", tts_scheduler.LOW)
+    time.sleep(0.1)
+    urgent = speech.say("error", tts_scheduler.URGENT)
+    time.sleep(0.1)
+    service.stop(chatter.id) # arrives after the worker moved on to the urgent item
+    time.sleep(0.6)
+
+    assert chatter.status == "interrupted"
+    assert urgent.status == "done"
+
+
+def test_stop_before_start_keeps_the_utterance_from_playing():
+    service = _service({"hello": 0.1})
+    assert service.stop("later") is False
+    assert service.speak("hello", utterance_id="later") is False
+    assert not service.is_speaking()
@@ -0,0 +1,136 @@
+"""
+Per-utterance latency tracing.
+
+Each utterance gets one trace, starting when VAD hears the end of speech.
+Every stage it passes through (transcription, LLM, action dispatch, TTS
+request, first audio byte, playback) adds a span to it. Recent traces
+are kept in a ring buffer and served by the Flask server at /traces.
+
+The trace for the work a thread is doing is thread-local: activate() sets
+it, and bind() carries it into a thread started from there. Recording a
+span with no active trace does nothing, so stages can be traced
+unconditionally.
+"""
+import os
+import time
+import uuid
+import threading
+import collections
+from contextlib import contextmanager
+
+TRACE_HISTORY = int(os.getenv("PILOT_TRACE_HISTORY", "100")) # traces kept for /traces
+ATTACH_TO_EVENTS = os.getenv("PILOT_TRACE_EVENTS", "0") == "1" # add trace_id to pilot_event messages
+
+_local = threading.local()
+_lock = threading.Lock()
+_traces = collections.OrderedDict() # trace id -> Trace, oldest first
+
+
+class Trace:
+    def __init__(self, text=None, started_at=None, **attrs):
+        self.id = uuid.uuid4().hex[:12]
+        self.text = text
+        # Spans are timed with time.monotonic(), relative to t0
+        self.t0 = started_at if started_at is not None else time.monotonic()
+        self.wall_start = time.time() - (time.monotonic() - self.t0)
+        self.attrs = attrs
+        self.spans = []
+
+    def record(self, name, start, end=None, **attrs):
+        """Add a span measured elsewhere (monotonic start/end; end=None for a point event)"""
+        self.spans.append((name, start, start if end is None else end, attrs))
+
+    def to_dict(self):
+        spans = sorted(list(self.spans), key=lambda span: span[1])
+        stages = collections.OrderedDict()
+        for name, start, end, _ in spans:
+            stages[name] = round(stages.get(name, 0.0) + (end - start) * 1000, 1)
+        last = max((end for _, _, end, _ in spans), default=self.t0)
+        return {
+            "id": self.id,
+            "text": self.text,
+            "started": self.wall_start,
+            "duration_ms": round((last - self.t0) * 1000, 1),
+            "stages_ms": stages,
+            "spans": [
+                dict({
+                    "name": name,
+                    "start_ms": round((start - self.t0) * 1000, 1),
+                    "duration_ms": round((end - start) * 1000, 1),
+                }, **attrs)
+                for name, start, end, attrs in spans
+            ],
+            **self.attrs,
+        }
+
+
+def start(text=None, started_at=None, **attrs):
+    """Begin a trace and keep it in the ring buffer"""
+    trace = Trace(text, started_at, **attrs)
+    with _lock:
+        _traces[trace.id] = trace
+        while len(_traces) > TRACE_HISTORY:
+            _traces.popitem(last=False)
+    return trace
+
+def get(trace_id):
+    with _lock:
+        return _traces.get(trace_id)
+
+def recent(limit=20):
+    """The most recent traces, newest first"""
+    with _lock:
+        traces = list(_traces.values())[-limit:]
+    return [trace.to_dict() for trace in reversed(traces)]
+
+def current():
+    """The trace of the utterance this thread is working on, if any"""
+    return getattr(_local, "trace", None)
+
+@contextmanager
+def activate(trace):
+    """Make `trace` current for this thread (None leaves tracing off)"""
+    previous = current()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+def bind(func):
+    """Wrap `func` so it runs under the current trace, e.g. as a Thread target"""
+    trace = current()
+    if trace is None:
+        return func
+
+    def traced(*args, **kwargs):
+        with activate(trace):
+            return func(*args, **kwargs)
+    return traced
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a span of the current trace"""
+    trace = current()
+    started = time.monotonic()
+    try:
+        yield attrs # callers may add attributes while the span is open
+    finally:
+        if trace is not None:
+            trace.record(name, started, time.monotonic(), **attrs)
+
+def record(name, start, end=None, **attrs):
+    trace = current()
+    if trace is not None:
+        trace.record(name, start, end, **attrs)
+
+def mark(name, **attrs):
+    """Record a point event on the current trace"""
+    record(name, time.monotonic(), **attrs)
+
+def annotate(payload):
+    """Add the current trace ID to a pilot_event payload when PILOT_TRACE_EVENTS=1"""
+    trace = current()
+    if ATTACH_TO_EVENTS and trace is not None:
+        payload['trace_id'] = trace.id
+    return payload
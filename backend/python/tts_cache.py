@@ -0,0 +1,184 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+TTS_CACHE_MEMORY_BYTES = int(float(os.getenv("PILOT_TTS_CACHE_MEMORY_MB", "16")) * 1024 * 1024)
+TTS_CACHE_DISK_BYTES = int(float(os.getenv("PILOT_TTS_CACHE_DISK_MB", "200")) * 1024 * 1024) # 0 disables the disk tier
+TTS_CACHE_DIR = os.getenv("PILOT_TTS_CACHE_DIR") or str(Path(tempfile.gettempdir()) / "pilot-tts-cache")
+
+
+def normalize_text(text):
+    """Collapse whitespace so "Media  paused " and "Media paused" share audio"""
+    return unicodedata.normalize("NFC", " ".join((text or "").split()))
+
+def cache_key(voice_id, model_id, voice_settings, text):
+    """Content address of the audio ElevenLabs would return for this request"""
+    identity = json.dumps([voice_id, model_id, voice_settings, normalize_text(text)], sort_keys=True)
+    return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Synthesized speech keyed by cache_key(), in two tiers.
+
+    The memory tier is an LRU capped at memory_bytes. The disk tier keeps
+    one <key>.mp3 per entry under `directory`, capped at disk_bytes and
+    evicted least recently used first (file mtime is bumped on every hit,
+    so the order survives restarts). Disk hits are promoted to memory.
+    """
+
+    def __init__(self, memory_bytes=TTS_CACHE_MEMORY_BYTES, disk_bytes=TTS_CACHE_DISK_BYTES, directory=TTS_CACHE_DIR):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.directory = Path(directory) if disk_bytes > 0 else None
+
+        self._memory = OrderedDict() # key -> audio bytes, least recent first
+        self._memory_size = 0
+        self._disk = OrderedDict() # key -> size on disk, least recent first
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.directory:
+            self._scan_disk()
+
+    def get(self, key):
+        """Audio bytes for `key`, or None"""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+            on_disk = key in self._disk
+
+        if on_disk:
+            audio = self._read_disk(key)
+            if audio is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store_memory(key, audio)
+                return audio
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._memory or key in self._disk
+
+    def put(self, key, audio):
+        if not audio:
+            return
+        with self._lock:
+            self._store_memory(key, audio)
+        if self.directory:
+            self._write_disk(key, audio)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            keys = list(self._disk)
+            self._disk.clear()
+            self._disk_size = 0
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_size,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _store_memory(self, key, audio):
+        # Caller holds the lock
+        if len(audio) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _path(self, key):
+        return self.directory / f"{key}.mp3"
+
+    def _scan_disk(self):
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            files = sorted(self.directory.glob("*.mp3"), key=lambda path: path.stat().st_mtime)
+        except OSError as e:
+            print(f"TTS cache directory unavailable, disk tier off: {e}")
+            self.directory = None
+            return
+        for path in files:
+            size = path.stat().st_size
+            self._disk[path.stem] = size
+            self._disk_size += size
+        # The cap may have been lowered since the last run
+        for key in self._evict_disk():
+            self._path(key).unlink(missing_ok=True)
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+            os.utime(path) # most recently used
+        except OSError:
+            with self._lock:
+                self._disk_size -= self._disk.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+        return audio
+
+    def _write_disk(self, key, audio):
+        if len(audio) > self.disk_bytes:
+            return
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            temp_path.write_bytes(audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Could not write TTS cache entry: {e}")
+            temp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._disk_size -= self._disk.pop(key, 0)
+            self._disk[key] = len(audio)
+            self._disk_size += len(audio)
+            evicted = self._evict_disk()
+        for old_key in evicted:
+            self._path(old_key).unlink(missing_ok=True)
+
+    def _evict_disk(self):
+        # Caller holds the lock (or is __init__); returns the keys to delete
+        evicted = []
+        while self._disk_size > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(key)
+        return evicted
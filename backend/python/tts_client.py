@@ -1,24 +1,27 @@
 from tts_service import tts
+from tts_scheduler import speech, URGENT, NORMAL, LOW
 
-def speak(text: str) -> bool:
+def speak(text: str, priority: int = NORMAL) -> bool:
     """
-    Simple TTS function - easy to use from anywhere
+    Simple TTS function - easy to use from anywhere. Queues the text and
+    returns straight away; sentences are spoken one at a time, by priority.
     
     Args:
         text (str): Text to speak
+        priority (int): URGENT (errors), NORMAL (action feedback) or LOW (chatter)
     
     Returns:
-        bool: True if successful
+        bool: True if the text was queued
     """
-    return tts.speak(text)
+    return speech.say(text, priority) is not None
 
 def stop() -> bool:
-    """Stop current TTS"""
-    return tts.stop()
+    """Stop current TTS and drop anything queued"""
+    return speech.clear()
 
 def is_speaking() -> bool:
-    """Check if currently speaking"""
-    return tts.is_speaking()
+    """Check if currently speaking or about to"""
+    return speech.is_busy() or tts.is_speaking()
 
 # Initialize TTS when module is imported
 try:
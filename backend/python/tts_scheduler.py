@@ -0,0 +1,271 @@
+"""
+One queue for everything Pilot says out loud.
+
+A single worker thread speaks queued sentences one at a time, so callers
+never race each other through TTSService.stop(). Each sentence has a
+priority:
+
+    URGENT  errors; jump the queue and cut off chatter that is playing
+    NORMAL  action feedback
+    LOW     chatter (what Pilot is about to do); dropped once it is stale
+
+Adjacent short sentences of the same priority are merged into one
+synthesis request. barge_in() is called when the wake word is heard: it
+drops everything queued and stops what is playing, so Pilot doesn't talk
+over the next command.
+"""
+import os
+import time
+import heapq
+import itertools
+import threading
+import collections
+import tracing
+import metrics
+from tts_service import tts
+
+URGENT = 0
+NORMAL = 1
+LOW = 2
+PRIORITY_NAMES = {URGENT: "urgent", NORMAL: "normal", LOW: "low"}
+
+COALESCE_MAX_CHARS = int(os.getenv("PILOT_TTS_COALESCE_CHARS", "120")) # merged text stays under this
+LOW_PRIORITY_MAX_AGE = float(os.getenv("PILOT_TTS_LOW_MAX_AGE", "4.0")) # seconds before queued chatter is dropped
+SPEECH_HISTORY = 50
+
+QUEUE_WAIT_SECONDS = metrics.histogram("pilot_tts_queue_wait_seconds", "Time a sentence waited for the speaker", ["priority"])
+SPEECH_ITEMS = metrics.counter("pilot_tts_items_total", "Sentences given to the speech queue, by outcome", ["priority", "status"])
+
+
+def _sentence(text):
+    # Merged sentences need their own full stop or the voice runs them together
+    return text if text[-1] in ".!?" else text + "."
+
+
+class SpeechItem:
+    """One sentence in the queue"""
+
+    def __init__(self, text, priority, seq):
+        self.id = f"speech-{seq}"
+        self.seq = seq
+        self.text = text.strip()
+        self.priority = priority
+        self.status = "queued" # speaking, done, failed, interrupted, dropped, cancelled
+        self.created = time.time()
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.merged_with = [] # ids of the other sentences in the same request
+        self.synthesis_seconds = None
+        self.first_audio_seconds = None
+        self.cached = None
+        self.trace = tracing.current()
+
+    def to_dict(self):
+        wait_until = self.started_at or self.finished_at
+        return {
+            "id": self.id,
+            "text": self.text,
+            "priority": PRIORITY_NAMES[self.priority],
+            "status": self.status,
+            "created": self.created,
+            "wait_seconds": round(wait_until - self.enqueued_at, 3) if wait_until else None,
+            "synthesis_seconds": round(self.synthesis_seconds, 3) if self.synthesis_seconds is not None else None,
+            "first_audio_seconds": round(self.first_audio_seconds, 3) if self.first_audio_seconds is not None else None,
+            "cached": self.cached,
+            "merged_with": self.merged_with,
+            "trace_id": self.trace.id if self.trace else None,
+        }
+
+
+class SpeechScheduler:
+    """Serializes TTSService.speak() calls behind a priority queue"""
+
+    def __init__(self, tts):
+        self.tts = tts
+        self._heap = [] # (priority, seq, item)
+        self._seq = itertools.count(1)
+        self._cond = threading.Condition()
+        self._current = None # items being spoken right now
+        self._interrupted = False
+        self._history = collections.deque(maxlen=SPEECH_HISTORY)
+        self._thread = None
+
+        self.merged = 0
+        self.dropped = 0
+        self.barge_ins = 0
+
+    def say(self, text, priority=NORMAL):
+        """
+        Queue a sentence to be spoken.
+
+        Args:
+            text (str): What to say
+            priority (int): URGENT, NORMAL or LOW
+
+        Returns:
+            SpeechItem: The queued sentence, or None for empty text
+        """
+        if not text or not text.strip():
+            return None
+
+        item = SpeechItem(text, priority, next(self._seq))
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="tts-speaker", daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (priority, item.seq, item))
+            # Note which utterance is cut off now; by the time stop() runs the
+            # worker may already be speaking the urgent item, which must survive
+            victim = None
+            if priority == URGENT and self._current and self._current[0].priority == LOW:
+                victim = self._current[0].id
+                self._interrupted = True
+            self._cond.notify()
+
+        if victim:
+            print("Urgent speech queued, cutting off chatter")
+            self.tts.stop(victim)
+        return item
+
+    def barge_in(self):
+        """The user started talking to Pilot: drop queued speech and stop what is playing"""
+        with self._cond:
+            self.barge_ins += 1
+            cancelled = self._drain("cancelled")
+            victim = self._current[0].id if self._current else None
+            if victim:
+                self._interrupted = True
+
+        if victim or self.tts.is_speaking():
+            print(f"Barge-in: stopped speech, cancelled {cancelled} queued")
+            self.tts.stop(victim)
+
+    def clear(self):
+        """Cancel everything queued and stop the current sentence"""
+        with self._cond:
+            self._drain("cancelled")
+            victim = self._current[0].id if self._current else None
+            if victim:
+                self._interrupted = True
+        return self.tts.stop(victim)
+
+    def is_busy(self):
+        with self._cond:
+            return bool(self._heap) or self._current is not None
+
+    def recent(self, limit=20):
+        """Queued and speaking sentences, then finished ones, newest first"""
+        with self._cond:
+            active = [item.to_dict() for item in (self._current or [])]
+            queued = [item.to_dict() for _, _, item in sorted(self._heap)]
+            finished = [item.to_dict() for item in reversed(self._history)]
+        return (active + queued + finished)[:limit]
+
+    def stats(self):
+        with self._cond:
+            queued = collections.Counter(PRIORITY_NAMES[priority] for priority, _, _ in self._heap)
+            return {
+                "queued": dict(queued),
+                "speaking": " ".join(item.text for item in self._current) if self._current else None,
+                "merged": self.merged,
+                "dropped_stale": self.dropped,
+                "barge_ins": self.barge_ins,
+            }
+
+    def _drain(self, status):
+        # Caller holds the lock
+        items = [item for _, _, item in self._heap]
+        self._heap.clear()
+        for item in items:
+            self._finish(item, status)
+        return len(items)
+
+    def _finish(self, item, status):
+        item.status = status
+        item.finished_at = time.monotonic()
+        self._history.append(item)
+        SPEECH_ITEMS.inc(priority=PRIORITY_NAMES[item.priority], status=status)
+
+    def _pop_fresh(self, now):
+        # Caller holds the lock; skips (and drops) stale chatter
+        while self._heap:
+            _, _, item = heapq.heappop(self._heap)
+            if item.priority == LOW and now - item.enqueued_at > LOW_PRIORITY_MAX_AGE:
+                self.dropped += 1
+                self._finish(item, "dropped")
+                continue
+            return item
+        return None
+
+    def _next_batch(self):
+        # Caller holds the lock
+        now = time.monotonic()
+        first = self._pop_fresh(now)
+        if first is None:
+            return None
+
+        batch = [first]
+        length = len(first.text)
+        while self._heap:
+            priority, _, item = self._heap[0]
+            if priority != first.priority or length + 1 + len(item.text) > COALESCE_MAX_CHARS:
+                break
+            item = self._pop_fresh(now)
+            if item is None:
+                break
+            if item.priority != first.priority:
+                # Only possible after stale chatter was dropped; put it back
+                heapq.heappush(self._heap, (item.priority, item.seq, item))
+                break
+            batch.append(item)
+            length += 1 + len(item.text)
+
+        if len(batch) > 1:
+            self.merged += len(batch) - 1
+            for item in batch:
+                item.merged_with = [other.id for other in batch if other is not item]
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                self._current = batch
+                self._interrupted = False
+
+            try:
+                self._speak(batch)
+            finally:
+                with self._cond:
+                    self._current = None
+
+    def _speak(self, batch):
+        started = time.monotonic()
+        lead = batch[0]
+        for item in batch:
+            item.status = "speaking"
+            item.started_at = started
+            QUEUE_WAIT_SECONDS.observe(started - item.enqueued_at, priority=PRIORITY_NAMES[item.priority])
+
+        text = " ".join(_sentence(item.text) for item in batch) if len(batch) > 1 else lead.text
+        with tracing.activate(lead.trace):
+            tracing.record("tts_queue", lead.enqueued_at, started, priority=PRIORITY_NAMES[lead.priority], sentences=len(batch))
+            # The lead's id doubles as the utterance id, so stop() can target this batch
+            ok = self.tts.speak(text, utterance_id=lead.id)
+
+        timing = self.tts.last_utterance or {}
+        with self._cond:
+            status = "interrupted" if self._interrupted else ("done" if ok else "failed")
+            for item in batch:
+                item.synthesis_seconds = timing.get("synthesis_seconds")
+                item.first_audio_seconds = timing.get("first_audio_seconds")
+                item.cached = timing.get("cached")
+                self._finish(item, status)
+
+
+speech = SpeechScheduler(tts)
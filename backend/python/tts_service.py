@@ -5,24 +5,141 @@ import platform
 import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import io
 import base64
+import uuid
 from pathlib import Path
 from dotenv import load_dotenv
+import tracing
+import metrics
+from tts_cache import TTSCache, cache_key
 
 # Load environment variables
 load_dotenv()
 
+TTS_BASE_URL = os.getenv("PILOT_TTS_BASE_URL", "https://api.elevenlabs.io/v1")
+# Forward audio to Electron chunk by chunk as ElevenLabs streams it, so playback starts on the first chunk
+TTS_STREAMING = os.getenv("PILOT_TTS_STREAMING", "1") == "1"
+# Reuse audio for text already spoken with the same voice (memory + disk, see tts_cache.py)
+TTS_CACHE = os.getenv("PILOT_TTS_CACHE", "1") == "1"
+# Send audio as raw Socket.IO binary attachments to clients that negotiate it (see register_client)
+TTS_BINARY = os.getenv("PILOT_TTS_BINARY", "1") == "1"
+
+# (connect, read) timeouts for ElevenLabs requests; read is per chunk, not the whole body
+TTS_TIMEOUT = (float(os.getenv("PILOT_TTS_CONNECT_TIMEOUT", "3.05")), float(os.getenv("PILOT_TTS_READ_TIMEOUT", "15")))
+TTS_RETRIES = int(os.getenv("PILOT_TTS_RETRIES", "2")) # connection errors and 429/5xx, before any audio arrives
+TTS_POOL_SIZE = 4 # speaker thread, cache pre-warm, connection warm-up
+# A connection used this recently is assumed still open; don't warm it again
+TTS_KEEPALIVE_SECONDS = float(os.getenv("PILOT_TTS_KEEPALIVE_SECONDS", "20"))
+
+# Slack after the audio's own length before giving up on a playback_finished ack
+PLAYBACK_GRACE_SECONDS = float(os.getenv("PILOT_TTS_PLAYBACK_GRACE", "1.0"))
+
+# MPEG audio frame tables, indexed by the header's version/layer/bitrate/sample rate fields
+_MPEG1_BITRATES = {
+    3: (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448), # layer I
+    2: (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384), # layer II
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320), # layer III
+}
+_MPEG2_BITRATES = {
+    3: (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    1: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+def audio_duration(audio):
+    """
+    Playing time of MP3 data, from its frame headers.
+    
+    Args:
+        audio (bytes): MP3 data, optionally starting with an ID3v2 tag
+    
+    Returns:
+        float: Seconds of audio, or None if no MPEG frames were found
+    """
+    pos = 0
+    if audio[:3] == b"ID3" and len(audio) >= 10:
+        # Tag size is four 7-bit bytes, not counting the 10-byte header
+        pos = 10 + ((audio[6] << 21) | (audio[7] << 14) | (audio[8] << 7) | audio[9])
+    
+    seconds = 0.0
+    frames = 0
+    end = len(audio) - 4
+    while pos <= end:
+        if audio[pos] != 0xFF or audio[pos + 1] & 0xE0 != 0xE0:
+            pos += 1
+            continue
+        version = (audio[pos + 1] >> 3) & 0x3 # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+        layer = (audio[pos + 1] >> 1) & 0x3 # 3 = I, 2 = II, 1 = III
+        bitrate_index = audio[pos + 2] >> 4
+        rate_index = (audio[pos + 2] >> 2) & 0x3
+        padding = (audio[pos + 2] >> 1) & 0x1
+        if version == 1 or layer == 0 or bitrate_index in (0, 15) or rate_index == 3:
+            pos += 1 # not a real header (or free format, which we can't size)
+            continue
+        
+        bitrate = (_MPEG1_BITRATES if version == 3 else _MPEG2_BITRATES)[layer][bitrate_index] * 1000
+        sample_rate = _SAMPLE_RATES[version][rate_index]
+        if layer == 3:
+            samples = 384
+            length = (12 * bitrate // sample_rate + padding) * 4
+        else:
+            samples = 1152 if version == 3 or layer == 2 else 576
+            length = samples // 8 * bitrate // sample_rate + padding
+        
+        seconds += samples / sample_rate
+        frames += 1
+        pos += length
+    
+    return seconds if frames else None
+
+TTS_SECONDS = metrics.histogram("pilot_tts_seconds", "ElevenLabs request until the audio is downloaded")
+TTS_FIRST_BYTE_SECONDS = metrics.histogram("pilot_tts_first_byte_seconds", "ElevenLabs request until the first audio byte")
+
 class TTSService:
-    def __init__(self):
-        self.api_key = os.getenv('ELEVENLABS_API_KEY')
+    def __init__(self, api_key=None, base_url=None, streaming=TTS_STREAMING, cache=None):
+        self.api_key = api_key or os.getenv('ELEVENLABS_API_KEY')
         self._is_speaking = False
         self.current_audio_file = None
+        self.streaming = streaming
+        # Utterance whose audio is being sent; anything else still streaming stops
+        self._current_utterance = None
+        # stop(utterance_id) that arrived before that utterance started speaking
+        self._stop_requested = None
+        # Playback state of the current utterance, updated by Electron's acks
+        self._playback = None
+        self._playback_lock = threading.Lock()
+        # Timings of the last speak(): cached, first_audio_seconds, synthesis_seconds
+        self.last_utterance = None
+        
+        # Socket.IO sid -> "binary", "base64" or None (client doesn't play audio)
+        self._audio_clients = {}
+        self._clients_lock = threading.Lock()
         
         # Your current voice settings
         self.voice_id = 'JBFqnCBsd6RMkjVDRZzb'  # George (default)
         # self.voice_id = 'Xb7hH8MSUJpSbSDYk0k2'  # Alice (alternative)
-        self.base_url = 'https://api.elevenlabs.io/v1'
+        self.base_url = base_url or TTS_BASE_URL
+        self.model_id = 'eleven_monolingual_v1'
+        self.voice_settings = {
+            'stability': 0.5,
+            'similarity_boost': 0.75,
+            'style': 0.0,
+            'use_speaker_boost': True
+        }
+        
+        # Synthesized audio keyed on voice, model, settings and text (cache=False disables it)
+        self.cache = cache if cache is not None else (TTSCache() if TTS_CACHE else None)
+        
+        # Keep-alive connection pool, so utterances skip DNS, TCP and TLS setup
+        self.timeout = TTS_TIMEOUT
+        self.session = self._create_session()
+        self._last_request = 0.0 # monotonic time the pool last talked to ElevenLabs
+        self._warm_thread = None
+        self._warm_lock = threading.Lock()
         
         # WebSocket reference (will be set by server)
         self.socketio = None
@@ -30,10 +147,101 @@ class TTSService:
         if not self.api_key:
             raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
     
+    def _create_session(self):
+        session = requests.Session()
+        retry = Retry(
+            total=TTS_RETRIES,
+            backoff_factor=0.2,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"HEAD", "GET", "POST"}), # synthesis has no side effects
+            respect_retry_after_header=True
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TTS_POOL_SIZE, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({'xi-api-key': self.api_key})
+        return session
+    
+    def warm_connection(self):
+        """
+        Open a pooled connection to ElevenLabs in the background, so the next
+        utterance starts on a warm socket. Called when the wake word is heard.
+        
+        Returns:
+            threading.Thread: The warm-up thread, or None if the pool is already warm
+        """
+        with self._warm_lock:
+            if self._warm_thread and self._warm_thread.is_alive():
+                return None
+            if time.monotonic() - self._last_request < TTS_KEEPALIVE_SECONDS:
+                return None
+            self._warm_thread = threading.Thread(target=tracing.bind(self._warm), name="tts-warm", daemon=True)
+            self._warm_thread.start()
+            return self._warm_thread
+    
+    def _warm(self):
+        started = time.monotonic()
+        try:
+            # Only the connection is wanted; whatever status comes back is fine
+            self.session.head(self.base_url, timeout=self.timeout)
+            self._last_request = time.monotonic()
+            tracing.record("tts_connection_warm", started, self._last_request)
+            print(f"TTS connection warmed in {self._last_request - started:.3f}s")
+        except requests.RequestException as e:
+            print(f"TTS connection warm-up failed: {e}")
+    
     def set_socketio(self, socketio):
         """Set the WebSocket reference for audio streaming"""
         self.socketio = socketio
     
+    def register_client(self, sid, audio=True, binary=False):
+        """
+        Record how a Socket.IO client wants TTS audio delivered. Clients that
+        connect and never say are treated as older ones and get base64.
+        
+        Args:
+            sid (str): Socket.IO session id
+            audio (bool): Whether the client plays TTS audio at all
+            binary (bool): Whether it accepts raw bytes as binary attachments
+        
+        Returns:
+            str: The transport the client will get ("binary", "base64" or "none")
+        """
+        transport = None
+        if audio:
+            transport = "binary" if binary and TTS_BINARY else "base64"
+        with self._clients_lock:
+            self._audio_clients[sid] = transport
+        return transport or "none"
+    
+    def unregister_client(self, sid):
+        with self._clients_lock:
+            self._audio_clients.pop(sid, None)
+    
+    def _emit_audio(self, message, audio):
+        """
+        Send one 'tts_audio' message carrying audio: raw bytes to clients that
+        negotiated binary, base64 text to the rest. The encoding is done once,
+        and only if some client needs it.
+        """
+        with self._clients_lock:
+            clients = dict(self._audio_clients)
+        
+        if not clients:
+            # Nothing registered (no server, or a bare emitter): broadcast as before
+            self.socketio.emit('tts_audio', dict(message, audio=base64.b64encode(audio).decode('utf-8')))
+            return
+        
+        binary = dict(message, audio=audio, encoding='binary')
+        encoded = None
+        for sid, transport in clients.items():
+            if transport == "binary":
+                self.socketio.emit('tts_audio', binary, to=sid)
+            elif transport == "base64":
+                if encoded is None:
+                    encoded = dict(message, audio=base64.b64encode(audio).decode('utf-8'))
+                self.socketio.emit('tts_audio', encoded, to=sid)
+    
     def initialize(self):
         """Initialize the TTS service"""
         try:
@@ -44,12 +252,13 @@ class TTSService:
             print(f"Failed to initialize TTS service: {e}")
             return False
     
-    def speak(self, text: str) -> bool:
+    def speak(self, text: str, utterance_id: str = None) -> bool:
         """
         Speak text using TTS and stream audio to Electron
         
         Args:
             text (str): Text to speak
+            utterance_id (str): Id to use, so the caller can stop() exactly this utterance
         
         Returns:
             bool: True if successful, False otherwise
@@ -63,68 +272,267 @@ class TTSService:
             if self._is_speaking:
                 self.stop()
             
-            self._is_speaking = True
+            utterance_id = utterance_id or uuid.uuid4().hex[:12]
+            with self._playback_lock:
+                if utterance_id == self._stop_requested:
+                    # Stopped before it got going
+                    self._stop_requested = None
+                    return False
+                self._is_speaking = True
+                self._current_utterance = utterance_id
+            self._begin_playback(utterance_id)
+            self.last_utterance = timing = {
+                "utterance_id": utterance_id,
+                "cached": False,
+                "first_audio_seconds": None,
+                "synthesis_seconds": None
+            }
+            
+            # Phrases spoken before play straight from the cache, with no network round-trip
+            key = self._cache_key(text)
+            cached = self.cache.get(key) if self.cache else None
+            if cached is not None:
+                print(f"Speaking from cache: '{text[:50]}{'...' if len(text) > 50 else ''}'")
+                tracing.mark("tts_cache_hit", bytes=len(cached))
+                timing.update(cached=True, first_audio_seconds=0.0, synthesis_seconds=0.0)
+                self._stream_audio_to_electron(cached, text, utterance_id)
+                return True
             
             print(f"Generating speech for: '{text[:50]}{'...' if len(text) > 50 else ''}'")
             
-            # Prepare the request
-            url = f"{self.base_url}/text-to-speech/{self.voice_id}"
-            headers = {
-                'xi-api-key': self.api_key,
-                'Content-Type': 'application/json'
-            }
-            data = {
-                'text': text,
-                'model_id': 'eleven_monolingual_v1',
-                'voice_settings': {
-                    'stability': 0.5,
-                    'similarity_boost': 0.75,
-                    'style': 0.0,
-                    'use_speaker_boost': True
-                }
-            }
+            # The system player fallback needs the whole file, so only stream to Electron
+            streaming = self.streaming and self.socketio is not None
+            response, request_started = self._request_speech(text, streaming)
+            
+            if streaming:
+                first_audio_at, audio_data = self._stream_chunks_to_electron(response, text, utterance_id, request_started)
+                timing["synthesis_seconds"] = time.monotonic() - request_started
+                if first_audio_at is not None:
+                    timing["first_audio_seconds"] = first_audio_at - request_started
+                if audio_data and self.cache:
+                    self.cache.put(key, audio_data)
+                if first_audio_at is not None:
+                    self._wait_for_playback(text, first_audio_at, utterance_id, audio_duration(audio_data) if audio_data else None)
+                elif self._current_utterance == utterance_id:
+                    self._is_speaking = False
+                return True
             
-            # Make the API request
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
+            # Read the body as it arrives so the first audio byte can be timed
+            download_started = time.monotonic()
+            chunks = []
+            for chunk in response.iter_content(chunk_size=4096):
+                if not chunks:
+                    tracing.mark("tts_first_audio_byte")
+                    TTS_FIRST_BYTE_SECONDS.observe(time.monotonic() - request_started)
+                chunks.append(chunk)
+            audio_data = b"".join(chunks)
+            tracing.record("tts_download", download_started, time.monotonic(), bytes=len(audio_data))
+            TTS_SECONDS.observe(time.monotonic() - request_started)
+            timing["synthesis_seconds"] = timing["first_audio_seconds"] = time.monotonic() - request_started
+            if self.cache:
+                self.cache.put(key, audio_data)
             
             # Stream audio to Electron via WebSocket
-            self._stream_audio_to_electron(response.content, text)
+            self._stream_audio_to_electron(audio_data, text, utterance_id)
             
             return True
             
         except Exception as e:
             print(f"Error in TTS speak: {e}")
+            metrics.errors.inc(stage="tts")
             self._is_speaking = False
             return False
     
-    def _stream_audio_to_electron(self, audio_data: bytes, text: str):
+    def _request_speech(self, text, streaming):
+        """POST to the (streaming) text-to-speech endpoint; returns (response, request start time)"""
+        url = f"{self.base_url}/text-to-speech/{self.voice_id}"
+        if streaming:
+            url += "/stream"
+        data = {
+            'text': text,
+            'model_id': self.model_id,
+            'voice_settings': self.voice_settings
+        }
+        
+        # Make the API request
+        request_started = time.monotonic()
+        response = self.session.post(url, json=data, stream=True, timeout=self.timeout)
+        self._last_request = time.monotonic()
+        response.raise_for_status()
+        tracing.record("tts_request", request_started, time.monotonic(), chars=len(text), streaming=streaming)
+        return response, request_started
+    
+    def _stream_chunks_to_electron(self, response, text, utterance_id, request_started):
+        """
+        Forward audio to Electron as sequenced 'audio_chunk' messages while
+        ElevenLabs is still synthesizing, then an 'audio_end' with the count.
+        
+        Returns:
+            tuple: (monotonic time the first chunk was sent or None, the complete
+            audio or None if the stream was interrupted)
+        """
+        chunks = []
+        interrupted = False
+        seq = 0
+        total_bytes = 0
+        first_sent = None
+        download_started = time.monotonic()
+        
+        # chunk_size=None hands over each piece as soon as it arrives
+        for chunk in response.iter_content(chunk_size=None):
+            if not chunk:
+                continue
+            if self._current_utterance != utterance_id:
+                # stop() or a newer utterance took over
+                print("TTS stream interrupted")
+                response.close()
+                interrupted = True
+                break
+            
+            self._emit_audio({
+                'type': 'audio_chunk',
+                'utterance_id': utterance_id,
+                'seq': seq,
+                'format': 'mp3',
+                'text': text if seq == 0 else None
+            }, chunk)
+            if first_sent is None:
+                first_sent = time.monotonic()
+                tracing.mark("tts_first_audio_byte", streaming=True)
+                TTS_FIRST_BYTE_SECONDS.observe(first_sent - request_started)
+                print(f"First audio chunk sent after {first_sent - request_started:.3f}s")
+            seq += 1
+            total_bytes += len(chunk)
+            chunks.append(chunk)
+        
+        self.socketio.emit('tts_audio', {
+            'type': 'audio_end',
+            'utterance_id': utterance_id,
+            'chunks': seq
+        })
+        tracing.record("tts_download", download_started, time.monotonic(), bytes=total_bytes, chunks=seq)
+        TTS_SECONDS.observe(time.monotonic() - request_started)
+        return first_sent, None if interrupted else b"".join(chunks)
+    
+    def _cache_key(self, text):
+        return cache_key(self.voice_id, self.model_id, self.voice_settings, text)
+    
+    def prewarm(self, phrases):
+        """
+        Synthesize phrases into the cache ahead of time, without playing them.
+        
+        Args:
+            phrases (list): Texts to cache; ones already cached are skipped
+        
+        Returns:
+            int: Number of phrases synthesized
+        """
+        if not self.cache:
+            return 0
+        
+        synthesized = 0
+        for text in phrases:
+            key = self._cache_key(text)
+            if key in self.cache:
+                continue
+            try:
+                response, _ = self._request_speech(text, streaming=False)
+                self.cache.put(key, response.content)
+                synthesized += 1
+            except Exception as e:
+                print(f"TTS pre-warm failed for '{text[:50]}': {e}")
+                metrics.errors.inc(stage="tts")
+        print(f"TTS pre-warm: synthesized {synthesized} of {len(phrases)} phrases")
+        return synthesized
+    
+    def _begin_playback(self, utterance_id):
+        with self._playback_lock:
+            if self._playback:
+                self._playback["done"].set() # wake whoever waits on the old one
+            self._playback = {
+                "id": utterance_id,
+                "started": None, # monotonic time of Electron's playback_started
+                "duration": None, # as decoded by the player, if it said
+                "status": None,
+                "done": threading.Event()
+            }
+    
+    def on_playback_started(self, utterance_id, duration=None):
+        """Electron began playing an utterance (its 'playback_started' ack)"""
+        with self._playback_lock:
+            playback = self._playback
+            if not playback or playback["id"] != utterance_id:
+                return
+            playback["started"] = time.monotonic()
+            if isinstance(duration, (int, float)) and 0 < duration < float("inf"):
+                playback["duration"] = float(duration)
+    
+    def on_playback_finished(self, utterance_id, status="ended"):
+        """Electron finished (or failed) playing an utterance (its 'playback_finished' ack)"""
+        with self._playback_lock:
+            playback = self._playback
+            if not playback or playback["id"] != utterance_id:
+                return
+            playback["status"] = status
+            playback["done"].set()
+    
+    def _wait_for_playback(self, text, sent_at, utterance_id, duration=None):
+        """
+        Block until Electron reports the utterance finished, it is stopped or
+        replaced, or a deadline from the audio's length passes. The deadline
+        covers clients that never acknowledge playback.
+        
+        Args:
+            text (str): Spoken text, for a length guess when the audio can't be sized
+            sent_at (float): Monotonic time the audio (or its first chunk) was sent
+            utterance_id (str): Utterance being played
+            duration (float): Decoded audio length in seconds, if known
+        """
+        with self._playback_lock:
+            playback = self._playback if self._playback and self._playback["id"] == utterance_id else None
+        if duration is None:
+            duration = len(text.split()) * 0.5 # undecodable audio; rough guess of 0.5 s per word
+        
+        if playback:
+            while not playback["done"].is_set():
+                # A playback_started ack moves the deadline to the real start and length
+                start = playback["started"] or sent_at
+                deadline = start + (playback["duration"] or duration) + PLAYBACK_GRACE_SECONDS
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                playback["done"].wait(remaining)
+            
+            status = playback["status"] or ("stopped" if playback["done"].is_set() else "deadline")
+            tracing.record("tts_playback", playback["started"] or sent_at, time.monotonic(),
+                           status=status, acknowledged=playback["started"] is not None)
+            with self._playback_lock:
+                if self._playback is playback:
+                    self._playback = None
+        
+        if self._current_utterance == utterance_id:
+            self._is_speaking = False
+            print("Audio playback completed")
+    
+    def _stream_audio_to_electron(self, audio_data: bytes, text: str, utterance_id: str):
         """Stream audio data to Electron via WebSocket"""
         try:
-            # Convert audio data to base64 for WebSocket transmission
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
             # Send audio data to Electron
             if self.socketio:
-                self.socketio.emit('tts_audio', {
+                self._emit_audio({
                     'type': 'audio_data',
-                    'audio': audio_base64,
+                    'utterance_id': utterance_id,
                     'text': text,
                     'format': 'mp3'
-                })
+                }, audio_data)
                 print("Audio data sent to Electron for playback")
-                
-                # Wait for audio to finish (we'll get a completion event from Electron)
-                # For now, we'll estimate based on text length
-                estimated_duration = len(text.split()) * 0.5  # Rough estimate: 0.5 seconds per word
-                time.sleep(estimated_duration)
-                
-                self._is_speaking = False
-                print("Audio playback completed")
             else:
                 print("WebSocket not available, falling back to system player")
                 self._play_audio_system(audio_data)
             
+            # Wait for audio to finish (the system player never acks, so that's the deadline)
+            self._wait_for_playback(text, time.monotonic(), utterance_id, audio_duration(audio_data))
+            
         except Exception as e:
             print(f"Error streaming audio to Electron: {e}")
             self._is_speaking = False
@@ -176,10 +584,23 @@ class TTSService:
         except Exception as e:
             print(f"Error playing audio: {e}")
     
-    def stop(self) -> bool:
-        """Stop current TTS"""
+    def stop(self, utterance_id: str = None) -> bool:
+        """
+        Stop current TTS
+        
+        Args:
+            utterance_id (str): Only stop this utterance; if it hasn't started
+                yet it won't, and if it already finished nothing happens
+        """
         try:
-            self._is_speaking = False
+            with self._playback_lock:
+                if utterance_id is not None and utterance_id != self._current_utterance:
+                    self._stop_requested = utterance_id
+                    return False
+                self._is_speaking = False
+                self._current_utterance = None
+                if self._playback:
+                    self._playback["done"].set()
             
             # Send stop signal to Electron
             if self.socketio:
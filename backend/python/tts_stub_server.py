@@ -0,0 +1,268 @@
+"""
+Local stand-in for the ElevenLabs text-to-speech API.
+
+Synthesizes silent MP3 at a set rate so TTS time-to-first-audio can be
+measured offline, with and without streaming. It counts the connections
+it accepts (server.stats) and can charge connect_ms on each new one, the
+cost of DNS, TCP and TLS setup that a keep-alive pool avoids.
+
+    POST /v1/text-to-speech/<voice_id>         -> whole MP3 once "synthesis" is done
+    POST /v1/text-to-speech/<voice_id>/stream  -> the same MP3, chunked as it is made
+    HEAD anything                              -> empty 200 (connection warm-up)
+
+Audio length is seconds_per_word * words in the text. After first_byte_ms
+the audio is produced at realtime_factor times real time (2.0 = twice as
+fast as it plays).
+
+Run a server (then PILOT_TTS_BASE_URL=http://127.0.0.1:8766/v1):
+    python tts_stub_server.py --port 8766 --first-byte-ms 300 --realtime-factor 2
+Compare time-to-first-audio of both modes against an in-process server:
+    python tts_stub_server.py --bench 10 --first-byte-ms 300
+Compare a cold first utterance with one after a wake-word warm-up:
+    python tts_stub_server.py --bench-warm 5 --connect-ms 150
+Serve HTTPS with --certfile/--keyfile.
+"""
+import argparse
+import json
+import os
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_CONFIG = {
+    "first_byte_ms": 250,
+    "realtime_factor": 2.0,
+    "seconds_per_word": 0.35,
+    "chunk_ms": 100, # audio per streamed chunk
+    "connect_ms": 0, # charged once per new connection
+}
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, joint stereo; zeroed side info decodes as silence
+MP3_FRAME_HEADER = b"\xff\xfb\x90\x64"
+MP3_FRAME_BYTES = 417 # 144 * 128000 / 44100
+MP3_FRAME_SECONDS = 1152 / 44100
+SILENT_MP3_FRAME = MP3_FRAME_HEADER + bytes(MP3_FRAME_BYTES - len(MP3_FRAME_HEADER))
+
+
+def silent_mp3(seconds):
+    return SILENT_MP3_FRAME * max(1, int(round(seconds / MP3_FRAME_SECONDS)))
+
+
+def make_handler(config, stats):
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass # keep benchmarks quiet
+
+        def setup(self):
+            # One handler per connection; keep-alive requests reuse it
+            with lock:
+                stats["connections"] += 1
+            time.sleep(config["connect_ms"] / 1000)
+            super().setup()
+
+        def _count_request(self):
+            with lock:
+                stats["requests"] += 1
+
+        def do_HEAD(self):
+            self._count_request()
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _audio_for(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            words = len(str(body.get("text", "")).split())
+            return silent_mp3(words * config["seconds_per_word"])
+
+        def _synthesis_seconds(self, audio_bytes):
+            # Time to "make" this much audio at the configured speed
+            return audio_bytes / MP3_FRAME_BYTES * MP3_FRAME_SECONDS / config["realtime_factor"]
+
+        def do_POST(self):
+            self._count_request()
+            parts = self.path.strip("/").split("/")
+            if len(parts) < 3 or parts[:2] != ["v1", "text-to-speech"]:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            audio = self._audio_for()
+            time.sleep(config["first_byte_ms"] / 1000)
+
+            if parts[-1] != "stream":
+                time.sleep(self._synthesis_seconds(len(audio)))
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mpeg")
+                self.send_header("Content-Length", str(len(audio)))
+                self.end_headers()
+                self.wfile.write(audio)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            frames_per_chunk = max(1, int(config["chunk_ms"] / 1000 / MP3_FRAME_SECONDS))
+            size = frames_per_chunk * MP3_FRAME_BYTES
+            for i in range(0, len(audio), size):
+                data = audio[i:i + size]
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+                if i + size < len(audio):
+                    time.sleep(self._synthesis_seconds(len(data)))
+            self.wfile.write(b"0\r\n\r\n")
+
+    return StubHandler
+
+
+def start_server(config=None, host="127.0.0.1", port=0, certfile=None, keyfile=None):
+    """
+    Start the stub in a background thread; returns (server, base_url).
+    server.stats counts "connections" accepted and "requests" served.
+    """
+    merged = dict(DEFAULT_CONFIG, **(config or {}))
+    stats = {"connections": 0, "requests": 0}
+    server = ThreadingHTTPServer((host, port), make_handler(merged, stats))
+    server.daemon_threads = True
+    server.stats = stats
+    scheme = "http"
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        # Handshake on the handler thread, so connect_ms and TLS cost land together
+        server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, name="tts-stub", daemon=True).start()
+    return server, f"{scheme}://{host}:{server.server_address[1]}/v1"
+
+
+class _RecordingSocket:
+    """Stands in for Socket.IO and notes when audio reaches 'Electron'"""
+
+    def __init__(self):
+        self.first_audio = None
+        self.messages = 0
+
+    def emit(self, event, payload):
+        if event == 'tts_audio' and payload.get('type') in ('audio_chunk', 'audio_data'):
+            self.messages += 1
+            if self.first_audio is None:
+                self.first_audio = time.monotonic()
+
+
+def make_service(base_url, streaming=True, verify=True):
+    """A TTSService pointed at the stub, with its own connection pool and no cache"""
+    # tts_service builds its shared instance on import, which needs a key
+    os.environ.setdefault("ELEVENLABS_API_KEY", "stub")
+    from tts_service import TTSService
+
+    service = TTSService(api_key="stub", base_url=base_url, streaming=streaming, cache=False) # every run synthesizes
+    service.session.verify = verify
+    service._wait_for_playback = lambda *args, **kwargs: None # only synthesis is timed
+    return service
+
+
+def measure(service, text):
+    """Time from speak() until the first audio is sent to Electron, in ms"""
+    socket = _RecordingSocket()
+    service.socketio = socket
+
+    started = time.monotonic()
+    service.speak(text)
+    total = time.monotonic() - started
+    return {
+        "time_to_first_audio_ms": round((socket.first_audio - started) * 1000, 1) if socket.first_audio else None,
+        "total_ms": round(total * 1000, 1),
+        "messages": socket.messages,
+    }
+
+
+def _summary(samples):
+    first = sorted(s["time_to_first_audio_ms"] for s in samples if s["time_to_first_audio_ms"] is not None)
+    return {
+        "runs": len(samples),
+        "time_to_first_audio_p50_ms": first[len(first) // 2] if first else None,
+        "time_to_first_audio_max_ms": first[-1] if first else None,
+        "total_p50_ms": sorted(s["total_ms"] for s in samples)[len(samples) // 2],
+        "messages_per_utterance": samples[0]["messages"],
+    }
+
+
+def run_benchmark(server, base_url, runs, text, verify=True):
+    """Whole-file against streaming synthesis, one pooled service per mode"""
+    results = {}
+    for streaming in (False, True):
+        service = make_service(base_url, streaming, verify)
+        before = server.stats["connections"]
+        samples = [measure(service, text) for _ in range(runs)]
+        results["streaming" if streaming else "whole_file"] = dict(
+            _summary(samples), connections_opened=server.stats["connections"] - before)
+    return results
+
+
+def run_warm_benchmark(server, base_url, runs, text, verify=True):
+    """
+    First utterance of a fresh service, cold against warmed up the way the
+    wake word does it (warm_connection(), finished before speak()).
+    """
+    results = {}
+    for warm in (False, True):
+        samples = []
+        before = server.stats["connections"]
+        for _ in range(runs):
+            service = make_service(base_url, True, verify)
+            if warm:
+                service.warm_connection().join()
+            samples.append(measure(service, text))
+            service.session.close()
+        results["warmed" if warm else "cold"] = dict(
+            _summary(samples), connections_per_utterance=(server.stats["connections"] - before) / runs)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="ElevenLabs stand-in that streams silent MP3")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--first-byte-ms", type=float)
+    parser.add_argument("--realtime-factor", type=float)
+    parser.add_argument("--seconds-per-word", type=float)
+    parser.add_argument("--chunk-ms", type=float)
+    parser.add_argument("--connect-ms", type=float, help="Delay charged on each new connection")
+    parser.add_argument("--certfile", help="Serve HTTPS with this certificate")
+    parser.add_argument("--keyfile")
+    parser.add_argument("--bench", type=int, help="Time this many utterances per mode against an in-process server and exit")
+    parser.add_argument("--bench-warm", type=int, help="Time this many cold and pre-warmed first utterances and exit")
+    parser.add_argument("--text", default="Opening Spotify for you, enjoy the music and have a great game tonight.")
+    args = parser.parse_args()
+
+    config = {}
+    for key in ("first_byte_ms", "realtime_factor", "seconds_per_word", "chunk_ms", "connect_ms"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+
+    if args.bench or args.bench_warm:
+        server, url = start_server(config, certfile=args.certfile, keyfile=args.keyfile)
+        verify = not args.certfile # a local certificate is normally self-signed
+        if args.bench:
+            print(json.dumps(run_benchmark(server, url, args.bench, args.text, verify), indent=2))
+        if args.bench_warm:
+            print(json.dumps(run_warm_benchmark(server, url, args.bench_warm, args.text, verify), indent=2))
+        print(json.dumps({"server": server.stats}))
+        server.shutdown()
+    else:
+        server, url = start_server(config, args.host, args.port, args.certfile, args.keyfile)
+        print(f"TTS stub listening on {url} (set PILOT_TTS_BASE_URL={url})")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
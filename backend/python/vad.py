@@ -0,0 +1,288 @@
+"""
+Silero VAD loading for the speech engine.
+
+Two runtimes are supported:
+    torch - torch.hub.load of snakers4/silero-vad (needs network on first run)
+    onnx  - onnxruntime with a local silero_vad.onnx, no torch import at all
+
+Run `python vad.py --fetch` to download the ONNX model, and
+`python vad.py --compare` to measure startup time and peak RSS of both.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import urllib.request
+import numpy as np
+
+SAMPLERATE = 16000
+VAD_RUNTIME = os.getenv("PILOT_VAD_RUNTIME", "auto") # "auto", "onnx" or "torch"
+ONNX_MODEL_PATH = os.getenv(
+    "SILERO_VAD_ONNX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "silero_vad.onnx")
+)
+ONNX_MODEL_URL = "https://github.com/snakers4/silero-vad/raw/master/src/silero_vad/data/silero_vad.onnx"
+
+_warned_fallback = False
+
+
+class OnnxSileroVAD:
+    """Silero VAD v5 run through onnxruntime; returns a speech probability per block"""
+
+    CONTEXT_SIZE = 64 # samples of the previous block the v5 model expects at 16 kHz
+
+    def __init__(self, path=ONNX_MODEL_PATH):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        # One thread is plenty for 32 ms blocks and keeps the game's cores free
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self._sr = np.array(SAMPLERATE, dtype=np.int64)
+        self._input = None
+        self.reset_states()
+
+    def reset_states(self):
+        self._state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._context = np.zeros(self.CONTEXT_SIZE, dtype=np.float32)
+
+    def __call__(self, block):
+        size = self.CONTEXT_SIZE + len(block)
+        if self._input is None or self._input.shape[1] != size:
+            self._input = np.zeros((1, size), dtype=np.float32)
+
+        self._input[0, :self.CONTEXT_SIZE] = self._context
+        self._input[0, self.CONTEXT_SIZE:] = block
+        out, self._state = self.session.run(None, {"input": self._input, "state": self._state, "sr": self._sr})
+        self._context[:] = self._input[0, -self.CONTEXT_SIZE:]
+        return float(out[0][0])
+
+
+class VADIterator:
+    """
+    Streaming start/end detector over a block-level VAD model.
+
+    Same behaviour and return values as silero's VADIterator, but takes
+    numpy blocks and works with any model exposing __call__(block) -> prob
+    and reset_states().
+    """
+
+    def __init__(self, model, threshold=0.5, sampling_rate=SAMPLERATE,
+                 min_silence_duration_ms=100, speech_pad_ms=30):
+        self.model = model
+        self.threshold = threshold
+        self.sampling_rate = sampling_rate
+        self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+        self.reset_states()
+
+    def reset_states(self):
+        self.model.reset_states()
+        self.triggered = False
+        self.temp_end = 0
+        self.current_sample = 0
+
+    def __call__(self, x, return_seconds=False):
+        window_size = len(x)
+        self.current_sample += window_size
+
+        speech_prob = self.model(x)
+
+        if speech_prob >= self.threshold and self.temp_end:
+            self.temp_end = 0
+
+        if speech_prob >= self.threshold and not self.triggered:
+            self.triggered = True
+            start = max(0, self.current_sample - self.speech_pad_samples - window_size)
+            return {"start": self._position(start, return_seconds)}
+
+        if speech_prob < self.threshold - 0.15 and self.triggered:
+            if not self.temp_end:
+                self.temp_end = self.current_sample
+            if self.current_sample - self.temp_end < self.min_silence_samples:
+                return None
+            end = self.temp_end + self.speech_pad_samples - window_size
+            self.temp_end = 0
+            self.triggered = False
+            return {"end": self._position(end, return_seconds)}
+
+        return None
+
+    def _position(self, samples, return_seconds):
+        if return_seconds:
+            return round(samples / self.sampling_rate, 1)
+        return int(samples)
+
+
+class TorchVADIterator:
+    """Adapter so silero's torch VADIterator accepts numpy blocks without copying"""
+
+    def __init__(self, iterator):
+        import torch
+        self._torch = torch
+        self._iterator = iterator
+
+    @property
+    def triggered(self):
+        return self._iterator.triggered
+
+    def reset_states(self):
+        self._iterator.reset_states()
+
+    def __call__(self, x, return_seconds=False):
+        return self._iterator(self._torch.from_numpy(x), return_seconds=return_seconds)
+
+
+def resolve_runtime(runtime=VAD_RUNTIME):
+    """Pick "onnx" when onnxruntime and the model file are available, else "torch" """
+    if runtime != "auto":
+        return runtime
+    try:
+        import onnxruntime # noqa: F401
+    except ImportError:
+        _warn_fallback("onnxruntime is not installed", "pip install onnxruntime")
+        return "torch"
+    if not os.path.exists(ONNX_MODEL_PATH):
+        _warn_fallback(f"{ONNX_MODEL_PATH} is missing", "python vad.py --fetch")
+        return "torch"
+    return "onnx"
+
+
+def _warn_fallback(reason, fix):
+    # Only when nobody chose a runtime; an explicit PILOT_VAD_RUNTIME=torch is not a surprise
+    global _warned_fallback
+    if _warned_fallback or "PILOT_VAD_RUNTIME" in os.environ:
+        return
+    _warned_fallback = True
+    print(f"VAD: {reason}, falling back to torch. Run `{fix}` to use the ONNX runtime "
+          f"(readme step \"Torch-free voice detection\"), or set PILOT_VAD_RUNTIME=torch to silence this.")
+
+
+def fetch_model(path=ONNX_MODEL_PATH, url=ONNX_MODEL_URL):
+    """
+    Download the Silero VAD ONNX model.
+
+    Args:
+        path (str): Where to save it
+        url (str): Where to download it from
+
+    Returns:
+        str: The saved path
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Write next to the target and rename, so a failed download never leaves a half file behind
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out, urllib.request.urlopen(url, timeout=60) as response:
+            while chunk := response.read(64 * 1024):
+                out.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return path
+
+
+def load_vad(runtime=VAD_RUNTIME, threshold=0.5, min_silence_duration_ms=100):
+    """
+    Load Silero VAD for the given runtime.
+
+    Returns:
+        An iterator taking float32 numpy blocks, with reset_states() and
+        `triggered`
+    """
+    runtime = resolve_runtime(runtime)
+    if runtime == "onnx":
+        if not os.path.exists(ONNX_MODEL_PATH):
+            raise FileNotFoundError(f"Silero VAD ONNX model not found at {ONNX_MODEL_PATH}")
+        return VADIterator(OnnxSileroVAD(ONNX_MODEL_PATH), threshold=threshold,
+                           min_silence_duration_ms=min_silence_duration_ms)
+
+    import torch
+    vad_model, utils = torch.hub.load(repo_or_dir='snakers4/silero-vad',
+                                      model='silero_vad',
+                                      force_reload=False)
+    TorchIterator = utils[3]
+    return TorchVADIterator(TorchIterator(vad_model, threshold=threshold,
+                                          min_silence_duration_ms=min_silence_duration_ms))
+
+
+def whisper_device(runtime=VAD_RUNTIME):
+    """(device, compute_type) for faster_whisper; only imports torch on the torch runtime"""
+    if resolve_runtime(runtime) == "torch":
+        import torch
+        has_cuda = torch.cuda.is_available()
+    else:
+        try:
+            import ctranslate2
+            has_cuda = ctranslate2.get_cuda_device_count() > 0
+        except Exception:
+            has_cuda = False
+    return ("cuda", "float16") if has_cuda else ("cpu", "int8")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+
+def _measure(runtime):
+    """Load the VAD in this (fresh) process and report startup cost"""
+    started = time.perf_counter()
+    vad = load_vad(runtime)
+    device = whisper_device(runtime)
+    loaded = time.perf_counter()
+
+    block = np.zeros(512, dtype=np.float32)
+    for _ in range(100):
+        vad(block)
+    infer_ms = (time.perf_counter() - loaded) * 1000 / 100
+
+    return {
+        "runtime": runtime,
+        "startup_seconds": round(loaded - started, 3),
+        "block_inference_ms": round(infer_ms, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "torch_imported": "torch" in sys.modules,
+        "whisper_device": device[0],
+    }
+
+
+def compare_runtimes():
+    """Measure each runtime in a fresh interpreter so imports aren't shared"""
+    results = []
+    for runtime in ("onnx", "torch"):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", runtime],
+                              capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode == 0 and lines:
+            results.append(json.loads(lines[-1]))
+        else:
+            results.append({"runtime": runtime, "error": (proc.stderr.strip().splitlines() or ["failed"])[-1]})
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == "--measure":
+        print(json.dumps(_measure(sys.argv[2])))
+    elif len(sys.argv) == 2 and sys.argv[1] == "--compare":
+        print(json.dumps(compare_runtimes(), indent=2))
+    elif len(sys.argv) == 2 and sys.argv[1] == "--fetch":
+        print(f"Saved Silero VAD model to {fetch_model()}")
+    else:
+        print("Usage: python vad.py --fetch | --compare")
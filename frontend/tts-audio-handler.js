@@ -3,6 +3,8 @@ class TTSAudioHandler {
     constructor() {
         this.currentAudio = null;
         this.isPlaying = false;
+        // Streamed utterance being assembled with Media Source Extensions
+        this.stream = null;
         
         this.init();
     }
@@ -19,6 +21,15 @@ class TTSAudioHandler {
                 this.playAudio(data);
             });
             
+            // Handle streamed audio chunks
+            ipcRenderer.on('tts-audio-chunk', (event, data) => {
+                this.handleChunk(data);
+            });
+            
+            ipcRenderer.on('tts-audio-end', (event, data) => {
+                this.handleStreamEnd(data);
+            });
+            
             // Handle stop audio command
             ipcRenderer.on('stop-tts-audio', (event) => {
                 this.stopAudio();
@@ -56,6 +67,7 @@ class TTSAudioHandler {
                 console.log('🎵 Audio playback started');
                 this.isPlaying = true;
                 this.currentAudio = audio;
+                this.notify('tts-audio-started', data.utteranceId, Number.isFinite(audio.duration) ? audio.duration : null);
                 
                 // Removed TTS indicator - no popup
                 // this.showTTSIndicator(data.text);
@@ -70,10 +82,7 @@ class TTSAudioHandler {
                 // this.hideTTSIndicator();
                 
                 // Notify main process that audio is complete
-                if (window.require) {
-                    const { ipcRenderer } = window.require('electron');
-                    ipcRenderer.invoke('tts-audio-complete');
-                }
+                this.notify('tts-audio-complete', data.utteranceId);
             };
             
             audio.onerror = (error) => {
@@ -85,10 +94,7 @@ class TTSAudioHandler {
                 // this.hideTTSIndicator();
                 
                 // Notify main process of error
-                if (window.require) {
-                    const { ipcRenderer } = window.require('electron');
-                    ipcRenderer.invoke('tts-audio-error', error.message);
-                }
+                this.notify('tts-audio-error', error.message, data.utteranceId);
             };
             
             // Start playback
@@ -104,7 +110,131 @@ class TTSAudioHandler {
         }
     }
     
+    notify(channel, ...args) {
+        // Playback acks go to the main process, which passes them on to Python
+        if (window.require) {
+            const { ipcRenderer } = window.require('electron');
+            ipcRenderer.invoke(channel, ...args);
+        }
+    }
+    
+    startStream(utteranceId) {
+        // Stop any currently playing audio
+        this.stopAudio();
+        
+        const mediaSource = new MediaSource();
+        const audio = new Audio();
+        audio.src = URL.createObjectURL(mediaSource);
+        
+        const stream = {
+            id: utteranceId,
+            audio,
+            mediaSource,
+            sourceBuffer: null,
+            pending: new Map(), // seq -> chunk that arrived early
+            ready: [], // in-order chunks waiting for the source buffer
+            nextSeq: 0,
+            totalChunks: null
+        };
+        
+        mediaSource.addEventListener('sourceopen', () => {
+            stream.sourceBuffer = mediaSource.addSourceBuffer('audio/mpeg');
+            stream.sourceBuffer.addEventListener('updateend', () => this.flushStream(stream));
+            this.flushStream(stream);
+        });
+        
+        audio.onplay = () => {
+            console.log('🎵 Streamed audio playback started');
+            this.isPlaying = true;
+            this.currentAudio = audio;
+            // Length isn't known until the stream ends; Python sizes the audio itself
+            this.notify('tts-audio-started', utteranceId, null);
+        };
+        
+        audio.onended = () => {
+            console.log('🎵 Streamed audio playback ended');
+            this.finishStream(stream);
+            
+            // Notify main process that audio is complete
+            this.notify('tts-audio-complete', utteranceId);
+        };
+        
+        audio.onerror = (error) => {
+            console.error('❌ Streamed audio playback error:', error);
+            this.finishStream(stream);
+            
+            this.notify('tts-audio-error', error.message, utteranceId);
+        };
+        
+        this.stream = stream;
+        this.currentAudio = audio;
+        this.isPlaying = true;
+        
+        // Resolves once the first chunk has been appended
+        audio.play().catch((error) => {
+            console.error('❌ Error starting streamed audio:', error);
+        });
+        
+        return stream;
+    }
+    
+    handleChunk(data) {
+        let stream = this.stream;
+        if (!stream || stream.id !== data.utteranceId) {
+            if (data.seq !== 0) {
+                return; // tail of an utterance that was stopped
+            }
+            stream = this.startStream(data.utteranceId);
+        }
+        
+        // Socket.IO keeps order, but don't rely on it
+        stream.pending.set(data.seq, data.audio);
+        while (stream.pending.has(stream.nextSeq)) {
+            stream.ready.push(stream.pending.get(stream.nextSeq));
+            stream.pending.delete(stream.nextSeq);
+            stream.nextSeq++;
+        }
+        this.flushStream(stream);
+    }
+    
+    handleStreamEnd(data) {
+        const stream = this.stream;
+        if (stream && stream.id === data.utteranceId) {
+            stream.totalChunks = data.chunks;
+            this.flushStream(stream);
+        }
+    }
+    
+    flushStream(stream) {
+        const { sourceBuffer, mediaSource } = stream;
+        if (!sourceBuffer || sourceBuffer.updating || mediaSource.readyState !== 'open') {
+            return;
+        }
+        
+        if (stream.ready.length > 0) {
+            sourceBuffer.appendBuffer(stream.ready.shift());
+        } else if (stream.totalChunks !== null && stream.nextSeq >= stream.totalChunks) {
+            mediaSource.endOfStream();
+        }
+    }
+    
+    finishStream(stream) {
+        URL.revokeObjectURL(stream.audio.src);
+        if (this.stream === stream) {
+            this.stream = null;
+            this.isPlaying = false;
+            this.currentAudio = null;
+        }
+    }
+    
     stopAudio() {
+        if (this.stream) {
+            const stream = this.stream;
+            this.stream = null;
+            stream.audio.pause();
+            URL.revokeObjectURL(stream.audio.src);
+        }
+        
         try {
             if (this.currentAudio && this.isPlaying) {
                 this.currentAudio.pause();
@@ -88,6 +88,9 @@ class PilotWebSocket {
             this.retryCount = 0;
             this.updateState('idle');
             
+            // Audio is played through Electron's connection; don't send it here too
+            this.socket.emit('tts_capabilities', { audio: false });
+            
             // Add connection message to logger
             if (window.messageLogger) {
                 window.messageLogger.addMessage({